@@ -9,16 +9,26 @@ import os
 import sys
 import json
 import base64
-import hashlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional, Dict, Any
-from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
-from azure.keyvault.keys import KeyClient
 from azure.keyvault.keys.crypto import CryptographyClient, EncryptionAlgorithm
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
 import logging
 
+# Shared chunked decryption helpers ship alongside the TEE utilities
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tee-utilities"))
+from model_crypto import DEFAULT_CHUNK_SIZE, DEFAULT_THREADS, decrypt_file, run_batch
+from keyvault_clients import (
+    CLIENT_OPTIONS,
+    CREDENTIAL_DEFAULT,
+    CREDENTIAL_MANAGED_IDENTITY,
+    MAX_CRYPTO_CLIENTS,
+    get_credential,
+    get_key_client,
+    get_limiter
+)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -50,45 +60,64 @@ class ModelDecryptor:
         self.use_tee = use_tee
         self.attestation_token = attestation_token
         
-        # Initialize Azure credentials
+        # Initialize Azure credentials (shared process-wide)
         if use_tee and attestation_token:
             # Use attestation token for TEE workloads
-            self.credential = self._create_tee_credential()
+            credential_type = self._tee_credential_type()
         else:
             # Use default credential (workload identity)
-            self.credential = DefaultAzureCredential()
+            credential_type = CREDENTIAL_DEFAULT
+        self.credential = get_credential(credential_type)
         
         # Initialize Key Vault clients
-        self.key_client = KeyClient(vault_url=keyvault_url, credential=self.credential)
-        self.crypto_client = None
+        self.key_client = get_key_client(keyvault_url, credential_type)
         
-    def _create_tee_credential(self):
-        """Create credential with TEE attestation token."""
+        # Cryptography clients by key version (None for the current version),
+        # least recently used first; shared by batch workers
+        self._crypto_clients: "OrderedDict[Optional[str], CryptographyClient]" = OrderedDict()
+        self._crypto_lock = threading.Lock()
+        
+        # Shared with every other Key Vault caller in the process
+        self._limiter = get_limiter(keyvault_url)
+    
+    def _tee_credential_type(self) -> str:
+        """Select the credential for TEE-attested access."""
         # In production, this would use the attestation token
         # For now, use managed identity
         logger.info("Using TEE-attested credential")
-        return ManagedIdentityCredential()
+        return CREDENTIAL_MANAGED_IDENTITY
     
-    def _get_crypto_client(self) -> CryptographyClient:
-        """Get or create cryptography client for key operations."""
-        if self.crypto_client is None:
-            key = self.key_client.get_key(self.key_name)
-            self.crypto_client = CryptographyClient(key, credential=self.credential)
-        return self.crypto_client
+    def _get_crypto_client(self, version: Optional[str] = None) -> CryptographyClient:
+        """Get or create cryptography client for a key version (default: current)."""
+        # Held across the fetch so concurrent workers share one get_key
+        with self._crypto_lock:
+            crypto_client = self._crypto_clients.get(version)
+            if crypto_client is None:
+                key = self._limiter.call(self.key_client.get_key, self.key_name, version=version)
+                crypto_client = CryptographyClient(key, credential=self.credential, **CLIENT_OPTIONS)
+                self._crypto_clients[version] = crypto_client
+                while len(self._crypto_clients) > MAX_CRYPTO_CLIENTS:
+                    self._crypto_clients.popitem(last=False)
+            else:
+                self._crypto_clients.move_to_end(version)
+            return crypto_client
     
-    def decrypt_data_key(self, encrypted_dek: bytes) -> bytes:
+    def decrypt_data_key(self, encrypted_dek: bytes, version: Optional[str] = None) -> bytes:
         """
         Decrypt data encryption key using Key Vault key.
         
         Args:
             encrypted_dek: Encrypted data encryption key
-            
+            version: Key version the DEK was wrapped with (default: current
+                version)
+        
         Returns:
             Decrypted data encryption key
         """
         try:
-            crypto_client = self._get_crypto_client()
-            result = crypto_client.decrypt(
+            crypto_client = self._get_crypto_client(version)
+            result = self._limiter.call(
+                crypto_client.decrypt,
                 EncryptionAlgorithm.rsa_oaep_256,
                 encrypted_dek
             )
@@ -102,16 +131,26 @@ class ModelDecryptor:
         self,
         encrypted_model_path: str,
         output_path: str,
-        metadata_path: Optional[str] = None
+        metadata_path: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        threads: int = DEFAULT_THREADS
     ) -> Dict[str, Any]:
         """
         Decrypt an encrypted model file.
         
+        The ciphertext is decrypted, hashed and written in chunks. Files
+        larger than one chunk are split into segments (CBC for v1, GCM for
+        v2) that are decrypted concurrently on `threads` threads, so peak
+        memory is bounded by chunk_size × threads rather than by the size of
+        the model.
+        
         Args:
             encrypted_model_path: Path to encrypted model file
             output_path: Path to save decrypted model
             metadata_path: Optional path to encryption metadata file
-            
+            chunk_size: Bytes read and decrypted per iteration
+            threads: Threads used to decrypt files larger than one chunk
+        
         Returns:
             Dictionary with decryption metadata
         """
@@ -125,51 +164,37 @@ class ModelDecryptor:
             
             logger.info(f"Decrypting model: {encrypted_model_path}")
             logger.info(f"Encryption algorithm: {metadata['algorithm']}")
+            logger.info(f"Format version: {metadata.get('version', '1.0')}")
             
-            # Decrypt the data encryption key
+            # Decrypt the data encryption key, pinned to the key version it
+            # was wrapped with when the metadata records one for this key
             encrypted_dek = base64.b64decode(metadata['encrypted_dek'])
-            dek = self.decrypt_data_key(encrypted_dek)
-            
-            # Read encrypted model data
-            with open(encrypted_model_path, 'rb') as f:
-                encrypted_data = f.read()
+            version = metadata.get('key_version') if metadata.get('key_name') == self.key_name else None
+            dek = self.decrypt_data_key(encrypted_dek, version)
             
-            # Decrypt model data using DEK
-            iv = base64.b64decode(metadata['iv'])
-            cipher = Cipher(
-                algorithms.AES(dek),
-                modes.CBC(iv),
-                backend=default_backend()
+            # Decrypt model data using DEK and verify checksum / segment tags
+            decrypt_file(
+                encrypted_model_path,
+                output_path,
+                dek,
+                metadata,
+                verify_hash=True,
+                chunk_size=chunk_size,
+                threads=threads
             )
-            decryptor = cipher.decryptor()
-            
-            decrypted_data = decryptor.update(encrypted_data) + decryptor.finalize()
-            
-            # Remove PKCS7 padding
-            padding_length = decrypted_data[-1]
-            decrypted_data = decrypted_data[:-padding_length]
-            
-            # Verify checksum
-            calculated_hash = hashlib.sha256(decrypted_data).hexdigest()
-            if calculated_hash != metadata['original_hash']:
-                raise ValueError("Model checksum verification failed")
-            
-            # Write decrypted model
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, 'wb') as f:
-                f.write(decrypted_data)
             
             logger.info(f"Successfully decrypted model to: {output_path}")
             
             return {
                 "status": "success",
                 "original_size": metadata['original_size'],
-                "encrypted_size": len(encrypted_data),
+                "encrypted_size": os.path.getsize(encrypted_model_path),
                 "algorithm": metadata['algorithm'],
+                "version": metadata.get('version', '1.0'),
                 "checksum_verified": True,
                 "output_path": output_path
             }
-            
+        
         except Exception as e:
             logger.error(f"Failed to decrypt model: {e}")
             raise
@@ -178,52 +203,63 @@ class ModelDecryptor:
         self,
         encrypted_dir: str,
         output_dir: str,
-        pattern: str = "*.encrypted"
+        pattern: str = "*.encrypted",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        threads: int = DEFAULT_THREADS,
+        workers: int = 1
     ) -> Dict[str, Any]:
         """
         Decrypt multiple model files in a directory.
         
+        Files are decrypted concurrently on `workers` threads; each writes to
+        its own temporary file that is renamed into place once verified.
+        
         Args:
             encrypted_dir: Directory containing encrypted models
             output_dir: Directory to save decrypted models
             pattern: File pattern to match
-            
+            chunk_size: Bytes read and decrypted per iteration
+            threads: Threads used to decrypt files larger than one chunk
+            workers: Number of files decrypted concurrently
+        
         Returns:
-            Dictionary with batch decryption results
+            Dictionary with batch decryption results, per-file timings and
+            aggregate throughput
         """
-        encrypted_files = list(Path(encrypted_dir).glob(pattern))
-        results = {
-            "total": len(encrypted_files),
-            "successful": 0,
-            "failed": 0,
-            "details": []
-        }
-        
-        for encrypted_file in encrypted_files:
+        def decrypt_one(encrypted_file: Path) -> Dict[str, Any]:
             try:
                 output_name = encrypted_file.stem  # Remove .encrypted extension
                 output_path = os.path.join(output_dir, output_name)
                 
                 result = self.decrypt_model_file(
                     str(encrypted_file),
-                    output_path
+                    output_path,
+                    chunk_size=chunk_size,
+                    threads=threads
                 )
                 
-                results["successful"] += 1
-                results["details"].append({
+                return {
                     "file": str(encrypted_file),
                     "status": "success",
-                    "output": output_path
-                })
-                
+                    "output": output_path,
+                    "bytes": result["original_size"]
+                }
+            
             except Exception as e:
-                results["failed"] += 1
-                results["details"].append({
+                logger.error(f"Failed to decrypt {encrypted_file}: {e}")
+                return {
                     "file": str(encrypted_file),
                     "status": "failed",
                     "error": str(e)
-                })
-                logger.error(f"Failed to decrypt {encrypted_file}: {e}")
+                }
+        
+        encrypted_files = list(Path(encrypted_dir).glob(pattern))
+        results = run_batch(decrypt_one, encrypted_files, workers)
+        
+        logger.info(
+            f"Decrypted {results['successful']}/{results['total']} models in "
+            f"{results['elapsed_seconds']}s ({results['mb_per_second']} MB/s)"
+        )
         
         return results
 
@@ -241,6 +277,24 @@ def main():
     parser.add_argument("--use-tee", action="store_true", help="Use TEE-attested access")
     parser.add_argument("--attestation-token", help="TEE attestation token")
     parser.add_argument("--batch", action="store_true", help="Batch decrypt directory")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Bytes read and decrypted per iteration; peak memory is about chunk size x threads"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=DEFAULT_THREADS,
+        help="Threads used to decrypt large files in parallel segments"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of files decrypted concurrently in batch mode"
+    )
     
     args = parser.parse_args()
     
@@ -255,19 +309,24 @@ def main():
         if args.batch:
             results = decryptor.batch_decrypt_models(
                 encrypted_dir=args.encrypted_model,
-                output_dir=args.output
+                output_dir=args.output,
+                chunk_size=args.chunk_size,
+                threads=args.threads,
+                workers=args.workers
             )
             print(json.dumps(results, indent=2))
         else:
             result = decryptor.decrypt_model_file(
                 encrypted_model_path=args.encrypted_model,
                 output_path=args.output,
-                metadata_path=args.metadata
+                metadata_path=args.metadata,
+                chunk_size=args.chunk_size,
+                threads=args.threads
             )
             print(json.dumps(result, indent=2))
         
         sys.exit(0)
-        
+    
     except Exception as e:
         logger.error(f"Decryption failed: {e}")
         sys.exit(1)
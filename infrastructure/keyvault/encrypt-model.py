@@ -12,14 +12,27 @@ import base64
 import hashlib
 from pathlib import Path
 from typing import Optional, Dict, Any
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.keys import KeyClient
 from azure.keyvault.keys.crypto import CryptographyClient, EncryptionAlgorithm
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
 import secrets
 import logging
+import threading
+
+# Shared model container helpers ship alongside the TEE utilities
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tee-utilities"))
+from model_crypto import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_THREADS,
+    FORMAT_VERSION_CBC,
+    FORMAT_VERSION_GCM,
+    encrypt_cbc_stream,
+    encrypt_gcm_stream,
+    make_partial_path,
+    run_batch
+)
+from model_formats import FORMAT_SAFETENSORS, detect_model_format, safetensors_tensor_index
+from keyvault_clients import CLIENT_OPTIONS, CREDENTIAL_DEFAULT, get_credential, get_key_client, get_limiter
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,6 +40,139 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Algorithms accepted by encrypt_model_file and the container version each produces
+SUPPORTED_ALGORITHMS = {
+    "AES-256-CBC": FORMAT_VERSION_CBC,
+    "AES-256-GCM": FORMAT_VERSION_GCM
+}
+
+
+# Default manifest file name, kept alongside the encrypted models
+MANIFEST_NAME = ".encryption-manifest.json"
+
+# Manifest schema version
+MANIFEST_VERSION = "1.0"
+
+
+class EncryptionManifest:
+    """
+    Records which model files have been encrypted, and from what content.
+    
+    Each entry stores the source path, size, mtime, SHA-256 and output
+    locations. A file whose size and mtime are unchanged is skipped without
+    being read; a file that was only touched is re-hashed and skipped if
+    its content is unchanged. The manifest is rewritten atomically after
+    every completed file, so an interrupted batch resumes where it stopped.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Load a manifest, starting empty if it does not exist yet.
+        
+        Args:
+            path: Path to the manifest JSON file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                manifest = json.load(f)
+            self._entries = manifest.get("files", {})
+            logger.info(f"Loaded encryption manifest with {len(self._entries)} entries: {path}")
+    
+    @staticmethod
+    def _hash_file(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+        """Calculate the SHA-256 of a file in bounded memory."""
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+    
+    def is_current(
+        self,
+        model_path: str,
+        output_path: str,
+        algorithm: str,
+        key_name: str
+    ) -> bool:
+        """
+        Check whether a model's encrypted output is up to date.
+        
+        Args:
+            model_path: Path to the plaintext model
+            output_path: Expected path of the encrypted model
+            algorithm: Encryption algorithm requested for this run
+            key_name: Key Vault key requested for this run
+        
+        Returns:
+            True if the model can be skipped
+        """
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(model_path))
+        
+        if entry is None or entry["output"] != os.path.abspath(output_path):
+            return False
+        if entry["algorithm"] != algorithm or entry["key_name"] != key_name:
+            return False
+        if not (os.path.exists(entry["output"]) and os.path.exists(entry["metadata"])):
+            return False
+        
+        stat = os.stat(model_path)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+        
+        # Touched but possibly unchanged: compare content before re-encrypting
+        if self._hash_file(model_path) != entry["sha256"]:
+            return False
+        
+        with self._lock:
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self._save()
+        return True
+    
+    def record(
+        self,
+        model_path: str,
+        stat: os.stat_result,
+        output_path: str,
+        metadata_path: str,
+        metadata: Dict[str, Any]
+    ):
+        """
+        Record a completed encryption and persist the manifest.
+        
+        Args:
+            model_path: Path to the plaintext model
+            stat: Stat of the model taken before it was encrypted
+            output_path: Path of the encrypted model
+            metadata_path: Path of the encryption metadata
+            metadata: Encryption metadata returned by encrypt_model_file
+        """
+        with self._lock:
+            self._entries[os.path.abspath(model_path)] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": metadata["original_hash"],
+                "output": os.path.abspath(output_path),
+                "metadata": os.path.abspath(metadata_path),
+                "algorithm": metadata["algorithm"],
+                "key_name": metadata["key_name"]
+            }
+            self._save()
+    
+    def _save(self):
+        """Atomically rewrite the manifest file; caller holds the lock."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        partial_path = make_partial_path(self.path)
+        with open(partial_path, 'w') as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self._entries}, f, indent=2)
+        os.replace(partial_path, self.path)
+
 
 class ModelEncryptor:
     """Handles secure model encryption using Azure Key Vault."""
@@ -46,19 +192,60 @@ class ModelEncryptor:
         self.keyvault_url = keyvault_url
         self.key_name = key_name
         
-        # Initialize Azure credentials
-        self.credential = DefaultAzureCredential()
-        
-        # Initialize Key Vault clients
-        self.key_client = KeyClient(vault_url=keyvault_url, credential=self.credential)
+        # Initialize Azure credentials and Key Vault clients (shared process-wide)
+        self.credential = get_credential(CREDENTIAL_DEFAULT)
+        self.key_client = get_key_client(keyvault_url, CREDENTIAL_DEFAULT)
         self.crypto_client = None
         
+        # Shared with every other Key Vault caller in the process
+        self._limiter = get_limiter(keyvault_url)
+        
+        # Key Vault key and its public half, fetched once and shared by workers
+        self._key = None
+        self._public_key = None
+        self._key_lock = threading.Lock()
+    
+    def _get_key(self):
+        """Get or fetch the Key Vault key (public material only)."""
+        with self._key_lock:
+            if self._key is None:
+                self._key = self._limiter.call(self.key_client.get_key, self.key_name)
+                self._public_key = self._load_public_key(self._key)
+            return self._key
+    
     def _get_crypto_client(self) -> CryptographyClient:
         """Get or create cryptography client for key operations."""
-        if self.crypto_client is None:
-            key = self.key_client.get_key(self.key_name)
-            self.crypto_client = CryptographyClient(key, credential=self.credential)
-        return self.crypto_client
+        key = self._get_key()
+        with self._key_lock:
+            if self.crypto_client is None:
+                self.crypto_client = CryptographyClient(key, credential=self.credential, **CLIENT_OPTIONS)
+            return self.crypto_client
+    
+    @staticmethod
+    def _load_public_key(key) -> Optional[rsa.RSAPublicKey]:
+        """
+        Build a local RSA public key from a Key Vault key's JWK.
+        
+        Args:
+            key: KeyVaultKey returned by KeyClient.get_key
+        
+        Returns:
+            RSA public key, or None if the key cannot be used for local
+            wrapping (not RSA, disabled, missing modulus/exponent, or
+            without the encrypt operation)
+        """
+        jwk = key.key
+        if jwk is None or jwk.kty not in ("RSA", "RSA-HSM") or not jwk.n or not jwk.e:
+            return None
+        if key.properties.enabled is False:
+            return None
+        if jwk.key_ops is not None and "encrypt" not in jwk.key_ops:
+            return None
+        
+        return rsa.RSAPublicNumbers(
+            int.from_bytes(jwk.e, "big"),
+            int.from_bytes(jwk.n, "big")
+        ).public_key()
     
     def generate_data_key(self, key_length: int = 32) -> bytes:
         """
@@ -66,7 +253,7 @@ class ModelEncryptor:
         
         Args:
             key_length: Length of the key in bytes (default: 32 for AES-256)
-            
+        
         Returns:
             Random data encryption key
         """
@@ -76,15 +263,33 @@ class ModelEncryptor:
         """
         Encrypt data encryption key using Key Vault key.
         
+        RSA-OAEP-256 only needs the public key, so the DEK is wrapped locally
+        with the cached public JWK. Key Vault is called only when no usable
+        public key material is available (e.g. a non-RSA or disabled key).
+        
         Args:
             dek: Data encryption key to encrypt
-            
+        
         Returns:
             Encrypted data encryption key
         """
         try:
+            self._get_key()
+            if self._public_key is not None:
+                encrypted_dek = self._public_key.encrypt(
+                    dek,
+                    padding.OAEP(
+                        mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                        algorithm=hashes.SHA256(),
+                        label=None
+                    )
+                )
+                logger.info("Successfully encrypted data encryption key locally")
+                return encrypted_dek
+            
             crypto_client = self._get_crypto_client()
-            result = crypto_client.encrypt(
+            result = self._limiter.call(
+                crypto_client.encrypt,
                 EncryptionAlgorithm.rsa_oaep_256,
                 dek
             )
@@ -99,85 +304,139 @@ class ModelEncryptor:
         model_path: str,
         output_path: str,
         metadata_path: Optional[str] = None,
-        algorithm: str = "AES-256-CBC"
+        algorithm: str = "AES-256-CBC",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        threads: int = DEFAULT_THREADS
     ) -> Dict[str, Any]:
         """
         Encrypt a model file using envelope encryption.
         
+        The model is streamed from disk in chunks, so peak memory is bounded
+        by chunk_size × threads rather than by the size of the model.
+        
+        AES-256-CBC produces the original single-stream container (version
+        1.0). AES-256-GCM produces the segmented container (version 2.0):
+        each chunk_size segment is sealed independently, so segments can be
+        encrypted and decrypted in parallel and any byte range can be read
+        and authenticated without touching the rest of the file.
+        
         Args:
             model_path: Path to model file to encrypt
             output_path: Path to save encrypted model
             metadata_path: Optional path to save encryption metadata
-            algorithm: Encryption algorithm (default: AES-256-CBC)
-            
+            algorithm: Encryption algorithm, AES-256-CBC or AES-256-GCM
+                (default: AES-256-CBC)
+            chunk_size: Bytes read and encrypted per iteration; the segment
+                size for AES-256-GCM
+            threads: Worker threads used to seal AES-256-GCM segments and
+                hash integrity tree chunks
+        
         Returns:
             Dictionary with encryption metadata
         """
         try:
-            # Read model file
-            with open(model_path, 'rb') as f:
-                model_data = f.read()
-            
-            original_size = len(model_data)
-            original_hash = hashlib.sha256(model_data).hexdigest()
+            if algorithm not in SUPPORTED_ALGORITHMS:
+                raise ValueError(f"Unsupported algorithm: {algorithm}")
+            if chunk_size <= 0:
+                raise ValueError(f"Chunk size must be positive: {chunk_size}")
             
-            logger.info(f"Encrypting model: {model_path}")
-            logger.info(f"Original size: {original_size} bytes")
-            logger.info(f"Original hash: {original_hash}")
+            # Index safetensors tensors so loaders can decrypt them one by one;
+            # this also rejects a malformed file now rather than at load time
+            model_format = detect_model_format(os.path.basename(model_path))
+            tensor_index = None
+            if model_format == FORMAT_SAFETENSORS:
+                tensor_index = safetensors_tensor_index(model_path)
+                logger.info(f"safetensors model with {len(tensor_index)} tensors")
+                if algorithm != "AES-256-GCM":
+                    logger.warning("Per-tensor loading requires AES-256-GCM; the tensor index is informational")
             
-            # Generate data encryption key
-            dek = self.generate_data_key()
-            
-            # Encrypt DEK with Key Vault key
-            encrypted_dek = self.encrypt_data_key(dek)
-            
-            # Generate random IV
-            iv = secrets.token_bytes(16)
-            
-            # Add PKCS7 padding
-            padder = padding.PKCS7(128).padder()
-            padded_data = padder.update(model_data) + padder.finalize()
-            
-            # Encrypt model data with DEK
-            cipher = Cipher(
-                algorithms.AES(dek),
-                modes.CBC(iv),
-                backend=default_backend()
-            )
-            encryptor = cipher.encryptor()
-            encrypted_data = encryptor.update(padded_data) + encryptor.finalize()
-            
-            # Prepare metadata
-            metadata = {
-                "version": "1.0",
-                "algorithm": algorithm,
-                "key_vault_url": self.keyvault_url,
-                "key_name": self.key_name,
-                "encrypted_dek": base64.b64encode(encrypted_dek).decode('utf-8'),
-                "iv": base64.b64encode(iv).decode('utf-8'),
-                "original_size": original_size,
-                "encrypted_size": len(encrypted_data),
-                "original_hash": original_hash,
-                "model_name": os.path.basename(model_path)
-            }
-            
-            # Write encrypted model
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, 'wb') as f:
-                f.write(encrypted_data)
-            
-            # Write metadata
-            if metadata_path is None:
-                metadata_path = f"{output_path}.metadata.json"
-            
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            # Scratch files to remove if any step up to publishing fails
+            partial_path = None
+            partial_metadata_path = None
+            published = False
+            try:
+                with open(model_path, 'rb') as src:
+                    logger.info(f"Encrypting model: {model_path}")
+                    logger.info(f"Original size: {os.fstat(src.fileno()).st_size} bytes")
+                    
+                    # Generate data encryption key
+                    dek = self.generate_data_key()
+                    
+                    # Encrypt DEK with Key Vault key
+                    encrypted_dek = self.encrypt_data_key(dek)
+                    
+                    # Stream model data through the cipher with DEK into a
+                    # unique temporary file, renamed into place once complete
+                    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                    partial_path = make_partial_path(output_path)
+                    with open(partial_path, 'wb') as dst:
+                        if algorithm == "AES-256-GCM":
+                            original_size, original_hash, segments, integrity = encrypt_gcm_stream(
+                                src, dst, dek, chunk_size, threads
+                            )
+                            encrypted_size = original_size
+                        else:
+                            # Generate random IV
+                            iv = secrets.token_bytes(16)
+                            original_size, encrypted_size, original_hash, integrity = encrypt_cbc_stream(
+                                src, dst, dek, iv, chunk_size
+                            )
+                
+                logger.info(f"Original hash: {original_hash}")
+                
+                # Prepare metadata
+                metadata = {
+                    "version": SUPPORTED_ALGORITHMS[algorithm],
+                    "algorithm": algorithm,
+                    "key_vault_url": self.keyvault_url,
+                    "key_name": self.key_name,
+                    # Unwrapping pins this version, so the key can rotate
+                    "key_version": self._get_key().properties.version,
+                    "encrypted_dek": base64.b64encode(encrypted_dek).decode('utf-8')
+                }
+                if algorithm == "AES-256-GCM":
+                    metadata["segment_size"] = chunk_size
+                    metadata["segments"] = segments
+                else:
+                    metadata["iv"] = base64.b64encode(iv).decode('utf-8')
+                metadata.update({
+                    "original_size": original_size,
+                    "encrypted_size": encrypted_size,
+                    "original_hash": original_hash,
+                    "model_name": os.path.basename(model_path),
+                    "model_format": model_format,
+                    "integrity": integrity
+                })
+                if tensor_index is not None:
+                    metadata["tensors"] = tensor_index
+                
+                # Write metadata
+                if metadata_path is None:
+                    metadata_path = f"{output_path}.metadata.json"
+                
+                partial_metadata_path = make_partial_path(metadata_path)
+                with open(partial_metadata_path, 'w') as f:
+                    json.dump(metadata, f, indent=2)
+                
+                # Publish the ciphertext before its metadata so a reader never
+                # pairs new metadata with a stale or partial ciphertext
+                os.replace(partial_path, output_path)
+                published = True
+                os.replace(partial_metadata_path, metadata_path)
+            except Exception:
+                for path in (partial_path, partial_metadata_path):
+                    if path and os.path.exists(path):
+                        os.remove(path)
+                if published:
+                    # Never leave the new ciphertext next to metadata for the old one
+                    os.remove(output_path)
+                raise
             
             logger.info(f"Successfully encrypted model to: {output_path}")
             logger.info(f"Metadata saved to: {metadata_path}")
             
             return metadata
-            
+        
         except Exception as e:
             logger.error(f"Failed to encrypt model: {e}")
             raise
@@ -186,53 +445,93 @@ class ModelEncryptor:
         self,
         model_dir: str,
         output_dir: str,
-        pattern: str = "*.pt"
+        pattern: str = "*.pt",
+        algorithm: str = "AES-256-CBC",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        threads: int = DEFAULT_THREADS,
+        workers: int = 1,
+        manifest_path: Optional[str] = None,
+        force: bool = False
     ) -> Dict[str, Any]:
         """
         Encrypt multiple model files in a directory.
         
+        Files are encrypted concurrently on `workers` threads; each writes to
+        its own temporary file that is renamed into place when complete.
+        Completed files are recorded in a manifest, and files whose content
+        and output are unchanged since the last run are skipped.
+        
         Args:
             model_dir: Directory containing models to encrypt
             output_dir: Directory to save encrypted models
             pattern: File pattern to match
-            
+            algorithm: Encryption algorithm, AES-256-CBC or AES-256-GCM
+            chunk_size: Bytes read and encrypted per iteration
+            threads: Worker threads used to seal AES-256-GCM segments and
+                hash integrity tree chunks
+            workers: Number of files encrypted concurrently
+            manifest_path: Manifest file (default: MANIFEST_NAME in output_dir)
+            force: Re-encrypt every file even if the manifest is current
+        
         Returns:
-            Dictionary with batch encryption results
+            Dictionary with batch encryption results, per-file timings and
+            aggregate throughput
         """
-        model_files = list(Path(model_dir).glob(pattern))
-        results = {
-            "total": len(model_files),
-            "successful": 0,
-            "failed": 0,
-            "details": []
-        }
-        
-        for model_file in model_files:
+        if manifest_path is None:
+            manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        manifest = EncryptionManifest(manifest_path)
+        
+        def encrypt_one(model_file: Path) -> Dict[str, Any]:
             try:
                 output_name = f"{model_file.name}.encrypted"
                 output_path = os.path.join(output_dir, output_name)
+                metadata_path = f"{output_path}.metadata.json"
                 
+                if not force and manifest.is_current(
+                    str(model_file), output_path, algorithm, self.key_name
+                ):
+                    logger.info(f"Skipping unchanged model: {model_file}")
+                    return {
+                        "file": str(model_file),
+                        "status": "skipped",
+                        "output": output_path
+                    }
+                
+                stat = os.stat(model_file)
                 metadata = self.encrypt_model_file(
                     str(model_file),
-                    output_path
+                    output_path,
+                    metadata_path=metadata_path,
+                    algorithm=algorithm,
+                    chunk_size=chunk_size,
+                    threads=threads
                 )
+                manifest.record(str(model_file), stat, output_path, metadata_path, metadata)
                 
-                results["successful"] += 1
-                results["details"].append({
+                return {
                     "file": str(model_file),
                     "status": "success",
                     "output": output_path,
+                    "bytes": metadata["original_size"],
                     "metadata": metadata
-                })
-                
+                }
+            
             except Exception as e:
-                results["failed"] += 1
-                results["details"].append({
+                logger.error(f"Failed to encrypt {model_file}: {e}")
+                return {
                     "file": str(model_file),
                     "status": "failed",
                     "error": str(e)
-                })
-                logger.error(f"Failed to encrypt {model_file}: {e}")
+                }
+        
+        model_files = list(Path(model_dir).glob(pattern))
+        results = run_batch(encrypt_one, model_files, workers)
+        
+        logger.info(
+            f"Encrypted {results['successful']}/{results['total']} models "
+            f"({results['skipped']} unchanged) in "
+            f"{results['elapsed_seconds']}s ({results['mb_per_second']} MB/s)"
+        )
         
         return results
 
@@ -247,8 +546,45 @@ def main():
     parser.add_argument("--model", required=True, help="Path to model file to encrypt")
     parser.add_argument("--output", required=True, help="Path to save encrypted model")
     parser.add_argument("--metadata", help="Path to save encryption metadata")
-    parser.add_argument("--algorithm", default="AES-256-CBC", help="Encryption algorithm")
+    parser.add_argument(
+        "--algorithm",
+        default="AES-256-CBC",
+        choices=sorted(SUPPORTED_ALGORITHMS),
+        help="Encryption algorithm (AES-256-GCM writes the segmented v2 format)"
+    )
     parser.add_argument("--batch", action="store_true", help="Batch encrypt directory")
+    parser.add_argument(
+        "--pattern",
+        default="*.pt",
+        help='File pattern to encrypt in batch mode (e.g. "*.safetensors")'
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Bytes read and encrypted per iteration; peak memory is about chunk size x threads"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=DEFAULT_THREADS,
+        help="Threads used to encrypt AES-256-GCM segments and hash integrity chunks"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of files encrypted concurrently in batch mode"
+    )
+    parser.add_argument(
+        "--manifest",
+        help=f"Batch manifest used to skip unchanged models (default: <output>/{MANIFEST_NAME})"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-encrypt every model in batch mode, ignoring the manifest"
+    )
     
     args = parser.parse_args()
     
@@ -261,7 +597,14 @@ def main():
         if args.batch:
             results = encryptor.batch_encrypt_models(
                 model_dir=args.model,
-                output_dir=args.output
+                output_dir=args.output,
+                pattern=args.pattern,
+                algorithm=args.algorithm,
+                chunk_size=args.chunk_size,
+                threads=args.threads,
+                workers=args.workers,
+                manifest_path=args.manifest,
+                force=args.force
             )
             print(json.dumps(results, indent=2))
         else:
@@ -269,12 +612,14 @@ def main():
                 model_path=args.model,
                 output_path=args.output,
                 metadata_path=args.metadata,
-                algorithm=args.algorithm
+                algorithm=args.algorithm,
+                chunk_size=args.chunk_size,
+                threads=args.threads
             )
             print(json.dumps(metadata, indent=2))
         
         sys.exit(0)
-        
+    
     except Exception as e:
         logger.error(f"Encryption failed: {e}")
         sys.exit(1)
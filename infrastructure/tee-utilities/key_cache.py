@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Key and Secret Cache for TEE Workloads
+Entry-bounded LRU cache of Key Vault material with per-entry TTL and
+stale-while-revalidate refresh, so hot paths do not wait on Key Vault while
+rotated keys and secrets still propagate within a bounded window, plus a
+short-lived cache of unwrapped data encryption keys.
+"""
+
+import time
+import hashlib
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fetch functions return (value, version)
+Fetch = Callable[[], Tuple[Any, Optional[str]]]
+AsyncFetch = Callable[[], Awaitable[Tuple[Any, Optional[str]]]]
+
+_FRESH = "fresh"
+_STALE = "stale"
+
+# Result of a fetch whose task was cancelled by its event loop; callers
+# waiting on it claim the fetch again
+_ABANDONED = object()
+
+
+class KeyCache:
+    """Least-recently-used cache of Key Vault keys and secrets with expiry."""
+    
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        stale_seconds: float = 300.0,
+        max_entries: int = 256
+    ):
+        """
+        Initialize the key cache.
+        
+        An entry is fresh for ttl_seconds after it was fetched. For a further
+        stale_seconds it is still returned, but the first lookup starts a
+        background refresh; after that it is fetched again before returning.
+        Material is therefore never served more than ttl_seconds +
+        stale_seconds after it was read from Key Vault.
+        
+        Args:
+            ttl_seconds: Default time an entry is served without a refresh
+            stale_seconds: Time past the TTL an entry is served while it is
+                refreshed in the background
+            max_entries: Number of entries kept
+        """
+        if ttl_seconds < 0 or stale_seconds < 0:
+            raise ValueError(f"Cache lifetimes must not be negative: {ttl_seconds}, {stale_seconds}")
+        if max_entries <= 0:
+            raise ValueError(f"Cache size must be positive: {max_entries}")
+        
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        
+        # name -> (value, version, fetched at, ttl), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # name -> future of the fetch in flight for it
+        self._inflight: Dict[str, Future] = {}
+        # Background refreshes started from an event loop
+        self._tasks: Set[asyncio.Task] = set()
+        # Bumped by clear() so fetches started before it are not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.rotations = 0
+        self.evictions = 0
+    
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._entries
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+    
+    def get(
+        self,
+        name: str,
+        fetch: Fetch,
+        force: bool = False,
+        ttl: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Look up an entry, fetching it if it is missing or expired.
+        
+        Concurrent fetches of the same name are coalesced into one call.
+        
+        Args:
+            name: Cache key
+            fetch: Reads the current (value, version) from Key Vault
+            force: Fetch even if a usable entry is cached
+            ttl: Lifetime of the fetched entry (default: ttl_seconds);
+                pass math.inf for immutable material such as a pinned version
+            timeout: Seconds to wait for a fetch started by another caller
+                (default: no limit); bound an owned fetch in fetch itself
+        
+        Returns:
+            Cached or fetched value
+        
+        Raises:
+            TimeoutError: If another caller's fetch does not finish in time
+        """
+        if not force:
+            value, state = self._lookup(name)
+            if state == _FRESH:
+                return value
+            if state == _STALE:
+                future, owner, generation = self._claim(name)
+                if owner:
+                    threading.Thread(
+                        target=self._fetch,
+                        args=(name, fetch, future, generation, ttl, True),
+                        name=f"key-cache-refresh-{name}",
+                        daemon=True
+                    ).start()
+                return value
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            future, owner, generation = self._claim(name)
+            if owner:
+                self._fetch(name, fetch, future, generation, ttl)
+            try:
+                value = future.result(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                if future.done():
+                    raise
+                raise TimeoutError(f"Timed out after {timeout}s waiting for {name}") from None
+            if value is not _ABANDONED:
+                return value
+    
+    async def get_async(
+        self,
+        name: str,
+        fetch: AsyncFetch,
+        force: bool = False,
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Look up an entry without blocking the event loop.
+        
+        Shares entries and in-flight fetches with get. The fetch runs as
+        its own task, so cancelling the caller that started it does not fail
+        the other callers waiting on it.
+        
+        Args:
+            name: Cache key
+            fetch: Coroutine function reading the current (value, version)
+            force: Fetch even if a usable entry is cached
+            ttl: Lifetime of the fetched entry (default: ttl_seconds)
+        
+        Returns:
+            Cached or fetched value
+        """
+        if not force:
+            value, state = self._lookup(name)
+            if state == _FRESH:
+                return value
+            if state == _STALE:
+                future, owner, generation = self._claim(name)
+                if owner:
+                    self._start_task(self._fetch_async(name, fetch, future, generation, ttl, True))
+                return value
+        
+        while True:
+            future, owner, generation = self._claim(name)
+            if owner:
+                self._start_task(self._fetch_async(name, fetch, future, generation, ttl))
+            value = await asyncio.shield(asyncio.wrap_future(future))
+            if value is not _ABANDONED:
+                return value
+    
+    def _start_task(self, fetch: Awaitable[None]):
+        """Run a claimed fetch as a task of the running event loop."""
+        task = asyncio.get_running_loop().create_task(fetch)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def wait_refreshes(self):
+        """Wait for background refreshes started from the running event loop."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+    
+    def _lookup(self, name: str) -> Tuple[Any, Optional[str]]:
+        """Find an entry and classify it as fresh, stale or unusable (None)."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            
+            value, _, fetched_at, ttl = entry
+            age = time.monotonic() - fetched_at
+            if age < ttl:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return value, _FRESH
+            if age < ttl + self.stale_seconds:
+                self._entries.move_to_end(name)
+                self.stale_hits += 1
+                return value, _STALE
+            
+            self.misses += 1
+            return None, None
+    
+    def _claim(self, name: str) -> Tuple[Future, bool, int]:
+        """Join the fetch in flight for name, or register a new one (owner=True)."""
+        with self._lock:
+            future = self._inflight.get(name)
+            if future is not None:
+                return future, False, self._generation
+            
+            future = Future()
+            # A running future cannot be cancelled by one of its waiters
+            future.set_running_or_notify_cancel()
+            self._inflight[name] = future
+            return future, True, self._generation
+    
+    def _fetch(
+        self,
+        name: str,
+        fetch: Fetch,
+        future: Future,
+        generation: int,
+        ttl: Optional[float],
+        background: bool = False
+    ):
+        """Run a claimed fetch and publish its outcome."""
+        try:
+            value, version = fetch()
+        except BaseException as e:
+            self._finish(name, future, background, error=e)
+            return
+        self._finish(name, future, background, value=value, version=version, generation=generation, ttl=ttl)
+    
+    async def _fetch_async(
+        self,
+        name: str,
+        fetch: AsyncFetch,
+        future: Future,
+        generation: int,
+        ttl: Optional[float],
+        background: bool = False
+    ):
+        """Run a claimed fetch from the event loop and publish its outcome."""
+        try:
+            value, version = await fetch()
+        except asyncio.CancelledError:
+            # Only the event loop cancels the task (e.g. on shutdown), which
+            # is no fetch error for the callers waiting on it
+            self._finish(name, future, background, value=_ABANDONED)
+            raise
+        except BaseException as e:
+            self._finish(name, future, background, error=e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        self._finish(name, future, background, value=value, version=version, generation=generation, ttl=ttl)
+    
+    def _finish(
+        self,
+        name: str,
+        future: Future,
+        background: bool,
+        value: Any = None,
+        version: Optional[str] = None,
+        generation: int = 0,
+        ttl: Optional[float] = None,
+        error: Optional[BaseException] = None
+    ):
+        """Store a fetched entry, release the claim and resolve waiters."""
+        with self._lock:
+            if background:
+                self.refreshes += 1
+            
+            if error is not None:
+                if background:
+                    self.refresh_failures += 1
+            elif value is not _ABANDONED and generation == self._generation:
+                self._store(name, value, version, ttl)
+            
+            self._inflight.pop(name, None)
+        
+        if error is not None:
+            if background:
+                logger.warning(f"Background refresh of {name} failed, serving cached copy: {error}")
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+    
+    def _store(self, name: str, value: Any, version: Optional[str], ttl: Optional[float]):
+        """Insert an entry and evict the least recently used over the bound (lock held)."""
+        previous = self._entries.pop(name, None)
+        if previous is not None and version and previous[1] and version != previous[1]:
+            self.rotations += 1
+            logger.info(f"{name} rotated from version {previous[1]} to {version}")
+        
+        ttl = self.ttl_seconds if ttl is None else ttl
+        self._entries[name] = (value, version, time.monotonic(), ttl)
+        
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            logger.debug(f"Evicted from key cache: {evicted}")
+    
+    def version(self, name: str) -> Optional[str]:
+        """
+        Get the version of a cached entry.
+        
+        Args:
+            name: Cache key
+        
+        Returns:
+            Key Vault version of the cached material, or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry[1] if entry is not None else None
+    
+    def invalidate(self, name: str) -> bool:
+        """
+        Drop one entry so the next lookup fetches it.
+        
+        Args:
+            name: Cache key
+        
+        Returns:
+            True if the entry was cached
+        """
+        with self._lock:
+            return self._entries.pop(name, None) is not None
+    
+    def clear(self):
+        """Drop every entry; fetches already in flight are not stored."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters and occupancy.
+        
+        Returns:
+            Dictionary with hit/miss/refresh/rotation counters and entry count
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "rotations": self.rotations,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "stale_seconds": self.stale_seconds
+            }
+
+
+def _zeroise(buffer: bytearray):
+    """Overwrite a key buffer in place."""
+    buffer[:] = bytes(len(buffer))
+
+
+class DataKeyCache:
+    """Short-lived LRU cache of unwrapped data encryption keys."""
+    
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 64):
+        """
+        Initialize the data key cache.
+        
+        Entries are keyed by a hash of the wrapping key name and the wrapped
+        key, so the wrapped form is not retained. Expired entries are dropped
+        on the next access; a TTL or size of 0 disables caching.
+        
+        The cache overwrites its own buffer when an entry is dropped. This
+        only limits how long that one copy lives: keys returned by get, and
+        the copies made by callers and the cipher library, are ordinary
+        bytes objects that Python does not wipe.
+        
+        Args:
+            ttl_seconds: Time an unwrapped key is kept
+            max_entries: Number of unwrapped keys kept
+        """
+        if ttl_seconds < 0 or max_entries < 0:
+            raise ValueError(f"Cache lifetime and size must not be negative: {ttl_seconds}, {max_entries}")
+        
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        
+        # digest -> (key bytes, cached at), least recently used first
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether keys are cached at all."""
+        return self.ttl_seconds > 0 and self.max_entries > 0
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+    
+    @staticmethod
+    def _digest(key_name: str, wrapped: bytes) -> bytes:
+        return hashlib.sha256(key_name.encode() + b"\0" + wrapped).digest()
+    
+    def get(self, key_name: str, wrapped: bytes) -> Optional[bytes]:
+        """
+        Look up an unwrapped key.
+        
+        Args:
+            key_name: Key Vault key the data key was wrapped with
+            wrapped: Wrapped data key
+        
+        Returns:
+            Copy of the unwrapped key, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        
+        digest = self._digest(key_name, wrapped)
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            # Copy under the lock: the cached buffer is overwritten on eviction
+            return bytes(entry[0])
+    
+    def put(self, key_name: str, wrapped: bytes, key: bytes):
+        """
+        Cache an unwrapped key, evicting the least recently used over the bound.
+        
+        Args:
+            key_name: Key Vault key the data key was wrapped with
+            wrapped: Wrapped data key
+            key: Unwrapped data key; the cache keeps its own copy
+        """
+        if not self.enabled:
+            return
+        
+        digest = self._digest(key_name, wrapped)
+        with self._lock:
+            self._drop(digest)
+            self._entries[digest] = (bytearray(key), time.monotonic())
+            
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            self._purge_expired()
+    
+    def _drop(self, digest: bytes):
+        """Remove one entry, overwriting its buffer (lock held)."""
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            _zeroise(entry[0])
+    
+    def _purge_expired(self):
+        """Drop entries older than the TTL (lock held)."""
+        deadline = time.monotonic() - self.ttl_seconds
+        expired = [digest for digest, (_, cached_at) in self._entries.items() if cached_at <= deadline]
+        for digest in expired:
+            self._drop(digest)
+    
+    def clear(self):
+        """Drop every cached key."""
+        with self._lock:
+            for digest in list(self._entries):
+                self._drop(digest)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters and occupancy.
+        
+        Returns:
+            Dictionary with hit/miss/eviction counters and entry count
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds
+            }
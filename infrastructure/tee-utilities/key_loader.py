@@ -7,15 +7,47 @@ Handles secure key retrieval from Azure Key Vault with attestation support.
 import os
 import sys
 import json
+import io
+import fcntl
+import math
 import base64
+import asyncio
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any
-from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
-from azure.keyvault.keys import KeyClient
-from azure.keyvault.secrets import SecretClient
 from azure.keyvault.keys.crypto import CryptographyClient, EncryptionAlgorithm
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
+from azure.identity.aio import (
+    DefaultAzureCredential as AsyncDefaultAzureCredential,
+    ManagedIdentityCredential as AsyncManagedIdentityCredential
+)
+from azure.keyvault.keys.aio import KeyClient as AsyncKeyClient
+from azure.keyvault.secrets.aio import SecretClient as AsyncSecretClient
+from azure.keyvault.keys.crypto.aio import CryptographyClient as AsyncCryptographyClient
+from key_cache import DataKeyCache, KeyCache
+from keyvault_clients import (
+    CLIENT_OPTIONS,
+    CREDENTIAL_DEFAULT,
+    CREDENTIAL_MANAGED_IDENTITY,
+    MAX_CRYPTO_CLIENTS,
+    get_credential,
+    get_key_client,
+    get_limiter,
+    get_secret_client
+)
+from model_crypto import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_THREADS,
+    decrypt_file,
+    decrypt_gcm_range,
+    decrypt_gcm_range_into,
+    decrypt_stream,
+    decrypt_to_memory,
+    has_integrity_tree,
+    is_segmented,
+    verify_plaintext
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,7 +63,12 @@ class KeyLoader:
         self,
         keyvault_url: Optional[str] = None,
         use_managed_identity: bool = True,
-        attestation_token: Optional[str] = None
+        attestation_token: Optional[str] = None,
+        cache_ttl_seconds: Optional[float] = None,
+        cache_stale_seconds: Optional[float] = None,
+        cache_max_entries: Optional[int] = None,
+        dek_cache_ttl_seconds: Optional[float] = None,
+        dek_cache_max_entries: Optional[int] = None
     ):
         """
         Initialize key loader.
@@ -40,106 +77,193 @@ class KeyLoader:
             keyvault_url: Azure Key Vault URL
             use_managed_identity: Use managed identity credential
             attestation_token: TEE attestation token
+            cache_ttl_seconds: Time a cached key or secret is used before it
+                is refreshed (default: env KEY_CACHE_TTL_SECONDS, else 300)
+            cache_stale_seconds: Time past the TTL a cached key or secret is
+                still returned while it is refreshed in the background
+                (default: env KEY_CACHE_STALE_SECONDS, else 300)
+            cache_max_entries: Number of keys and secrets cached (default:
+                env KEY_CACHE_MAX_ENTRIES, else 256)
+            dek_cache_ttl_seconds: Time an unwrapped model data key is kept
+                so reloads skip the Key Vault unwrap; 0 disables (default:
+                env DEK_CACHE_TTL_SECONDS, else 300)
+            dek_cache_max_entries: Number of unwrapped data keys kept
+                (default: env DEK_CACHE_MAX_ENTRIES, else 64)
         """
         self.keyvault_url = keyvault_url or os.getenv("KEYVAULT_URL")
         if not self.keyvault_url:
             raise ValueError("Key Vault URL not provided")
         
         self.attestation_token = attestation_token
+        self.use_managed_identity = use_managed_identity
+        
+        # Credential and Key Vault clients are shared by every loader in the
+        # process, so tokens and connections are reused
+        credential_type = CREDENTIAL_MANAGED_IDENTITY if use_managed_identity else CREDENTIAL_DEFAULT
+        self.credential = get_credential(credential_type)
+        self.key_client = get_key_client(self.keyvault_url, credential_type)
+        self.secret_client = get_secret_client(self.keyvault_url, credential_type)
         
-        # Initialize credential
-        if use_managed_identity:
-            self.credential = ManagedIdentityCredential()
-        else:
-            self.credential = DefaultAzureCredential()
+        # Every Key Vault call backs off through the vault's shared limiter
+        self._limiter = get_limiter(self.keyvault_url)
         
-        # Initialize Key Vault clients
-        self.key_client = KeyClient(
-            vault_url=self.keyvault_url,
-            credential=self.credential
+        # Cache for loaded keys; rotated material is picked up within
+        # cache_ttl_seconds + cache_stale_seconds
+        if cache_ttl_seconds is None:
+            cache_ttl_seconds = float(os.getenv("KEY_CACHE_TTL_SECONDS", "300"))
+        if cache_stale_seconds is None:
+            cache_stale_seconds = float(os.getenv("KEY_CACHE_STALE_SECONDS", "300"))
+        if cache_max_entries is None:
+            cache_max_entries = int(os.getenv("KEY_CACHE_MAX_ENTRIES", "256"))
+        self._key_cache = KeyCache(
+            ttl_seconds=cache_ttl_seconds,
+            stale_seconds=cache_stale_seconds,
+            max_entries=cache_max_entries
         )
         
-        self.secret_client = SecretClient(
-            vault_url=self.keyvault_url,
-            credential=self.credential
+        # Unwrapped model data keys; the cache overwrites its own copy of a
+        # key when dropping it
+        if dek_cache_ttl_seconds is None:
+            dek_cache_ttl_seconds = float(os.getenv("DEK_CACHE_TTL_SECONDS", "300"))
+        if dek_cache_max_entries is None:
+            dek_cache_max_entries = int(os.getenv("DEK_CACHE_MAX_ENTRIES", "64"))
+        self._dek_cache = DataKeyCache(
+            ttl_seconds=dek_cache_ttl_seconds,
+            max_entries=dek_cache_max_entries
         )
         
-        # Cache for loaded keys
-        self._key_cache: Dict[str, Any] = {}
+        # Cryptography clients by key id (name and version), least recently
+        # used first
+        self._crypto_clients: "OrderedDict[str, CryptographyClient]" = OrderedDict()
+        self._crypto_lock = threading.Lock()
+        
+        # asyncio clients, created on first use inside the running event loop
+        self._async_credential = None
+        self._async_key_client = None
+        self._async_secret_client = None
+        self._async_crypto_clients: "OrderedDict[str, AsyncCryptographyClient]" = OrderedDict()
         
         logger.info(f"KeyLoader initialized with vault: {self.keyvault_url}")
     
-    def get_key(self, key_name: str, use_cache: bool = True) -> Any:
+    @staticmethod
+    def _cache_entry(name: str, version: Optional[str]):
+        """Get the cache key and TTL for a key or secret, pinned to a version or not."""
+        if version:
+            # A specific version never changes, so it does not expire
+            return f"{name}/{version}", math.inf
+        return name, None
+    
+    def get_key(self, key_name: str, use_cache: bool = True, version: Optional[str] = None) -> Any:
         """
         Retrieve a key from Key Vault.
         
+        A cached key is returned without a Key Vault call; once it is older
+        than the cache TTL it is refreshed in the background, so a rotated
+        key is picked up without blocking callers.
+        
         Args:
             key_name: Name of the key
-            use_cache: Use cached key if available
-            
+            use_cache: Use cached key if available; if False the key is
+                fetched and the cache updated
+            version: Specific key version (default: current version)
+        
         Returns:
             Key object
         """
         try:
-            if use_cache and key_name in self._key_cache:
-                logger.debug(f"Returning cached key: {key_name}")
-                return self._key_cache[key_name]
-            
-            logger.info(f"Retrieving key: {key_name}")
-            key = self.key_client.get_key(key_name)
-            
-            if use_cache:
-                self._key_cache[key_name] = key
-            
-            return key
-            
+            cache_key, ttl = self._cache_entry(key_name, version)
+            return self._key_cache.get(
+                cache_key,
+                lambda: self._fetch_key(key_name, version),
+                force=not use_cache,
+                ttl=ttl
+            )
+        
         except Exception as e:
             logger.error(f"Failed to retrieve key {key_name}: {e}")
             raise
     
-    def get_secret(self, secret_name: str, use_cache: bool = True) -> str:
+    def get_secret(
+        self,
+        secret_name: str,
+        use_cache: bool = True,
+        version: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> str:
         """
         Retrieve a secret from Key Vault.
         
+        Cached secrets are refreshed in the background like keys (see get_key).
+        
         Args:
             secret_name: Name of the secret
-            use_cache: Use cached secret if available
-            
+            use_cache: Use cached secret if available; if False the secret
+                is fetched and the cache updated
+            version: Specific secret version (default: current version)
+            timeout: Seconds allowed for the Key Vault request, including
+                throttling waits and retries, or for the wait when another
+                caller is already fetching the secret (default: no limit)
+        
         Returns:
             Secret value
         """
         try:
-            cache_key = f"secret:{secret_name}"
-            
-            if use_cache and cache_key in self._key_cache:
-                logger.debug(f"Returning cached secret: {secret_name}")
-                return self._key_cache[cache_key]
-            
-            logger.info(f"Retrieving secret: {secret_name}")
-            secret = self.secret_client.get_secret(secret_name)
-            
-            if use_cache:
-                self._key_cache[cache_key] = secret.value
-            
-            return secret.value
-            
+            cache_key, ttl = self._cache_entry(f"secret:{secret_name}", version)
+            return self._key_cache.get(
+                cache_key,
+                lambda: self._fetch_secret(secret_name, version, timeout),
+                force=not use_cache,
+                ttl=ttl,
+                timeout=timeout
+            )
+        
         except Exception as e:
             logger.error(f"Failed to retrieve secret {secret_name}: {e}")
             raise
     
-    def get_crypto_client(self, key_name: str) -> CryptographyClient:
+    def _fetch_key(self, key_name: str, version: Optional[str] = None):
+        """Read a key from Key Vault as a (key, version) cache entry."""
+        logger.info(f"Retrieving key: {key_name}")
+        key = self._limiter.call(self.key_client.get_key, key_name, version=version)
+        return key, key.properties.version
+    
+    def _fetch_secret(self, secret_name: str, version: Optional[str] = None, timeout: Optional[float] = None):
+        """Read a secret from Key Vault as a (value, version) cache entry."""
+        logger.info(f"Retrieving secret: {secret_name}")
+        # The limiter stops waiting and retrying at the timeout and gives each
+        # SDK attempt only the time left
+        secret = self._limiter.call(
+            self.secret_client.get_secret, secret_name, version=version, timeout=timeout
+        )
+        return secret.value, secret.properties.version
+    
+    def get_crypto_client(self, key_name: str, version: Optional[str] = None) -> CryptographyClient:
         """
         Get cryptography client for a key.
         
+        Clients are cached per key version, so a rotated key gets a new
+        client once the key cache picks up the new version. At most
+        MAX_CRYPTO_CLIENTS are kept, least recently used dropped first.
+        
         Args:
             key_name: Name of the key
-            
+            version: Specific key version (default: current version)
+        
         Returns:
             CryptographyClient instance
         """
         try:
-            key = self.get_key(key_name)
-            return CryptographyClient(key, credential=self.credential)
+            key = self.get_key(key_name, version=version)
+            with self._crypto_lock:
+                client = self._crypto_clients.get(key.id)
+                if client is None:
+                    client = CryptographyClient(key, credential=self.credential, **CLIENT_OPTIONS)
+                    self._crypto_clients[key.id] = client
+                    while len(self._crypto_clients) > MAX_CRYPTO_CLIENTS:
+                        self._crypto_clients.popitem(last=False)
+                else:
+                    self._crypto_clients.move_to_end(key.id)
+                return client
         except Exception as e:
             logger.error(f"Failed to create crypto client for {key_name}: {e}")
             raise
@@ -148,7 +272,8 @@ class KeyLoader:
         self,
         key_name: str,
         encrypted_data: bytes,
-        algorithm: EncryptionAlgorithm = EncryptionAlgorithm.rsa_oaep_256
+        algorithm: EncryptionAlgorithm = EncryptionAlgorithm.rsa_oaep_256,
+        version: Optional[str] = None
     ) -> bytes:
         """
         Decrypt data using Key Vault key.
@@ -157,92 +282,589 @@ class KeyLoader:
             key_name: Name of the encryption key
             encrypted_data: Data to decrypt
             algorithm: Encryption algorithm
-            
+            version: Key version the data was encrypted with (default:
+                current version)
+        
         Returns:
             Decrypted data
         """
         try:
-            crypto_client = self.get_crypto_client(key_name)
-            result = crypto_client.decrypt(algorithm, encrypted_data)
+            crypto_client = self.get_crypto_client(key_name, version=version)
+            result = self._limiter.call(crypto_client.decrypt, algorithm, encrypted_data)
             logger.info(f"Successfully decrypted data with key: {key_name}")
             return result.plaintext
+        
+        except Exception as e:
+            logger.error(f"Failed to decrypt data: {e}")
+            raise
+    
+    def _get_async_clients(self):
+        """Get or create the asyncio credential and Key Vault clients."""
+        if self._async_credential is None:
+            if self.use_managed_identity:
+                self._async_credential = AsyncManagedIdentityCredential()
+            else:
+                self._async_credential = AsyncDefaultAzureCredential()
+            
+            self._async_key_client = AsyncKeyClient(
+                vault_url=self.keyvault_url,
+                credential=self._async_credential,
+                **CLIENT_OPTIONS
+            )
+            self._async_secret_client = AsyncSecretClient(
+                vault_url=self.keyvault_url,
+                credential=self._async_credential,
+                **CLIENT_OPTIONS
+            )
+        
+        return self._async_key_client, self._async_secret_client
+    
+    async def get_key_async(
+        self,
+        key_name: str,
+        use_cache: bool = True,
+        version: Optional[str] = None
+    ) -> Any:
+        """
+        Retrieve a key from Key Vault without blocking the event loop.
+        
+        Shares its cache with get_key.
+        
+        Args:
+            key_name: Name of the key
+            use_cache: Use cached key if available; if False the key is
+                fetched and the cache updated
+            version: Specific key version (default: current version)
+        
+        Returns:
+            Key object
+        """
+        try:
+            cache_key, ttl = self._cache_entry(key_name, version)
+            return await self._key_cache.get_async(
+                cache_key,
+                lambda: self._fetch_key_async(key_name, version),
+                force=not use_cache,
+                ttl=ttl
+            )
+        
+        except Exception as e:
+            logger.error(f"Failed to retrieve key {key_name}: {e}")
+            raise
+    
+    async def get_secret_async(
+        self,
+        secret_name: str,
+        use_cache: bool = True,
+        version: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Retrieve a secret from Key Vault without blocking the event loop.
+        
+        Shares its cache with get_secret.
+        
+        Args:
+            secret_name: Name of the secret
+            use_cache: Use cached secret if available; if False the secret
+                is fetched and the cache updated
+            version: Specific secret version (default: current version)
+            timeout: Seconds allowed for a Key Vault request this call
+                starts, including throttling waits and retries (default: no
+                limit); wrap the call in asyncio.wait_for to bound the wait
+        
+        Returns:
+            Secret value
+        """
+        try:
+            cache_key, ttl = self._cache_entry(f"secret:{secret_name}", version)
+            return await self._key_cache.get_async(
+                cache_key,
+                lambda: self._fetch_secret_async(secret_name, version, timeout),
+                force=not use_cache,
+                ttl=ttl
+            )
+        
+        except Exception as e:
+            logger.error(f"Failed to retrieve secret {secret_name}: {e}")
+            raise
+    
+    async def _fetch_key_async(self, key_name: str, version: Optional[str] = None):
+        """Read a key from Key Vault as a (key, version) cache entry asynchronously."""
+        logger.info(f"Retrieving key: {key_name}")
+        key_client, _ = self._get_async_clients()
+        key = await self._limiter.call_async(key_client.get_key, key_name, version=version)
+        return key, key.properties.version
+    
+    async def _fetch_secret_async(
+        self,
+        secret_name: str,
+        version: Optional[str] = None,
+        timeout: Optional[float] = None
+    ):
+        """Read a secret from Key Vault as a (value, version) cache entry asynchronously."""
+        logger.info(f"Retrieving secret: {secret_name}")
+        _, secret_client = self._get_async_clients()
+        secret = await self._limiter.call_async(
+            secret_client.get_secret, secret_name, version=version, timeout=timeout
+        )
+        return secret.value, secret.properties.version
+    
+    async def decrypt_data_async(
+        self,
+        key_name: str,
+        encrypted_data: bytes,
+        algorithm: EncryptionAlgorithm = EncryptionAlgorithm.rsa_oaep_256,
+        version: Optional[str] = None
+    ) -> bytes:
+        """
+        Decrypt data using Key Vault key without blocking the event loop.
+        
+        Args:
+            key_name: Name of the encryption key
+            encrypted_data: Data to decrypt
+            algorithm: Encryption algorithm
+            version: Key version the data was encrypted with (default:
+                current version)
+        
+        Returns:
+            Decrypted data
+        """
+        try:
+            key = await self.get_key_async(key_name, version=version)
+            self._get_async_clients()
             
+            crypto_client = self._async_crypto_clients.get(key.id)
+            if crypto_client is None:
+                crypto_client = AsyncCryptographyClient(key, credential=self._async_credential, **CLIENT_OPTIONS)
+                self._async_crypto_clients[key.id] = crypto_client
+                while len(self._async_crypto_clients) > MAX_CRYPTO_CLIENTS:
+                    _, evicted = self._async_crypto_clients.popitem(last=False)
+                    await evicted.close()
+            else:
+                self._async_crypto_clients.move_to_end(key.id)
+            result = await self._limiter.call_async(crypto_client.decrypt, algorithm, encrypted_data)
+            
+            logger.info(f"Successfully decrypted data with key: {key_name}")
+            return result.plaintext
+        
         except Exception as e:
             logger.error(f"Failed to decrypt data: {e}")
             raise
     
+    async def unwrap_model_key_async(self, metadata: Dict[str, Any]) -> bytes:
+        """
+        Unwrap the data encryption key recorded in model metadata asynchronously.
+        
+        Shares its data key cache with unwrap_model_key.
+        
+        Args:
+            metadata: Encryption metadata
+        
+        Returns:
+            Data encryption key, to pass as `dek` to the decrypt_model methods
+        """
+        key_name = metadata.get("key_name", "tee-model-decryption-key")
+        encrypted_dek = base64.b64decode(metadata["encrypted_dek"])
+        
+        dek = self._dek_cache.get(key_name, encrypted_dek)
+        if dek is None:
+            dek = await self.decrypt_data_async(
+                key_name, encrypted_dek, version=metadata.get("key_version")
+            )
+            self._dek_cache.put(key_name, encrypted_dek, dek)
+        return dek
+    
+    async def aclose(self):
+        """Close the asyncio Key Vault clients and credential."""
+        await self._key_cache.wait_refreshes()
+        for crypto_client in self._async_crypto_clients.values():
+            await crypto_client.close()
+        self._async_crypto_clients.clear()
+        if self._async_credential is not None:
+            await self._async_key_client.close()
+            await self._async_secret_client.close()
+            await self._async_credential.close()
+            self._async_credential = None
+            self._async_key_client = None
+            self._async_secret_client = None
+    
+    def unwrap_model_key(self, metadata: Dict[str, Any]) -> bytes:
+        """
+        Unwrap the data encryption key recorded in model metadata.
+        
+        Unwrapped keys are cached briefly by a hash of the wrapped key, so
+        reloading a model, or loading models that share a wrapped key, skips
+        the Key Vault call. The key version recorded at encryption time is
+        used, so models stay loadable after the key rotates; metadata
+        without one falls back to the current version.
+        
+        Args:
+            metadata: Encryption metadata
+        
+        Returns:
+            Data encryption key, to pass as `dek` to the decrypt_model methods
+        """
+        key_name = metadata.get("key_name", "tee-model-decryption-key")
+        encrypted_dek = base64.b64decode(metadata["encrypted_dek"])
+        
+        dek = self._dek_cache.get(key_name, encrypted_dek)
+        if dek is None:
+            dek = self.decrypt_data(key_name, encrypted_dek, version=metadata.get("key_version"))
+            self._dek_cache.put(key_name, encrypted_dek, dek)
+        return dek
+    
     def decrypt_model(
         self,
         encrypted_path: str,
         output_path: str,
-        metadata: Dict[str, Any]
+        metadata: Dict[str, Any],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        threads: int = DEFAULT_THREADS,
+        dek: Optional[bytes] = None
     ) -> bool:
         """
         Decrypt a model file.
         
+        The model is decrypted in chunks, so peak memory is bounded by
+        chunk_size × threads rather than by the size of the model. The container
+        version (v1 AES-CBC or v2 segmented AES-GCM) is read from metadata,
+        and the plaintext is verified before it is renamed into place.
+        
         Args:
             encrypted_path: Path to encrypted model
             output_path: Path to save decrypted model
             metadata: Encryption metadata
-            
+            chunk_size: Bytes read and decrypted per iteration
+            threads: Threads used to decrypt files larger than one chunk
+            dek: Already unwrapped data encryption key (default: unwrap
+                it through Key Vault)
+        
         Returns:
             True if successful
         """
         try:
             # Decrypt data encryption key
-            key_name = metadata.get("key_name", "tee-model-decryption-key")
-            encrypted_dek = base64.b64decode(metadata["encrypted_dek"])
-            dek = self.decrypt_data(key_name, encrypted_dek)
+            if dek is None:
+                dek = self.unwrap_model_key(metadata)
             
-            # Read encrypted model
-            with open(encrypted_path, 'rb') as f:
-                encrypted_data = f.read()
-            
-            # Decrypt model data
-            iv = base64.b64decode(metadata["iv"])
-            cipher = Cipher(
-                algorithms.AES(dek),
-                modes.CBC(iv),
-                backend=default_backend()
+            # Decrypt model data (v1 CBC or v2 segmented GCM) and verify it
+            decrypt_file(
+                encrypted_path,
+                output_path,
+                dek,
+                metadata,
+                verify_hash=True,
+                chunk_size=chunk_size,
+                threads=threads
             )
-            decryptor = cipher.decryptor()
             
-            decrypted_data = decryptor.update(encrypted_data) + decryptor.finalize()
+            logger.info(f"Successfully decrypted model to: {output_path}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to decrypt model: {e}")
+            raise
+    
+    def decrypt_model_to_memory(
+        self,
+        encrypted_path: str,
+        metadata: Dict[str, Any],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        threads: int = DEFAULT_THREADS,
+        dek: Optional[bytes] = None
+    ) -> io.BytesIO:
+        """
+        Decrypt a model file into memory without writing plaintext to disk.
+        
+        Args:
+            encrypted_path: Path to encrypted model
+            metadata: Encryption metadata
+            chunk_size: Bytes read and decrypted per iteration
+            threads: Threads used to decrypt files larger than one chunk
+            dek: Already unwrapped data encryption key (default: unwrap
+                it through Key Vault)
+        
+        Returns:
+            BytesIO holding the decrypted model
+        """
+        try:
+            # Decrypt data encryption key
+            if dek is None:
+                dek = self.unwrap_model_key(metadata)
             
-            # Remove padding
-            padding_length = decrypted_data[-1]
-            decrypted_data = decrypted_data[:-padding_length]
+            # Decrypt model data into a preallocated buffer
+            with open(encrypted_path, 'rb', buffering=0) as f:
+                plaintext = decrypt_to_memory(
+                    f,
+                    dek,
+                    metadata,
+                    chunk_size=chunk_size,
+                    threads=threads,
+                    verify=True
+                )
+            
+            logger.info(f"Successfully decrypted model into memory: {encrypted_path}")
+            return plaintext
+        
+        except Exception as e:
+            logger.error(f"Failed to decrypt model: {e}")
+            raise
+    
+    def decrypt_model_to_memfd(
+        self,
+        encrypted_path: str,
+        metadata: Dict[str, Any],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        threads: int = DEFAULT_THREADS,
+        dek: Optional[bytes] = None
+    ) -> int:
+        """
+        Decrypt a model file into an anonymous, sealed memfd.
+        
+        The plaintext only ever lives in memory, but remains reachable by
+        path through /proc/self/fd/<fd> for loaders that need a filename.
+        
+        Args:
+            encrypted_path: Path to encrypted model
+            metadata: Encryption metadata
+            chunk_size: Bytes read and decrypted per iteration
+            threads: Threads used to decrypt files larger than one chunk
+            dek: Already unwrapped data encryption key (default: unwrap
+                it through Key Vault)
+        
+        Returns:
+            File descriptor of the memfd; the caller is responsible for closing it
+        """
+        try:
+            # Decrypt data encryption key
+            if dek is None:
+                dek = self.unwrap_model_key(metadata)
             
-            # Write decrypted model
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, 'wb') as f:
-                f.write(decrypted_data)
+            fd = os.memfd_create(
+                os.path.basename(encrypted_path),
+                os.MFD_CLOEXEC | os.MFD_ALLOW_SEALING
+            )
             
-            logger.info(f"Successfully decrypted model to: {output_path}")
-            return True
+            try:
+                with open(encrypted_path, 'rb', buffering=0) as src, \
+                        os.fdopen(fd, 'wb', buffering=chunk_size, closefd=False) as dst:
+                    _, calculated_hash = decrypt_stream(
+                        src, dst, dek, metadata, chunk_size, threads,
+                        hash_plaintext=not has_integrity_tree(metadata)
+                    )
+                
+                verify_plaintext(metadata, calculated_hash, fd=fd, threads=threads)
+                
+                # Freeze the plaintext so nothing can modify it after the fact
+                fcntl.fcntl(
+                    fd,
+                    fcntl.F_ADD_SEALS,
+                    fcntl.F_SEAL_SHRINK | fcntl.F_SEAL_GROW | fcntl.F_SEAL_WRITE | fcntl.F_SEAL_SEAL
+                )
+            except Exception:
+                os.close(fd)
+                raise
             
+            logger.info(f"Successfully decrypted model into memfd: {encrypted_path}")
+            return fd
+        
         except Exception as e:
             logger.error(f"Failed to decrypt model: {e}")
             raise
     
-    def load_environment_secrets(self, secret_names: list) -> Dict[str, str]:
+    def decrypt_model_range(
+        self,
+        encrypted_path: str,
+        metadata: Dict[str, Any],
+        offset: int,
+        length: int,
+        threads: int = DEFAULT_THREADS,
+        dek: Optional[bytes] = None
+    ) -> bytes:
         """
-        Load multiple secrets and return as dictionary.
+        Decrypt a byte range of a v2 (segmented AES-GCM) model.
+        
+        Only the segments overlapping the range are read and authenticated,
+        and only their chunks of the integrity tree are verified.
         
         Args:
-            secret_names: List of secret names
+            encrypted_path: Path to encrypted model
+            metadata: Encryption metadata
+            offset: Plaintext offset of the first byte
+            length: Number of bytes to decrypt
+            threads: Threads used to decrypt overlapping segments
+            dek: Already unwrapped data encryption key (default: unwrap
+                it through Key Vault)
+        
+        Returns:
+            Decrypted bytes of the requested range
+        """
+        try:
+            if not is_segmented(metadata):
+                raise ValueError(
+                    f"Random access requires a v2 model, got version {metadata.get('version')}"
+                )
+            
+            if dek is None:
+                dek = self.unwrap_model_key(metadata)
+            
+            with open(encrypted_path, 'rb', buffering=0) as f:
+                return decrypt_gcm_range(f, dek, metadata, offset, length, threads)
+        
+        except Exception as e:
+            logger.error(f"Failed to decrypt model range: {e}")
+            raise
+    
+    def decrypt_model_range_into(
+        self,
+        encrypted_path: str,
+        metadata: Dict[str, Any],
+        offset: int,
+        buffer,
+        threads: int = DEFAULT_THREADS,
+        dek: Optional[bytes] = None
+    ):
+        """
+        Decrypt a byte range of a v2 model directly into a caller's buffer.
+        
+        Like decrypt_model_range, but the plaintext is written in place
+        rather than returned, so it can be mapped without another copy.
+        
+        Args:
+            encrypted_path: Path to encrypted model
+            metadata: Encryption metadata
+            offset: Plaintext offset of the first byte
+            buffer: Writable buffer receiving len(buffer) bytes of plaintext
+            threads: Threads used to decrypt overlapping segments
+            dek: Already unwrapped data encryption key (default: unwrap
+                it through Key Vault)
+        """
+        try:
+            if not is_segmented(metadata):
+                raise ValueError(
+                    f"Random access requires a v2 model, got version {metadata.get('version')}"
+                )
+            
+            if dek is None:
+                dek = self.unwrap_model_key(metadata)
             
+            with open(encrypted_path, 'rb', buffering=0) as f:
+                decrypt_gcm_range_into(f, dek, metadata, offset, buffer, threads)
+        
+        except Exception as e:
+            logger.error(f"Failed to decrypt model range: {e}")
+            raise
+    
+    def load_secrets(
+        self,
+        secret_names: list,
+        max_concurrency: int = 8,
+        timeout: Optional[float] = 10.0
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Load multiple secrets concurrently.
+        
+        Secrets are fetched in parallel through the pooled Key Vault client,
+        so loading many secrets costs about one round trip per
+        max_concurrency secrets rather than one per secret.
+        
+        Args:
+            secret_names: List of secret names
+            max_concurrency: Secrets fetched at once
+            timeout: Seconds allowed per secret, including throttling waits
+                and retries
+        
         Returns:
-            Dictionary mapping secret names to values
+            Dictionary with "secrets" (name -> value) and "failed"
+            (name -> error message)
         """
-        secrets = {}
-        for secret_name in secret_names:
-            try:
-                secrets[secret_name] = self.get_secret(secret_name)
-            except Exception as e:
-                logger.warning(f"Failed to load secret {secret_name}: {e}")
+        names = list(dict.fromkeys(secret_names))
+        result = {"secrets": {}, "failed": {}}
+        if not names:
+            return result
+        
+        workers = max(1, min(max_concurrency, len(names)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="secret-load") as executor:
+            futures = {
+                name: executor.submit(self.get_secret, name, timeout=timeout)
+                for name in names
+            }
+            for name, future in futures.items():
+                try:
+                    result["secrets"][name] = future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to load secret {name}: {e}")
+                    result["failed"][name] = str(e)
+        
+        logger.info(f"Loaded {len(result['secrets'])}/{len(names)} secrets")
+        return result
+    
+    async def load_secrets_async(
+        self,
+        secret_names: list,
+        max_concurrency: int = 8,
+        timeout: Optional[float] = 10.0
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Load multiple secrets concurrently without blocking the event loop.
+        
+        Args:
+            secret_names: List of secret names
+            max_concurrency: Secrets fetched at once
+            timeout: Seconds allowed per secret; slower fetches are cancelled
+        
+        Returns:
+            Dictionary with "secrets" (name -> value) and "failed"
+            (name -> error message)
+        """
+        names = list(dict.fromkeys(secret_names))
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
         
-        return secrets
+        async def load(name: str) -> str:
+            async with semaphore:
+                try:
+                    # The fetch outlives a timed-out wait if others share it,
+                    # so it is bounded by the same timeout
+                    return await asyncio.wait_for(self.get_secret_async(name, timeout=timeout), timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"timed out after {timeout}s")
+        
+        outcomes = await asyncio.gather(*(load(name) for name in names), return_exceptions=True)
+        
+        result = {"secrets": {}, "failed": {}}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning(f"Failed to load secret {name}: {outcome}")
+                result["failed"][name] = str(outcome)
+            else:
+                result["secrets"][name] = outcome
+        
+        logger.info(f"Loaded {len(result['secrets'])}/{len(names)} secrets")
+        return result
+    
+    def load_environment_secrets(
+        self,
+        secret_names: list,
+        max_concurrency: int = 8,
+        timeout: Optional[float] = 10.0
+    ) -> Dict[str, str]:
+        """
+        Load multiple secrets and return as dictionary.
+        
+        Secrets are fetched concurrently; use load_secrets to also get the
+        reasons for failures.
+        
+        Args:
+            secret_names: List of secret names
+            max_concurrency: Secrets fetched at once
+            timeout: Seconds allowed per secret, including throttling waits
+                and retries
+        
+        Returns:
+            Dictionary mapping the successfully loaded secret names to values
+        """
+        return self.load_secrets(secret_names, max_concurrency, timeout)["secrets"]
     
     def validate_attestation_token(self) -> bool:
         """
@@ -259,15 +881,33 @@ class KeyLoader:
             # In production, validate the attestation token
             # For now, just check if it exists
             return len(self.attestation_token) > 0
-            
+        
         except Exception as e:
             logger.error(f"Failed to validate attestation token: {e}")
             return False
     
     def clear_cache(self):
-        """Clear the key cache."""
+        """Clear the key cache, the data key cache and cached crypto clients."""
         self._key_cache.clear()
+        self._dek_cache.clear()
+        with self._crypto_lock:
+            self._crypto_clients.clear()
         logger.info("Key cache cleared")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get key cache counters and occupancy.
+        
+        Returns:
+            Dictionary with hit, stale hit, miss, refresh and rotation
+            counters and the entry count, plus the data key cache's
+            counters under "data_keys" and the vault's throttling counters
+            under "throttling"
+        """
+        stats = self._key_cache.stats()
+        stats["data_keys"] = self._dek_cache.stats()
+        stats["throttling"] = self._limiter.stats()
+        return stats
 
 
 def main():
@@ -301,7 +941,7 @@ def main():
                 print(f"  - {key.name}")
         
         sys.exit(0)
-        
+    
     except Exception as e:
         logger.error(f"Operation failed: {e}")
         sys.exit(1)
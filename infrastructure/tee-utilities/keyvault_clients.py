@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Shared Key Vault Clients
+Process-wide pool of Azure credentials and Key Vault clients keyed by vault
+URL and credential type, so token fetches, TLS handshakes and connection
+pools are paid once per process rather than once per loader. Also holds the
+per-vault throttling limiter shared by every caller.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
+from azure.keyvault.keys import KeyClient
+from azure.keyvault.secrets import SecretClient
+from keyvault_throttle import AdaptiveLimiter
+
+logger = logging.getLogger(__name__)
+
+# Credential types
+CREDENTIAL_MANAGED_IDENTITY = "managed-identity"
+CREDENTIAL_DEFAULT = "default"
+
+_CREDENTIAL_FACTORIES = {
+    CREDENTIAL_MANAGED_IDENTITY: ManagedIdentityCredential,
+    CREDENTIAL_DEFAULT: DefaultAzureCredential
+}
+
+# Tokens are refreshed in the background once they are this close to expiry
+TOKEN_REFRESH_MARGIN = 300
+
+# Options for Key Vault clients: retries on 429/5xx are left to the shared
+# AdaptiveLimiter, which backs off process-wide; connection errors are still
+# retried by the SDK
+CLIENT_OPTIONS = {"retry_status": 0}
+
+# Cryptography clients kept per owner; each key version gets its own, so
+# older versions are dropped once rotations exceed the bound
+MAX_CRYPTO_CLIENTS = 16
+
+_lock = threading.Lock()
+_credentials: Dict[str, "RefreshingCredential"] = {}
+_clients: Dict[Tuple[str, str, str], Any] = {}
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+class RefreshingCredential:
+    """Token credential that caches tokens and renews them before they expire."""
+    
+    def __init__(self, credential: Any, refresh_margin: float = TOKEN_REFRESH_MARGIN):
+        """
+        Wrap a credential.
+        
+        Args:
+            credential: azure.identity credential to fetch tokens with
+            refresh_margin: Seconds before expiry at which a cached token is
+                renewed in the background while still being handed out
+        """
+        self.credential = credential
+        self.refresh_margin = refresh_margin
+        
+        # scopes and options -> AccessToken
+        self._tokens: Dict[Tuple[str, ...], Any] = {}
+        self._refreshing = set()
+        # scopes and options -> future of the blocking fetch in flight
+        self._fetching: Dict[Tuple[str, ...], Future] = {}
+        self._lock = threading.Lock()
+        
+        self.fetches = 0
+        self.background_refreshes = 0
+    
+    def get_token(self, *scopes: str, claims: Optional[str] = None, **kwargs):
+        """
+        Get an access token, from cache while it is not close to expiry.
+        
+        Tokens are cached per scopes and options (e.g. the tenant_id Key
+        Vault's authentication challenge passes), and concurrent callers
+        missing the cache share one fetch. Requests carrying claims, i.e.
+        continuous access evaluation challenges, always go to the wrapped
+        credential.
+        
+        Args:
+            scopes: Token scopes
+            claims: Additional claims required in the token
+            kwargs: Further options passed to the wrapped credential
+        
+        Returns:
+            azure.core.credentials.AccessToken
+        """
+        if claims:
+            return self.credential.get_token(*scopes, claims=claims, **kwargs)
+        
+        key = scopes + tuple(sorted(kwargs.items()))
+        with self._lock:
+            token = self._tokens.get(key)
+            now = time.time()
+            if token is not None and token.expires_on > now:
+                if token.expires_on - now <= self.refresh_margin and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(
+                        target=self._refresh,
+                        args=(key, scopes, kwargs),
+                        name="keyvault-token-refresh",
+                        daemon=True
+                    ).start()
+                return token
+            
+            future = self._fetching.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._fetching[key] = future
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            token = self._fetch(key, scopes, kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(token)
+        finally:
+            with self._lock:
+                del self._fetching[key]
+        return token
+    
+    def _fetch(self, key: tuple, scopes: Tuple[str, ...], kwargs: Dict[str, Any]):
+        """Fetch a token from the wrapped credential and cache it."""
+        token = self.credential.get_token(*scopes, **kwargs)
+        with self._lock:
+            self.fetches += 1
+            self._tokens[key] = token
+        return token
+    
+    def _refresh(self, key: tuple, scopes: Tuple[str, ...], kwargs: Dict[str, Any]):
+        """Background token renewal; the cached token stays in use on failure."""
+        try:
+            self._fetch(key, scopes, kwargs)
+            with self._lock:
+                self.background_refreshes += 1
+        except Exception as e:
+            logger.warning(f"Background token refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+    
+    def close(self):
+        """Close the wrapped credential."""
+        self.credential.close()
+    
+    # Shared by every pooled client, so a client leaving a `with` block
+    # must not close it
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        pass
+
+
+def _normalise_vault_url(vault_url: str) -> str:
+    """Normalise a vault URL so equivalent spellings share a pool entry."""
+    return vault_url.rstrip("/").lower()
+
+
+def get_credential(credential_type: str = CREDENTIAL_DEFAULT) -> RefreshingCredential:
+    """
+    Get the process-wide credential of a type.
+    
+    Args:
+        credential_type: CREDENTIAL_MANAGED_IDENTITY or CREDENTIAL_DEFAULT
+    
+    Returns:
+        Shared credential
+    """
+    if credential_type not in _CREDENTIAL_FACTORIES:
+        raise ValueError(f"Unsupported credential type: {credential_type}")
+    
+    with _lock:
+        credential = _credentials.get(credential_type)
+        if credential is None:
+            logger.info(f"Creating shared {credential_type} credential")
+            credential = RefreshingCredential(_CREDENTIAL_FACTORIES[credential_type]())
+            _credentials[credential_type] = credential
+        return credential
+
+
+def _get_client(client_class: type, vault_url: str, credential_type: str) -> Any:
+    """Get or create a pooled client for a vault and credential type."""
+    credential = get_credential(credential_type)
+    key = (client_class.__name__, _normalise_vault_url(vault_url), credential_type)
+    
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = client_class(vault_url=vault_url, credential=credential, **CLIENT_OPTIONS)
+            _clients[key] = client
+        return client
+
+
+def get_key_client(vault_url: str, credential_type: str = CREDENTIAL_DEFAULT) -> KeyClient:
+    """
+    Get the shared KeyClient for a vault.
+    
+    Args:
+        vault_url: Azure Key Vault URL
+        credential_type: CREDENTIAL_MANAGED_IDENTITY or CREDENTIAL_DEFAULT
+    
+    Returns:
+        Pooled KeyClient; Azure SDK clients are safe to share between threads
+    """
+    return _get_client(KeyClient, vault_url, credential_type)
+
+
+def get_secret_client(vault_url: str, credential_type: str = CREDENTIAL_DEFAULT) -> SecretClient:
+    """
+    Get the shared SecretClient for a vault.
+    
+    Args:
+        vault_url: Azure Key Vault URL
+        credential_type: CREDENTIAL_MANAGED_IDENTITY or CREDENTIAL_DEFAULT
+    
+    Returns:
+        Pooled SecretClient
+    """
+    return _get_client(SecretClient, vault_url, credential_type)
+
+
+def get_limiter(vault_url: str) -> AdaptiveLimiter:
+    """
+    Get the shared throttling limiter for a vault.
+    
+    Limits come from KEYVAULT_INITIAL_CONCURRENCY (default 8),
+    KEYVAULT_MAX_CONCURRENCY (default 32) and KEYVAULT_MAX_ATTEMPTS
+    (default 6).
+    
+    Args:
+        vault_url: Azure Key Vault URL
+    
+    Returns:
+        AdaptiveLimiter every Key Vault call to this vault should go through
+    """
+    key = _normalise_vault_url(vault_url)
+    with _lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            max_limit = int(os.getenv("KEYVAULT_MAX_CONCURRENCY", "32"))
+            limiter = AdaptiveLimiter(
+                initial_limit=min(int(os.getenv("KEYVAULT_INITIAL_CONCURRENCY", "8")), max_limit),
+                max_limit=max_limit,
+                max_attempts=int(os.getenv("KEYVAULT_MAX_ATTEMPTS", "6"))
+            )
+            _limiters[key] = limiter
+        return limiter
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Get pool occupancy, token and throttling counters.
+    
+    Returns:
+        Dictionary with pooled client count, per-credential token fetches
+        and background refreshes, and per-vault limiter stats
+    """
+    with _lock:
+        return {
+            "clients": len(_clients),
+            "limiters": {vault: limiter.stats() for vault, limiter in _limiters.items()},
+            "credentials": {
+                credential_type: {
+                    "token_fetches": credential.fetches,
+                    "background_refreshes": credential.background_refreshes
+                }
+                for credential_type, credential in _credentials.items()
+            }
+        }
+
+
+def reset_pool():
+    """Forget every pooled credential, client and limiter without closing them."""
+    global _lock
+    _lock = threading.Lock()
+    _credentials.clear()
+    _clients.clear()
+    _limiters.clear()
+
+
+# A forked child must not reuse its parent's connections or locks
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_pool)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Key Vault Throttling Control
+Adaptive (AIMD) concurrency limit with Retry-After aware, jittered retries
+for Key Vault calls, so fleet-wide scale-outs back off instead of failing.
+Has no Azure dependencies; errors are classified by their status code.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Status codes retried by the limiter; the first two also shrink the limit
+THROTTLE_STATUS_CODES = (429, 503)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Minimum time between two multiplicative decreases, so a burst of
+# throttled requests already in flight only halves the limit once
+_DECREASE_INTERVAL = 1.0
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """Get the HTTP status of an azure.core HttpResponseError, if any."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Get the Retry-After delay in seconds from an error's response."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _wake(future: asyncio.Future):
+    """Resolve an asyncio waiter unless it already gave up."""
+    if not future.done():
+        future.set_result(None)
+
+
+def _wake_all(waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]):
+    """Wake asyncio waiters from any thread."""
+    for loop, future in waiters:
+        try:
+            loop.call_soon_threadsafe(_wake, future)
+        except RuntimeError:
+            # The waiter's event loop has closed
+            pass
+
+
+class AdaptiveLimiter:
+    """Caps concurrent Key Vault calls, adapting the cap to throttling."""
+    
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        max_attempts: int = 6,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0
+    ):
+        """
+        Initialize the limiter.
+        
+        The concurrency limit grows by one for every `limit` successful
+        calls and halves when Key Vault throttles (additive increase,
+        multiplicative decrease). Throttled and transient 5xx calls are
+        retried after a decorrelated-jitter backoff, and a Retry-After from
+        Key Vault holds back every caller sharing the limiter.
+        
+        Args:
+            initial_limit: Concurrent calls allowed at first
+            min_limit: Lower bound on the limit
+            max_limit: Upper bound on the limit
+            max_attempts: Attempts per call, including the first
+            base_delay: Smallest retry delay in seconds
+            max_delay: Largest retry delay in seconds
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(f"Invalid concurrency limits: {min_limit} <= {initial_limit} <= {max_limit}")
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be positive: {max_attempts}")
+        
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        # Event loop futures of asyncio callers waiting for a slot
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        
+        self.calls = 0
+        self.throttles = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+    
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        with self._cond:
+            return int(self._limit)
+    
+    def call(
+        self,
+        func: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Run a Key Vault call under the limit, retrying throttled attempts.
+        
+        Args:
+            func: Function making one Key Vault request
+            *args, **kwargs: Arguments for func
+            timeout: Seconds allowed for the whole call, including waits
+                for a slot, retries and their backoff (default: no limit).
+                Each attempt gets the time left as func's `timeout`, the
+                Azure SDK's per-operation timeout
+        
+        Returns:
+            func's return value
+        
+        Raises:
+            TimeoutError: If the timeout passes before an attempt can start
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = self.base_delay
+        for attempt in range(1, self.max_attempts + 1):
+            self._acquire(deadline)
+            try:
+                if deadline is not None:
+                    kwargs["timeout"] = self._time_left(deadline)
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._release()
+                delay = self._on_error(e, attempt, delay, deadline)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release(succeeded=True)
+            return result
+    
+    async def call_async(
+        self,
+        func: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Run an asyncio Key Vault call under the limit, retrying throttled attempts.
+        
+        Args:
+            func: Coroutine function making one Key Vault request
+            *args, **kwargs: Arguments for func
+            timeout: Seconds allowed for the whole call, as for call
+        
+        Returns:
+            func's result
+        
+        Raises:
+            TimeoutError: If the timeout passes before an attempt can start
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = self.base_delay
+        for attempt in range(1, self.max_attempts + 1):
+            await self._acquire_async(deadline)
+            try:
+                if deadline is not None:
+                    kwargs["timeout"] = self._time_left(deadline)
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                self._release()
+                delay = self._on_error(e, attempt, delay, deadline)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release(succeeded=True)
+            return result
+    
+    def _wait_time(self) -> Optional[float]:
+        """Seconds to wait before a slot may be taken, 0 to take one now, None if full (lock held)."""
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._in_flight >= int(self._limit):
+            return None
+        return 0.0
+    
+    @staticmethod
+    def _time_left(deadline: float) -> float:
+        """Seconds until the deadline, raising TimeoutError once it has passed."""
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError("Timed out waiting to call Key Vault")
+        return left
+    
+    def _bound_wait(self, wait: Optional[float], deadline: Optional[float]) -> Optional[float]:
+        """Cap a slot wait at the deadline, raising TimeoutError if it would pass it."""
+        if deadline is None:
+            return wait
+        left = self._time_left(deadline)
+        if wait is not None and wait >= left:
+            raise TimeoutError("Timed out waiting to call Key Vault")
+        return left if wait is None else wait
+    
+    def _acquire(self, deadline: Optional[float] = None):
+        """Block until a call may start, or raise TimeoutError at the deadline."""
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                wait = self._wait_time()
+                if wait == 0.0:
+                    break
+                self._cond.wait(self._bound_wait(wait, deadline))
+            self._in_flight += 1
+            self.calls += 1
+            self.wait_seconds += time.monotonic() - started
+    
+    async def _acquire_async(self, deadline: Optional[float] = None):
+        """Wait without blocking the event loop until a call may start, or raise TimeoutError at the deadline."""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                wait = self._wait_time()
+                if wait == 0.0:
+                    self._in_flight += 1
+                    self.calls += 1
+                    self.wait_seconds += time.monotonic() - started
+                    return
+                wait = self._bound_wait(wait, deadline)
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            
+            # Woken by _release when a slot frees, or once a Retry-After
+            # block or the deadline passes
+            try:
+                await asyncio.wait_for(waiter[1], wait)
+            except asyncio.TimeoutError:
+                pass
+            except BaseException:
+                # Pass on a wakeup this caller can no longer use
+                with self._cond:
+                    woken = [] if waiter[1].cancelled() or not waiter[1].done() else self._pop_async_waiters(1)
+                _wake_all(woken)
+                raise
+            finally:
+                with self._cond:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+    
+    def _release(self, succeeded: bool = False):
+        """Free a slot and wake waiters; a success grows the limit additively."""
+        with self._cond:
+            self._in_flight -= 1
+            if succeeded:
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+            woken = self._pop_async_waiters(int(self._limit) - self._in_flight)
+        _wake_all(woken)
+    
+    def _pop_async_waiters(self, count: int) -> List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]:
+        """Take up to count asyncio waiters, oldest first, to wake (lock held)."""
+        woken = self._async_waiters[:max(0, count)]
+        del self._async_waiters[:len(woken)]
+        return woken
+    
+    def _on_error(
+        self,
+        error: Exception,
+        attempt: int,
+        delay: float,
+        deadline: Optional[float] = None
+    ) -> float:
+        """
+        Classify a failed attempt and choose the retry delay.
+        
+        Returns:
+            Seconds to sleep before the next attempt; raises the error if it
+            is not retryable, attempts are exhausted or the retry could not
+            start before the deadline
+        """
+        status = _status_code(error)
+        retry_after = _retry_after(error)
+        
+        # Decorrelated jitter, but never sooner than Key Vault asked
+        delay = min(self.max_delay, random.uniform(self.base_delay, delay * 3))
+        delay = max(delay, retry_after or 0.0)
+        out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+        
+        with self._cond:
+            if status in THROTTLE_STATUS_CODES:
+                self.throttles += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= _DECREASE_INTERVAL:
+                    self._limit = max(self.min_limit, self._limit / 2)
+                    self._last_decrease = now
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+            
+            if status not in RETRY_STATUS_CODES or attempt >= self.max_attempts or out_of_time:
+                if status in RETRY_STATUS_CODES:
+                    self.failures += 1
+                raise error
+            
+            self.retries += 1
+        
+        logger.warning(
+            f"Key Vault returned {status}, retrying in {delay:.2f}s "
+            f"(attempt {attempt}/{self.max_attempts}, limit {int(self._limit)})"
+        )
+        return delay
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get limiter counters.
+        
+        Returns:
+            Dictionary with the current limit, in-flight calls, and call,
+            throttle, retry and failure counters
+        """
+        with self._cond:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "calls": self.calls,
+                "throttles": self.throttles,
+                "retries": self.retries,
+                "failures": self.failures,
+                "wait_seconds": round(self.wait_seconds, 3)
+            }
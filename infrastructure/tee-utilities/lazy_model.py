@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Lazy Model Proxies for TEE Environments
+Stand-ins returned before a model's decryption has finished.
+Lets services become ready without waiting for rarely used models.
+"""
+
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModel:
+    """Proxy that resolves to a loaded model on first use."""
+    
+    def __init__(
+        self,
+        resolve: Callable[[], Future],
+        is_loaded: Callable[[], bool],
+        model_path: str,
+        model_type: str,
+        background: bool = True
+    ):
+        """
+        Initialize the proxy.
+        
+        Args:
+            resolve: Returns a future for the model, starting a load if it
+                is neither cached nor in flight
+            is_loaded: Whether the model is currently cached
+            model_path: Path to encrypted model file
+            model_type: Type of model
+            background: Queue the load now rather than on first use
+        """
+        self._resolve = resolve
+        self._is_loaded = is_loaded
+        self.model_path = model_path
+        self.model_type = model_type
+        
+        if background:
+            resolve()
+    
+    @property
+    def ready(self) -> bool:
+        """Whether the model is resident, so a call will not block on a load."""
+        return self._is_loaded()
+    
+    def load(self, timeout: Optional[float] = None) -> Any:
+        """
+        Get the underlying model, waiting for its load to finish.
+        
+        The model is looked up on every call rather than held by the proxy,
+        so it stays subject to the loader's cache budget and is reloaded
+        transparently if it was evicted.
+        
+        Args:
+            timeout: Seconds to wait for the load (default: no limit)
+        
+        Returns:
+            Loaded model object
+        """
+        return self._resolve().result(timeout)
+    
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+    
+    def forward(self, *args, **kwargs):
+        """PyTorch forward pass."""
+        return self.load().forward(*args, **kwargs)
+    
+    def run(self, *args, **kwargs):
+        """ONNX Runtime inference."""
+        return self.load().run(*args, **kwargs)
+    
+    def predict(self, *args, **kwargs):
+        """Keras inference."""
+        return self.load().predict(*args, **kwargs)
+    
+    def __getattr__(self, name: str):
+        # Only reached for attributes the proxy lacks; dunders (copy, pickle
+        # and friends probing the proxy) must not trigger a load
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+    
+    def __repr__(self) -> str:
+        state = "loaded" if self.ready else "pending"
+        return f"LazyModel({self.model_path!r}, {self.model_type!r}, {state})"
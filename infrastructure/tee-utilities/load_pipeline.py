@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Staged Model Load Pipeline
+Runs model loads through stages connected by bounded queues so that disk
+reads, Key Vault calls, decryption and deserialisation of different models
+overlap, and reports how busy each stage was.
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of input for a stage worker
+_STOP = object()
+
+
+class LoadPipeline:
+    """Pushes work items through named stages, each served by its own threads."""
+    
+    def __init__(
+        self,
+        stages: List[Tuple[str, Callable[[Dict[str, Any]], Any]]],
+        workers: int = 1,
+        queue_depth: int = 1,
+        on_stage: Optional[Callable[[Dict[str, Any], str], None]] = None
+    ):
+        """
+        Initialize and start the pipeline.
+        
+        Each stage function receives the item dict, may add entries to it for
+        later stages, and the return value of the last stage becomes the
+        item's result. A stage that raises fails the item, which then skips
+        the remaining stages.
+        
+        Args:
+            stages: Ordered list of (stage name, stage function)
+            workers: Threads per stage
+            queue_depth: Items allowed to wait between two stages, which
+                bounds how many intermediate results (e.g. plaintext
+                models) are held at once
+            on_stage: Optional callback(item, stage name) run as an item
+                enters each stage, e.g. to publish progress
+        """
+        self.stage_names = [name for name, _ in stages]
+        self.workers = max(1, workers)
+        self._on_stage = on_stage
+        
+        # Submissions are never blocked; later hand-offs are bounded
+        self._queues = [queue.Queue()] + [
+            queue.Queue(maxsize=max(1, queue_depth)) for _ in stages[1:]
+        ]
+        
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._finished = None
+        self._pending = 0
+        self._running = [self.workers] * len(stages)
+        self._stats = {
+            name: {"items": 0, "failed": 0, "busy_seconds": 0.0, "blocked_seconds": 0.0}
+            for name in self.stage_names
+        }
+        
+        for index, (name, func) in enumerate(stages):
+            for worker in range(self.workers):
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(index, name, func),
+                    name=f"pipeline-{name}-{worker}",
+                    daemon=True
+                ).start()
+    
+    def submit(self, item: Dict[str, Any]) -> Future:
+        """
+        Queue an item at the first stage.
+        
+        Per-stage wall times are recorded in item["timings"] along with
+        "queued", the time spent waiting for the first stage.
+        
+        Args:
+            item: Work item passed to every stage
+        
+        Returns:
+            Future resolved with the last stage's result
+        """
+        item.setdefault("timings", {})
+        item["_future"] = Future()
+        item["_submitted"] = time.perf_counter()
+        
+        with self._lock:
+            self._pending += 1
+            self._finished = None
+        
+        self._queues[0].put(item)
+        return item["_future"]
+    
+    def close(self):
+        """Stop the workers once every submitted item has been processed."""
+        for _ in range(self.workers):
+            self._queues[0].put(_STOP)
+    
+    def _run_stage(self, index: int, name: str, func: Callable):
+        """Worker loop for one stage."""
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                break
+            
+            if index == 0:
+                item["timings"]["queued"] = round(time.perf_counter() - item["_submitted"], 3)
+            
+            started = time.perf_counter()
+            try:
+                if self._on_stage is not None:
+                    self._on_stage(item, name)
+                result = func(item)
+                failed = None
+            except BaseException as e:
+                failed = e
+            busy = time.perf_counter() - started
+            item["timings"][name] = round(busy, 3)
+            
+            with self._lock:
+                stats = self._stats[name]
+                stats["items"] += 1
+                stats["busy_seconds"] += busy
+                if failed is not None:
+                    stats["failed"] += 1
+            
+            if failed is not None:
+                logger.error(f"Pipeline stage {name} failed: {failed}")
+                self._complete(item, error=failed)
+            elif outbox is None:
+                self._complete(item, result=result)
+            else:
+                started = time.perf_counter()
+                outbox.put(item)
+                with self._lock:
+                    self._stats[name]["blocked_seconds"] += time.perf_counter() - started
+        
+        # The last worker of a stage passes the stop on to the next stage
+        with self._lock:
+            self._running[index] -= 1
+            last = self._running[index] == 0
+        if last and outbox is not None:
+            for _ in range(self.workers):
+                outbox.put(_STOP)
+    
+    def _complete(self, item: Dict[str, Any], result: Any = None, error: BaseException = None):
+        """Resolve an item's future and track when the pipeline drains."""
+        future = item["_future"]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._finished = time.perf_counter()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-stage utilisation.
+        
+        Utilisation is the fraction of the pipeline's wall time that a
+        stage's workers spent processing items; blocked time is time spent
+        waiting for room in the next stage's queue.
+        
+        Returns:
+            Dictionary with elapsed time, pending items and per-stage stats
+        """
+        with self._lock:
+            end = self._finished or time.perf_counter()
+            elapsed = max(end - self._started, 1e-9)
+            
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "pending": self._pending,
+                "workers_per_stage": self.workers,
+                "stages": {
+                    name: {
+                        "items": stats["items"],
+                        "failed": stats["failed"],
+                        "busy_seconds": round(stats["busy_seconds"], 3),
+                        "blocked_seconds": round(stats["blocked_seconds"], 3),
+                        "utilisation": round(stats["busy_seconds"] / (elapsed * self.workers), 3)
+                    }
+                    for name, stats in self._stats.items()
+                }
+            }
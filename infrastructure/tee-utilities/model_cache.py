@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Model Cache for TEE Environments
+Byte-budgeted LRU cache of loaded models with pinning.
+Bounds the memory held by a multi-model inference process.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCache:
+    """Least-recently-used cache of loaded models bounded by resident bytes."""
+    
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        Initialize the model cache.
+        
+        Args:
+            max_bytes: Byte budget for cached models (default: unbounded)
+        """
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError(f"Cache budget must be positive: {max_bytes}")
+        
+        self.max_bytes = max_bytes
+        
+        # key -> (model, resident bytes), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pinned: Set[str] = set()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a model and mark it most recently used.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            Cached model, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: str, model: Any, size_bytes: int):
+        """
+        Insert a model, evicting least-recently-used unpinned models over budget.
+        
+        Args:
+            key: Cache key
+            model: Loaded model object
+            size_bytes: Resident size of the model in bytes
+        """
+        with self._lock:
+            self.remove(key)
+            
+            self._entries[key] = (model, size_bytes)
+            self._total_bytes += size_bytes
+            
+            self._evict(keep=key)
+    
+    def _evict(self, keep: Optional[str] = None):
+        """Evict unpinned models, oldest first, until the budget is met."""
+        if self.max_bytes is None:
+            return
+        
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                return
+            if key == keep or key in self._pinned:
+                continue
+            
+            _, size_bytes = self._entries.pop(key)
+            self._total_bytes -= size_bytes
+            self.evictions += 1
+            logger.info(f"Evicted model from cache: {key} ({size_bytes} bytes)")
+        
+        if self._total_bytes > self.max_bytes:
+            logger.warning(
+                f"Model cache holds {self._total_bytes} bytes of pinned or "
+                f"in-use models, over its {self.max_bytes} byte budget"
+            )
+    
+    def remove(self, key: str) -> bool:
+        """
+        Remove a model from the cache.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            True if the model was cached
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            
+            self._total_bytes -= entry[1]
+            return True
+    
+    def pin(self, key: str):
+        """
+        Exempt a model from eviction; may be called before it is loaded.
+        
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._pinned.add(key)
+    
+    def unpin(self, key: str):
+        """
+        Make a pinned model evictable again.
+        
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._pinned.discard(key)
+            self._evict()
+    
+    def clear(self):
+        """Drop every cached model; pins are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters and occupancy.
+        
+        Returns:
+            Dictionary with hit/miss/eviction counters and byte usage
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "pinned": len(self._pinned & set(self._entries)),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,1225 @@
+#!/usr/bin/env python3
+"""
+Model Encryption Container Helpers
+Chunked AES primitives shared by the Key Vault model tools and TEE loaders.
+Keeps peak memory proportional to chunk size × threads rather than to the
+model size.
+
+Two container versions are supported:
+  1.0  AES-256-CBC over the whole file with PKCS7 padding
+  2.0  AES-256-GCM segments, each with its own nonce and tag, indexed in
+       the metadata so segments can be processed in parallel or on demand
+
+Either version may carry a Merkle tree of plaintext chunk hashes under
+metadata["integrity"], which lets integrity be verified in parallel and
+lets partial reads verify only the chunks they touch.
+"""
+
+import io
+import os
+import base64
+import time
+import struct
+import hashlib
+import logging
+import secrets
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+
+logger = logging.getLogger(__name__)
+
+# Metadata versions of the encrypted model container
+FORMAT_VERSION_CBC = "1.0"
+FORMAT_VERSION_GCM = "2.0"
+
+# AES block size in bytes
+AES_BLOCK_SIZE = 16
+
+# AES-GCM nonce size in bytes
+GCM_NONCE_SIZE = 12
+
+# Default read size for streaming encryption/decryption
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Default number of threads for parallel segment encryption/decryption. Each
+# thread holds about two chunks (ciphertext and plaintext), so the default
+# stays small on many-core nodes; raise it explicitly where memory allows
+DEFAULT_THREADS = min(4, os.cpu_count() or 1)
+
+# Integrity tree algorithm recorded in metadata["integrity"]
+MERKLE_ALGORITHM = "sha256-merkle"
+
+
+def _normalize_chunk_size(chunk_size: int) -> int:
+    """Round a chunk size down to whole AES blocks."""
+    return max(AES_BLOCK_SIZE, chunk_size - chunk_size % AES_BLOCK_SIZE)
+
+
+def _check_pkcs7_padding(block: bytes) -> int:
+    """
+    Validate PKCS7 padding on the final plaintext block.
+    
+    Args:
+        block: Final decrypted block
+    
+    Returns:
+        Number of padding bytes to strip
+    """
+    padding_length = block[-1]
+    if not 1 <= padding_length <= AES_BLOCK_SIZE:
+        raise ValueError("Invalid PKCS7 padding")
+    if block[-padding_length:] != bytes([padding_length]) * padding_length:
+        raise ValueError("Invalid PKCS7 padding")
+    return padding_length
+
+
+def _map_in_order(
+    func: Callable,
+    arg_tuples: Iterable[tuple],
+    threads: int,
+    thread_name_prefix: str
+) -> Iterator[Tuple[Any, bool]]:
+    """
+    Run func over argument tuples on a thread pool, yielding in submission order.
+    
+    At most `threads` calls are in flight, which bounds the memory held by
+    results that are waiting to be consumed.
+    
+    Yields:
+        Tuple of (result, whether this is the last result)
+    """
+    arg_tuples = iter(arg_tuples)
+    
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix=thread_name_prefix) as pool:
+        in_flight = deque()
+        
+        def submit_next():
+            args = next(arg_tuples, None)
+            if args is not None:
+                in_flight.append(pool.submit(func, *args))
+        
+        for _ in range(max(1, threads)):
+            submit_next()
+        
+        while in_flight:
+            result = in_flight.popleft().result()
+            submit_next()
+            yield result, not in_flight
+
+
+def _pread_exact(fd: int, length: int, offset: int) -> bytes:
+    """Read exactly length bytes at offset from a file descriptor."""
+    data = os.pread(fd, length, offset)
+    while len(data) < length:
+        more = os.pread(fd, length - len(data), offset + len(data))
+        if not more:
+            raise ValueError("Unexpected end of file")
+        data += more
+    return data
+
+
+def _allocate_buffer(size: int) -> io.BytesIO:
+    """Create a BytesIO with size bytes of storage plus a spare AES block."""
+    # Grow the buffer by writing its last byte; update_into needs a spare block
+    buffer = io.BytesIO()
+    buffer.seek(size + AES_BLOCK_SIZE - 2)
+    buffer.write(b"\0")
+    return buffer
+
+
+def make_partial_path(path: str) -> str:
+    """
+    Create a unique, empty temporary file next to path.
+    
+    Output is written to the temporary file and os.replace'd onto path once
+    complete, so concurrent jobs never share a scratch file and readers never
+    observe a half-written model.
+    
+    Args:
+        path: Final output path
+    
+    Returns:
+        Path of the temporary file (mode 0600, same directory as path)
+    """
+    fd, partial_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.",
+        suffix=".partial",
+        dir=os.path.dirname(path) or "."
+    )
+    os.close(fd)
+    return partial_path
+
+
+def run_batch(
+    job: Callable[[Any], Dict[str, Any]],
+    items: Iterable[Any],
+    workers: int = 1
+) -> Dict[str, Any]:
+    """
+    Run a per-file batch job on a thread pool and collect timings.
+    
+    The job handles its own errors and returns a detail dict with a
+    "status" of "success", "skipped" or "failed" and, on success, the
+    number of plaintext "bytes" processed. Details are returned in input
+    order.
+    
+    Args:
+        job: Callable processing a single item
+        items: Items to process
+        workers: Number of files processed concurrently
+    
+    Returns:
+        Dictionary with per-file details, counts and aggregate throughput
+    """
+    def timed(item):
+        started = time.perf_counter()
+        detail = job(item)
+        seconds = time.perf_counter() - started
+        detail["seconds"] = round(seconds, 3)
+        if detail.get("bytes"):
+            detail["mb_per_second"] = round(detail["bytes"] / 1e6 / max(seconds, 1e-9), 2)
+        return detail
+    
+    items = list(items)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as executor:
+        details = list(executor.map(timed, items))
+    elapsed = time.perf_counter() - started
+    
+    successful = sum(1 for detail in details if detail["status"] == "success")
+    skipped = sum(1 for detail in details if detail["status"] == "skipped")
+    total_bytes = sum(detail.get("bytes", 0) for detail in details)
+    
+    return {
+        "total": len(items),
+        "successful": successful,
+        "skipped": skipped,
+        "failed": len(items) - successful - skipped,
+        "workers": max(1, workers),
+        "elapsed_seconds": round(elapsed, 3),
+        "total_bytes": total_bytes,
+        "mb_per_second": round(total_bytes / 1e6 / max(elapsed, 1e-9), 2),
+        "details": details
+    }
+
+
+def encrypt_cbc_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    dek: bytes,
+    iv: bytes,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[int, int, str, Dict[str, Any]]:
+    """
+    Hash, pad and encrypt a file object into another in fixed-size chunks.
+    
+    The ciphertext is identical to encrypting the whole file with PKCS7
+    padding in one call, but only one chunk is held in memory at a time.
+    The integrity tree is hashed in the same pass, so the file is read once
+    and the tree always describes the bytes that were encrypted.
+    
+    Args:
+        src: Readable binary file object with the plaintext model
+        dst: Writable binary file object for the ciphertext
+        dek: Data encryption key
+        iv: CBC initialization vector
+        chunk_size: Number of plaintext bytes processed per iteration, and
+            per integrity tree leaf
+    
+    Returns:
+        Tuple of (original size, encrypted size, plaintext SHA-256 hex digest,
+        integrity tree)
+    """
+    leaf_size = chunk_size
+    chunk_size = _normalize_chunk_size(chunk_size)
+    
+    cipher = Cipher(
+        algorithms.AES(dek),
+        modes.CBC(iv),
+        backend=default_backend()
+    )
+    encryptor = cipher.encryptor()
+    hasher = hashlib.sha256()
+    
+    read_buf = bytearray(chunk_size)
+    out_buf = bytearray(chunk_size + AES_BLOCK_SIZE - 1)
+    read_view = memoryview(read_buf)
+    out_view = memoryview(out_buf)
+    
+    original_size = 0
+    encrypted_size = 0
+    
+    leaves = []
+    leaf_hasher = hashlib.sha256(b"\x00")
+    leaf_filled = 0
+    
+    while True:
+        n = src.readinto(read_buf)
+        if not n:
+            break
+        
+        chunk = read_view[:n]
+        hasher.update(chunk)
+        
+        # Reads need not line up with leaves, so split chunks at leaf boundaries
+        pos = 0
+        while pos < n:
+            take = min(n - pos, leaf_size - leaf_filled)
+            leaf_hasher.update(chunk[pos:pos + take])
+            leaf_filled += take
+            pos += take
+            if leaf_filled == leaf_size:
+                leaves.append(leaf_hasher.digest())
+                leaf_hasher = hashlib.sha256(b"\x00")
+                leaf_filled = 0
+        
+        written = encryptor.update_into(chunk, out_buf)
+        dst.write(out_view[:written])
+        
+        original_size += n
+        encrypted_size += written
+    
+    # PKCS7 padding only ever touches the final block
+    padding_length = AES_BLOCK_SIZE - (original_size % AES_BLOCK_SIZE)
+    tail = encryptor.update(bytes([padding_length]) * padding_length)
+    tail += encryptor.finalize()
+    dst.write(tail)
+    encrypted_size += len(tail)
+    
+    # A trailing partial leaf; an empty model still gets one leaf
+    if leaf_filled or not leaves:
+        leaves.append(leaf_hasher.digest())
+    
+    return original_size, encrypted_size, hasher.hexdigest(), _integrity_tree(leaves, leaf_size)
+
+
+def decrypt_cbc_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    dek: bytes,
+    iv: bytes,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    threads: int = 1,
+    hash_plaintext: bool = True
+) -> Tuple[int, Optional[str]]:
+    """
+    Decrypt AES-CBC ciphertext from one file object into another.
+    
+    Only the last plaintext block is held back for PKCS7 unpadding, and the
+    SHA-256 of the plaintext is computed as it is written. With threads > 1,
+    ciphertext larger than one chunk is handed to decrypt_cbc_stream_parallel.
+    
+    Args:
+        src: Readable binary file object positioned at the ciphertext
+        dst: Writable binary file object for the plaintext
+        dek: Data encryption key
+        iv: CBC initialization vector
+        chunk_size: Number of ciphertext bytes processed per iteration
+        threads: Number of decryption threads
+        hash_plaintext: Compute the whole-file SHA-256 (skipped when the
+            caller verifies an integrity tree instead)
+    
+    Returns:
+        Tuple of (plaintext size, plaintext SHA-256 hex digest or None)
+    """
+    chunk_size = _normalize_chunk_size(chunk_size)
+    
+    if threads > 1:
+        ciphertext_size = os.fstat(src.fileno()).st_size - src.tell()
+        if ciphertext_size > chunk_size:
+            return decrypt_cbc_stream_parallel(
+                src, ciphertext_size, dst, dek, iv, threads, chunk_size, hash_plaintext
+            )
+    
+    cipher = Cipher(
+        algorithms.AES(dek),
+        modes.CBC(iv),
+        backend=default_backend()
+    )
+    decryptor = cipher.decryptor()
+    hasher = hashlib.sha256() if hash_plaintext else None
+    
+    read_buf = bytearray(chunk_size)
+    out_buf = bytearray(chunk_size + AES_BLOCK_SIZE - 1)
+    read_view = memoryview(read_buf)
+    out_view = memoryview(out_buf)
+    
+    # Last decrypted block, written once we know it is not the padded one
+    pending = b""
+    plaintext_size = 0
+    
+    while True:
+        n = src.readinto(read_buf)
+        if not n:
+            break
+        
+        written = decryptor.update_into(read_view[:n], out_buf)
+        if not written:
+            continue
+        
+        if pending:
+            dst.write(pending)
+            if hasher:
+                hasher.update(pending)
+            plaintext_size += len(pending)
+        
+        body = out_view[:written - AES_BLOCK_SIZE]
+        dst.write(body)
+        if hasher:
+            hasher.update(body)
+        plaintext_size += len(body)
+        
+        pending = bytes(out_view[written - AES_BLOCK_SIZE:written])
+    
+    # Raises if the ciphertext is not a whole number of blocks
+    decryptor.finalize()
+    
+    if not pending:
+        raise ValueError("Encrypted model is empty")
+    
+    tail = pending[:AES_BLOCK_SIZE - _check_pkcs7_padding(pending)]
+    dst.write(tail)
+    if hasher:
+        hasher.update(tail)
+    plaintext_size += len(tail)
+    
+    return plaintext_size, hasher.hexdigest() if hasher else None
+
+
+def _segment_iv(fd: int, base: int, offset: int, iv: bytes) -> bytes:
+    """CBC IV for a segment: the file IV, or the preceding ciphertext block."""
+    if offset == 0:
+        return iv
+    return _pread_exact(fd, AES_BLOCK_SIZE, base + offset - AES_BLOCK_SIZE)
+
+
+def _decrypt_cbc_segment(
+    fd: int,
+    base: int,
+    offset: int,
+    length: int,
+    dek: bytes,
+    iv: bytes
+) -> bytes:
+    """Decrypt one block-aligned ciphertext segment independently of the others."""
+    decryptor = Cipher(
+        algorithms.AES(dek),
+        modes.CBC(_segment_iv(fd, base, offset, iv)),
+        backend=default_backend()
+    ).decryptor()
+    return decryptor.update(_pread_exact(fd, length, base + offset)) + decryptor.finalize()
+
+
+def decrypt_cbc_stream_parallel(
+    src: BinaryIO,
+    ciphertext_size: int,
+    dst: BinaryIO,
+    dek: bytes,
+    iv: bytes,
+    threads: int = DEFAULT_THREADS,
+    segment_size: int = DEFAULT_CHUNK_SIZE,
+    hash_plaintext: bool = True
+) -> Tuple[int, Optional[str]]:
+    """
+    Decrypt AES-CBC ciphertext on a thread pool, writing plaintext in order.
+    
+    Each CBC plaintext block depends only on its own and the preceding
+    ciphertext block, so the file is split into segments that are decrypted
+    concurrently, each seeded with the previous segment's last ciphertext
+    block as its IV. Segments are hashed and written in order, with at most
+    `threads` segments in flight.
+    
+    Args:
+        src: Readable binary file object positioned at the ciphertext
+        ciphertext_size: Number of ciphertext bytes to decrypt
+        dst: Writable binary file object for the plaintext
+        dek: Data encryption key
+        iv: CBC initialization vector
+        threads: Number of decryption threads
+        segment_size: Ciphertext bytes per segment
+        hash_plaintext: Compute the whole-file SHA-256
+    
+    Returns:
+        Tuple of (plaintext size, plaintext SHA-256 hex digest or None)
+    """
+    segment_size = _normalize_chunk_size(segment_size)
+    
+    if ciphertext_size <= 0 or ciphertext_size % AES_BLOCK_SIZE:
+        raise ValueError("Encrypted model size is not a whole number of AES blocks")
+    
+    fd = src.fileno()
+    base = src.tell()
+    hasher = hashlib.sha256() if hash_plaintext else None
+    plaintext_size = 0
+    
+    segments = (
+        (fd, base, offset, min(segment_size, ciphertext_size - offset), dek, iv)
+        for offset in range(0, ciphertext_size, segment_size)
+    )
+    
+    for plaintext, is_last in _map_in_order(_decrypt_cbc_segment, segments, threads, "cbc-decrypt"):
+        plaintext = memoryview(plaintext)
+        
+        if is_last:
+            # Final segment carries the PKCS7 padding
+            padding_length = _check_pkcs7_padding(bytes(plaintext[-AES_BLOCK_SIZE:]))
+            plaintext = plaintext[:len(plaintext) - padding_length]
+        
+        dst.write(plaintext)
+        if hasher:
+            hasher.update(plaintext)
+        plaintext_size += len(plaintext)
+    
+    return plaintext_size, hasher.hexdigest() if hasher else None
+
+
+def _decrypt_cbc_into(
+    src: BinaryIO,
+    ciphertext_size: int,
+    out_view: memoryview,
+    dek: bytes,
+    iv: bytes,
+    chunk_size: int
+) -> int:
+    """Decrypt ciphertext chunk by chunk into out_view; returns bytes written."""
+    decryptor = Cipher(
+        algorithms.AES(dek),
+        modes.CBC(iv),
+        backend=default_backend()
+    ).decryptor()
+    
+    read_view = memoryview(bytearray(chunk_size))
+    offset = 0
+    remaining = ciphertext_size
+    
+    while remaining:
+        n = src.readinto(read_view[:min(chunk_size, remaining)])
+        if not n:
+            raise ValueError("Encrypted model is truncated")
+        offset += decryptor.update_into(read_view[:n], out_view[offset:])
+        remaining -= n
+    
+    decryptor.finalize()
+    return offset
+
+
+def _decrypt_cbc_into_parallel(
+    src: BinaryIO,
+    ciphertext_size: int,
+    out_view: memoryview,
+    dek: bytes,
+    iv: bytes,
+    threads: int,
+    segment_size: int
+):
+    """Decrypt block-aligned segments concurrently into their slices of out_view."""
+    fd = src.fileno()
+    base = src.tell()
+    
+    def decrypt_segment(offset: int):
+        length = min(segment_size, ciphertext_size - offset)
+        decryptor = Cipher(
+            algorithms.AES(dek),
+            modes.CBC(_segment_iv(fd, base, offset, iv)),
+            backend=default_backend()
+        ).decryptor()
+        decryptor.update_into(_pread_exact(fd, length, base + offset), out_view[offset:])
+        decryptor.finalize()
+    
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="cbc-decrypt") as pool:
+        for future in [
+            pool.submit(decrypt_segment, offset)
+            for offset in range(0, ciphertext_size, segment_size)
+        ]:
+            future.result()
+
+
+def decrypt_cbc_to_memory(
+    src: BinaryIO,
+    ciphertext_size: int,
+    dek: bytes,
+    iv: bytes,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    threads: int = 1
+) -> io.BytesIO:
+    """
+    Decrypt AES-CBC ciphertext into a preallocated in-memory buffer.
+    
+    The plaintext is written with update_into straight into the storage of
+    the returned BytesIO, so nothing touches disk and the only full-size
+    allocation is the buffer itself. With threads > 1, chunks are decrypted
+    concurrently into their own slices of the buffer.
+    
+    Args:
+        src: Readable binary file object positioned at the ciphertext
+        ciphertext_size: Number of ciphertext bytes to read from src
+        dek: Data encryption key
+        iv: CBC initialization vector
+        chunk_size: Number of ciphertext bytes processed per iteration
+        threads: Number of decryption threads
+    
+    Returns:
+        BytesIO holding the unpadded plaintext, positioned at the start
+    """
+    chunk_size = _normalize_chunk_size(chunk_size)
+    
+    if ciphertext_size <= 0 or ciphertext_size % AES_BLOCK_SIZE:
+        raise ValueError("Encrypted model size is not a whole number of AES blocks")
+    
+    plaintext = _allocate_buffer(ciphertext_size)
+    
+    with plaintext.getbuffer() as out_view:
+        if threads > 1 and ciphertext_size > chunk_size:
+            _decrypt_cbc_into_parallel(
+                src, ciphertext_size, out_view, dek, iv, threads, chunk_size
+            )
+            offset = ciphertext_size
+        else:
+            offset = _decrypt_cbc_into(src, ciphertext_size, out_view, dek, iv, chunk_size)
+        
+        padding_length = _check_pkcs7_padding(bytes(out_view[offset - AES_BLOCK_SIZE:offset]))
+    
+    plaintext.truncate(offset - padding_length)
+    plaintext.seek(0)
+    return plaintext
+
+
+def _gcm_aad(index: int, segment_count: int) -> bytes:
+    """Associated data binding a segment to its position and the segment count."""
+    return struct.pack(">QQ", index, segment_count)
+
+
+def _segment_count(original_size: int, segment_size: int) -> int:
+    """Number of GCM segments for a plaintext; empty models still get one."""
+    return max(1, -(-original_size // segment_size))
+
+
+def _encrypt_gcm_segment(
+    fd: int,
+    base: int,
+    index: int,
+    segment_count: int,
+    segment_size: int,
+    length: int,
+    dek: bytes
+) -> Tuple[bytes, bytes, bytes, bytes, bytes]:
+    """Encrypt one plaintext segment under a fresh nonce and hash it as a tree leaf."""
+    plaintext = _pread_exact(fd, length, base + index * segment_size)
+    nonce = secrets.token_bytes(GCM_NONCE_SIZE)
+    
+    encryptor = Cipher(
+        algorithms.AES(dek),
+        modes.GCM(nonce),
+        backend=default_backend()
+    ).encryptor()
+    encryptor.authenticate_additional_data(_gcm_aad(index, segment_count))
+    ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+    
+    return plaintext, ciphertext, nonce, encryptor.tag, _merkle_leaf(plaintext)
+
+
+def encrypt_gcm_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    dek: bytes,
+    segment_size: int = DEFAULT_CHUNK_SIZE,
+    threads: int = DEFAULT_THREADS
+) -> Tuple[int, str, List[Dict[str, str]], Dict[str, Any]]:
+    """
+    Encrypt a file object into AES-GCM segments on a thread pool.
+    
+    Segments are encrypted concurrently and written in order, so the
+    ciphertext has the same length and offsets as the plaintext. Each
+    segment's nonce and tag are returned as the segment index, and each
+    segment is a leaf of the returned integrity tree.
+    
+    Args:
+        src: Readable binary file object positioned at the plaintext model
+        dst: Writable binary file object for the ciphertext
+        dek: Data encryption key
+        segment_size: Plaintext bytes per segment
+        threads: Number of encryption threads
+    
+    Returns:
+        Tuple of (original size, plaintext SHA-256 hex digest, segment index,
+        integrity tree)
+    """
+    fd = src.fileno()
+    base = src.tell()
+    original_size = os.fstat(fd).st_size - base
+    segment_count = _segment_count(original_size, segment_size)
+    
+    hasher = hashlib.sha256()
+    segments = []
+    leaves = []
+    
+    jobs = (
+        (
+            fd, base, index, segment_count, segment_size,
+            min(segment_size, original_size - index * segment_size), dek
+        )
+        for index in range(segment_count)
+    )
+    
+    for (plaintext, ciphertext, nonce, tag, leaf), _ in _map_in_order(
+        _encrypt_gcm_segment, jobs, threads, "gcm-encrypt"
+    ):
+        hasher.update(plaintext)
+        dst.write(ciphertext)
+        segments.append({
+            "nonce": base64.b64encode(nonce).decode('utf-8'),
+            "tag": base64.b64encode(tag).decode('utf-8')
+        })
+        leaves.append(leaf)
+    
+    return original_size, hasher.hexdigest(), segments, _integrity_tree(leaves, segment_size)
+
+
+class _GCMLayout:
+    """Segment geometry and decoded nonces/tags of a v2 container."""
+    
+    def __init__(self, metadata: Dict[str, Any]):
+        self.original_size = metadata["original_size"]
+        self.segment_size = metadata["segment_size"]
+        self.segment_count = _segment_count(self.original_size, self.segment_size)
+        
+        segments = metadata["segments"]
+        if len(segments) != self.segment_count:
+            raise ValueError(
+                f"Segment index has {len(segments)} entries, expected {self.segment_count}"
+            )
+        
+        self.nonces = [base64.b64decode(s["nonce"]) for s in segments]
+        self.tags = [base64.b64decode(s["tag"]) for s in segments]
+    
+    def bounds(self, index: int) -> Tuple[int, int]:
+        """Offset and length of a segment (identical for plaintext and ciphertext)."""
+        offset = index * self.segment_size
+        return offset, min(self.segment_size, self.original_size - offset)
+    
+    def decryptor(self, dek: bytes, index: int):
+        """Authenticated decryptor for one segment."""
+        decryptor = Cipher(
+            algorithms.AES(dek),
+            modes.GCM(self.nonces[index], self.tags[index]),
+            backend=default_backend()
+        ).decryptor()
+        decryptor.authenticate_additional_data(_gcm_aad(index, self.segment_count))
+        return decryptor
+
+
+def _finalize_gcm_segment(decryptor, index: int):
+    """Verify a segment's tag, reporting which segment failed."""
+    try:
+        decryptor.finalize()
+    except InvalidTag:
+        raise ValueError(f"Integrity check failed for segment {index}")
+
+
+def _decrypt_gcm_segment(fd: int, base: int, layout: _GCMLayout, dek: bytes, index: int) -> bytes:
+    """Decrypt and authenticate one GCM segment."""
+    offset, length = layout.bounds(index)
+    decryptor = layout.decryptor(dek, index)
+    plaintext = decryptor.update(_pread_exact(fd, length, base + offset))
+    _finalize_gcm_segment(decryptor, index)
+    return plaintext
+
+
+def decrypt_gcm_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    dek: bytes,
+    metadata: Dict[str, Any],
+    threads: int = DEFAULT_THREADS
+) -> int:
+    """
+    Decrypt a v2 container on a thread pool, writing plaintext in order.
+    
+    Every segment is authenticated by its GCM tag before it is written.
+    
+    Args:
+        src: Readable binary file object positioned at the ciphertext
+        dst: Writable binary file object for the plaintext
+        dek: Data encryption key
+        metadata: Encryption metadata carrying the segment index
+        threads: Number of decryption threads
+    
+    Returns:
+        Plaintext size in bytes
+    """
+    layout = _GCMLayout(metadata)
+    fd = src.fileno()
+    base = src.tell()
+    
+    jobs = ((fd, base, layout, dek, index) for index in range(layout.segment_count))
+    for plaintext, _ in _map_in_order(_decrypt_gcm_segment, jobs, threads, "gcm-decrypt"):
+        dst.write(plaintext)
+    
+    return layout.original_size
+
+
+def decrypt_gcm_to_memory(
+    src: BinaryIO,
+    dek: bytes,
+    metadata: Dict[str, Any],
+    threads: int = DEFAULT_THREADS
+) -> io.BytesIO:
+    """
+    Decrypt a v2 container into a preallocated in-memory buffer.
+    
+    Segments are decrypted concurrently straight into their slices of the
+    buffer and each is authenticated by its GCM tag.
+    
+    Args:
+        src: Readable binary file object positioned at the ciphertext
+        dek: Data encryption key
+        metadata: Encryption metadata carrying the segment index
+        threads: Number of decryption threads
+    
+    Returns:
+        BytesIO holding the plaintext, positioned at the start
+    """
+    layout = _GCMLayout(metadata)
+    fd = src.fileno()
+    base = src.tell()
+    plaintext = _allocate_buffer(layout.original_size)
+    
+    with plaintext.getbuffer() as out_view:
+        def decrypt_segment(index: int):
+            offset, length = layout.bounds(index)
+            decryptor = layout.decryptor(dek, index)
+            decryptor.update_into(_pread_exact(fd, length, base + offset), out_view[offset:])
+            _finalize_gcm_segment(decryptor, index)
+        
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="gcm-decrypt") as pool:
+            for future in [
+                pool.submit(decrypt_segment, index)
+                for index in range(layout.segment_count)
+            ]:
+                future.result()
+    
+    plaintext.truncate(layout.original_size)
+    plaintext.seek(0)
+    return plaintext
+
+
+def decrypt_gcm_range(
+    src: BinaryIO,
+    dek: bytes,
+    metadata: Dict[str, Any],
+    offset: int,
+    length: int,
+    threads: int = DEFAULT_THREADS
+) -> bytes:
+    """
+    Decrypt an arbitrary plaintext byte range of a v2 container.
+    
+    Only the segments overlapping the range are read and authenticated.
+    
+    Args:
+        src: Readable binary file object positioned at the ciphertext
+        dek: Data encryption key
+        metadata: Encryption metadata carrying the segment index
+        offset: Plaintext offset of the first byte to return
+        length: Number of bytes to return (clipped at end of model)
+        threads: Number of decryption threads
+    
+    Returns:
+        Decrypted bytes of the requested range
+    """
+    if offset < 0 or length < 0:
+        raise ValueError("Offset and length must be non-negative")
+    
+    end = min(offset + length, int(metadata["original_size"]))
+    buffer = bytearray(max(end - offset, 0))
+    decrypt_gcm_range_into(src, dek, metadata, offset, buffer, threads)
+    return bytes(buffer)
+
+
+def decrypt_gcm_range_into(
+    src: BinaryIO,
+    dek: bytes,
+    metadata: Dict[str, Any],
+    offset: int,
+    buffer,
+    threads: int = DEFAULT_THREADS
+):
+    """
+    Decrypt the plaintext byte range [offset, offset + len(buffer)) into buffer.
+    
+    Only the segments overlapping the range are read, authenticated and
+    checked against the integrity tree, and each is copied straight into
+    place, so callers can map the plaintext without further copies.
+    
+    Args:
+        src: Readable binary file object positioned at the ciphertext
+        dek: Data encryption key
+        metadata: Encryption metadata carrying the segment index
+        offset: Plaintext offset of the first byte
+        buffer: Writable buffer that receives the plaintext
+        threads: Number of decryption threads
+    """
+    layout = _GCMLayout(metadata)
+    out = memoryview(buffer).cast("B")
+    
+    end = offset + len(out)
+    if offset < 0:
+        raise ValueError("Offset must be non-negative")
+    if offset == end:
+        return
+    if end > layout.original_size:
+        raise ValueError(f"Range {offset}-{end} is outside the model")
+    
+    fd = src.fileno()
+    base = src.tell()
+    first = offset // layout.segment_size
+    last = (end - 1) // layout.segment_size
+    
+    # Tree chunks coincide with segments, so only the chunks read are checked
+    tree = None
+    if has_integrity_tree(metadata):
+        tree = _MerkleTree(metadata)
+        if tree.chunk_size != layout.segment_size:
+            raise ValueError("Integrity tree chunks do not match the segment size")
+    
+    jobs = ((fd, base, layout, dek, index) for index in range(first, last + 1))
+    results = _map_in_order(_decrypt_gcm_segment, jobs, threads, "gcm-decrypt")
+    for index, (plaintext, _) in enumerate(results, first):
+        if tree is not None:
+            tree.verify_chunk(index, plaintext)
+        
+        segment_start = index * layout.segment_size
+        lo = max(offset, segment_start)
+        hi = min(end, segment_start + len(plaintext))
+        out[lo - offset:hi - offset] = plaintext[lo - segment_start:hi - segment_start]
+
+
+def _merkle_leaf(data) -> bytes:
+    """Hash one plaintext chunk as a tree leaf, domain-separated from inner nodes."""
+    hasher = hashlib.sha256(b"\x00")
+    hasher.update(data)
+    return hasher.digest()
+
+
+def _merkle_root(leaves: List[bytes]) -> bytes:
+    """Fold leaf hashes pairwise up to the root; an odd last node is promoted."""
+    level = list(leaves)
+    while len(level) > 1:
+        level = [
+            hashlib.sha256(b"\x01" + level[i] + level[i + 1]).digest()
+            if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+    return level[0]
+
+
+def _integrity_tree(leaves: List[bytes], chunk_size: int) -> Dict[str, Any]:
+    """Metadata entry describing a Merkle tree over plaintext chunks."""
+    return {
+        "algorithm": MERKLE_ALGORITHM,
+        "chunk_size": chunk_size,
+        "root": _merkle_root(leaves).hex(),
+        "leaves": [leaf.hex() for leaf in leaves]
+    }
+
+
+def has_integrity_tree(metadata: Dict[str, Any]) -> bool:
+    """Whether metadata carries a Merkle tree of plaintext chunk hashes."""
+    return "integrity" in metadata
+
+
+class _MerkleTree:
+    """Decoded integrity tree, checked for consistency with its root."""
+    
+    def __init__(self, metadata: Dict[str, Any]):
+        integrity = metadata["integrity"]
+        if integrity.get("algorithm") != MERKLE_ALGORITHM:
+            raise ValueError(f"Unsupported integrity algorithm: {integrity.get('algorithm')}")
+        
+        self.size = metadata["original_size"]
+        self.chunk_size = integrity["chunk_size"]
+        self.leaves = [bytes.fromhex(leaf) for leaf in integrity["leaves"]]
+        
+        if len(self.leaves) != _segment_count(self.size, self.chunk_size):
+            raise ValueError(
+                f"Integrity tree has {len(self.leaves)} leaves, "
+                f"expected {_segment_count(self.size, self.chunk_size)}"
+            )
+        if _merkle_root(self.leaves).hex() != integrity["root"]:
+            raise ValueError("Integrity tree leaves do not match its root")
+    
+    def bounds(self, index: int) -> Tuple[int, int]:
+        """Plaintext offset and length of a chunk."""
+        offset = index * self.chunk_size
+        return offset, min(self.chunk_size, self.size - offset)
+    
+    def verify_chunk(self, index: int, data):
+        """Check one plaintext chunk against its leaf, reporting which chunk failed."""
+        if _merkle_leaf(data) != self.leaves[index]:
+            raise ValueError(f"Integrity check failed for chunk {index}")
+
+
+def _verify_tree(metadata: Dict[str, Any], read_chunk: Callable, size: int, threads: int):
+    """Verify every chunk in parallel, stopping at the first corrupted one."""
+    tree = _MerkleTree(metadata)
+    if size != tree.size:
+        raise ValueError(f"Plaintext is {size} bytes, expected {tree.size}")
+    
+    def verify(index: int):
+        tree.verify_chunk(index, read_chunk(*tree.bounds(index)))
+    
+    # At most `threads` chunks are in flight, so a failure stops further hashing
+    jobs = ((index,) for index in range(len(tree.leaves)))
+    for _ in _map_in_order(verify, jobs, threads, "tree-verify"):
+        pass
+
+
+def verify_buffer(view, metadata: Dict[str, Any], threads: int = DEFAULT_THREADS):
+    """
+    Verify an in-memory plaintext against its integrity tree.
+    
+    Args:
+        view: Bytes-like plaintext
+        metadata: Encryption metadata carrying the integrity tree
+        threads: Number of hashing threads
+    
+    Raises:
+        ValueError: Naming the first chunk that does not match
+    """
+    view = memoryview(view)
+    _verify_tree(metadata, lambda offset, length: view[offset:offset + length], len(view), threads)
+
+
+def verify_fd(fd: int, metadata: Dict[str, Any], threads: int = DEFAULT_THREADS):
+    """
+    Verify a plaintext file descriptor against its integrity tree.
+    
+    Args:
+        fd: File descriptor of the plaintext (regular file or memfd)
+        metadata: Encryption metadata carrying the integrity tree
+        threads: Number of hashing threads
+    
+    Raises:
+        ValueError: Naming the first chunk that does not match
+    """
+    _verify_tree(
+        metadata,
+        lambda offset, length: _pread_exact(fd, length, offset),
+        os.fstat(fd).st_size,
+        threads
+    )
+
+
+def verify_file(path: str, metadata: Dict[str, Any], threads: int = DEFAULT_THREADS):
+    """
+    Verify a plaintext file that was not decrypted by this process.
+    
+    Nothing is assumed about how the file was written: the integrity tree is
+    verified if the metadata has one, otherwise the size and whole-file
+    SHA-256 are compared with the metadata, for v2 containers too.
+    
+    Args:
+        path: Path of the plaintext
+        metadata: Encryption metadata
+        threads: Number of hashing threads
+    
+    Raises:
+        ValueError: If the plaintext does not match the metadata
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if has_integrity_tree(metadata):
+            verify_fd(fd, metadata, threads)
+            return
+        
+        size = os.fstat(fd).st_size
+        if size != metadata["original_size"]:
+            raise ValueError(f"Plaintext is {size} bytes, expected {metadata['original_size']}")
+        hasher = hashlib.sha256()
+        for chunk in iter(lambda: os.read(fd, DEFAULT_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+        if hasher.hexdigest() != metadata["original_hash"]:
+            raise ValueError("Model checksum verification failed")
+    finally:
+        os.close(fd)
+
+
+def is_segmented(metadata: Dict[str, Any]) -> bool:
+    """Whether metadata describes a v2 segmented AES-GCM container."""
+    return metadata.get("version") == FORMAT_VERSION_GCM
+
+
+def decrypt_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    dek: bytes,
+    metadata: Dict[str, Any],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    threads: int = 1,
+    hash_plaintext: bool = True
+) -> Tuple[int, Optional[str]]:
+    """
+    Decrypt any supported container version from one file object into another.
+    
+    Args:
+        src: Readable binary file object positioned at the ciphertext
+        dst: Writable binary file object for the plaintext
+        dek: Data encryption key
+        metadata: Encryption metadata
+        chunk_size: Number of ciphertext bytes processed per iteration (v1)
+        threads: Number of decryption threads
+        hash_plaintext: Compute the whole-file SHA-256 of a v1 plaintext
+    
+    Returns:
+        Tuple of (plaintext size, plaintext SHA-256 hex digest); the digest is
+        None for v2 containers, whose segments are authenticated by GCM tags,
+        and when hash_plaintext is False
+    """
+    if is_segmented(metadata):
+        return decrypt_gcm_stream(src, dst, dek, metadata, threads), None
+    
+    iv = base64.b64decode(metadata["iv"])
+    return decrypt_cbc_stream(src, dst, dek, iv, chunk_size, threads, hash_plaintext)
+
+
+def verify_plaintext(
+    metadata: Dict[str, Any],
+    calculated_hash: Optional[str] = None,
+    fd: Optional[int] = None,
+    view=None,
+    threads: int = DEFAULT_THREADS
+):
+    """
+    Verify a decrypted plaintext with the strongest check the metadata allows.
+    
+    An integrity tree is verified chunk by chunk in parallel; otherwise a v1
+    plaintext's SHA-256 is compared with metadata["original_hash"]. v2
+    segments without a tree are already authenticated by their GCM tags.
+    
+    Args:
+        metadata: Encryption metadata
+        calculated_hash: Whole-file SHA-256 computed during decryption, if any
+        fd: File descriptor of the plaintext, for tree or hash verification
+        view: Bytes-like plaintext, for tree or hash verification
+        threads: Number of hashing threads
+    
+    Raises:
+        ValueError: If the plaintext does not match the metadata
+    """
+    if has_integrity_tree(metadata):
+        if view is not None:
+            verify_buffer(view, metadata, threads)
+        else:
+            verify_fd(fd, metadata, threads)
+        return
+    
+    if is_segmented(metadata):
+        return
+    
+    if calculated_hash is None:
+        if view is not None:
+            calculated_hash = hashlib.sha256(view).hexdigest()
+        else:
+            hasher = hashlib.sha256()
+            for chunk in iter(lambda: os.read(fd, DEFAULT_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+            calculated_hash = hasher.hexdigest()
+    if calculated_hash != metadata["original_hash"]:
+        raise ValueError("Model checksum verification failed")
+
+
+def decrypt_file(
+    encrypted_path: str,
+    output_path: str,
+    dek: bytes,
+    metadata: Dict[str, Any],
+    verify_hash: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    threads: int = 1
+) -> int:
+    """
+    Decrypt an encrypted model file to disk in bounded memory.
+    
+    The plaintext is written to a temporary sibling file and only renamed
+    into place once decryption and integrity checks succeed.
+    
+    Args:
+        encrypted_path: Path to encrypted model file
+        output_path: Path to save decrypted model
+        dek: Data encryption key
+        metadata: Encryption metadata
+        verify_hash: Verify the plaintext against the integrity tree, or a
+            v1 plaintext against metadata["original_hash"]
+        chunk_size: Number of ciphertext bytes processed per iteration (v1)
+        threads: Number of decryption threads
+    
+    Returns:
+        Plaintext size in bytes
+    """
+    # A tree is verified in parallel afterwards; skip the serial whole-file hash
+    use_tree = verify_hash and has_integrity_tree(metadata)
+    
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    partial_path = make_partial_path(output_path)
+    try:
+        with open(encrypted_path, 'rb', buffering=0) as src, \
+                open(partial_path, 'wb', buffering=chunk_size) as dst:
+            plaintext_size, calculated_hash = decrypt_stream(
+                src, dst, dek, metadata, chunk_size, threads, not use_tree
+            )
+        
+        if verify_hash:
+            with open(partial_path, 'rb', buffering=0) as plaintext:
+                verify_plaintext(metadata, calculated_hash, fd=plaintext.fileno(), threads=threads)
+        
+        os.replace(partial_path, output_path)
+        return plaintext_size
+    
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+
+def decrypt_to_memory(
+    src: BinaryIO,
+    dek: bytes,
+    metadata: Dict[str, Any],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    threads: int = 1,
+    verify: bool = False
+) -> io.BytesIO:
+    """
+    Decrypt any supported container version into a preallocated buffer.
+    
+    Args:
+        src: Readable binary file object positioned at the ciphertext
+        dek: Data encryption key
+        metadata: Encryption metadata
+        chunk_size: Number of ciphertext bytes processed per iteration (v1)
+        threads: Number of decryption threads
+        verify: Verify the plaintext with verify_plaintext before returning
+    
+    Returns:
+        BytesIO holding the plaintext, positioned at the start
+    """
+    if is_segmented(metadata):
+        plaintext = decrypt_gcm_to_memory(src, dek, metadata, threads)
+    else:
+        iv = base64.b64decode(metadata["iv"])
+        ciphertext_size = os.fstat(src.fileno()).st_size - src.tell()
+        plaintext = decrypt_cbc_to_memory(src, ciphertext_size, dek, iv, chunk_size, threads)
+    
+    if verify:
+        with plaintext.getbuffer() as view:
+            verify_plaintext(metadata, view=view, threads=threads)
+    
+    return plaintext
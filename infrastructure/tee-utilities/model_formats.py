@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Model Serialisation Formats
+Format detection and safetensors header parsing shared by the Key Vault
+model tools and TEE loaders. Has no framework dependencies.
+"""
+
+import os
+import json
+import struct
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Values of metadata["model_format"]
+FORMAT_SAFETENSORS = "safetensors"
+FORMAT_PYTORCH = "pytorch"
+FORMAT_ONNX = "onnx"
+FORMAT_KERAS = "keras"
+
+_SUFFIX_FORMATS = {
+    ".safetensors": FORMAT_SAFETENSORS,
+    ".pt": FORMAT_PYTORCH,
+    ".pth": FORMAT_PYTORCH,
+    ".onnx": FORMAT_ONNX,
+    ".h5": FORMAT_KERAS,
+    ".keras": FORMAT_KERAS
+}
+
+# Upper bound on the JSON header, as enforced by the reference implementation
+SAFETENSORS_MAX_HEADER_SIZE = 100 * 1024 * 1024
+
+
+def detect_model_format(model_name: str) -> Optional[str]:
+    """
+    Detect a model's serialisation format from its file name.
+    
+    Args:
+        model_name: Plaintext model file name; a trailing ".encrypted" is ignored
+    
+    Returns:
+        One of the FORMAT_* values, or None if the suffix is not recognised
+    """
+    if model_name.endswith(".encrypted"):
+        model_name = model_name[:-len(".encrypted")]
+    return _SUFFIX_FORMATS.get(os.path.splitext(model_name)[1].lower())
+
+
+def parse_safetensors_header(data, size: Optional[int] = None) -> Tuple[Dict[str, Any], int]:
+    """
+    Parse and validate a safetensors header.
+    
+    A safetensors file is an 8-byte little-endian header length, a JSON
+    header mapping tensor names to dtype, shape and [start, end) byte
+    offsets, and the raw tensor data those offsets index.
+    
+    Args:
+        data: Buffer holding at least the length prefix and JSON header
+        size: Total file size used to bounds-check tensor offsets
+            (default: len(data))
+    
+    Returns:
+        Tuple of (tensor entries by name, offset of the data section);
+        the optional "__metadata__" entry is dropped
+    """
+    size = len(data) if size is None else size
+    if size < 8:
+        raise ValueError("Not a safetensors file: too short")
+    
+    (header_size,) = struct.unpack_from("<Q", data, 0)
+    if header_size > SAFETENSORS_MAX_HEADER_SIZE or 8 + header_size > size:
+        raise ValueError(f"Invalid safetensors header size: {header_size}")
+    
+    try:
+        header = json.loads(bytes(data[8:8 + header_size]))
+    except ValueError as e:
+        raise ValueError(f"Invalid safetensors header: {e}")
+    if not isinstance(header, dict):
+        raise ValueError("Invalid safetensors header: not an object")
+    
+    header.pop("__metadata__", None)
+    data_offset = 8 + header_size
+    
+    for name, entry in header.items():
+        start, end = entry["data_offsets"]
+        if not 0 <= start <= end or data_offset + end > size:
+            raise ValueError(f"Tensor {name} lies outside the safetensors data section")
+    
+    return header, data_offset
+
+
+def read_safetensors_header(path: str) -> Tuple[Dict[str, Any], int]:
+    """
+    Read and validate the header of a safetensors file without loading tensors.
+    
+    Args:
+        path: Path to safetensors file
+    
+    Returns:
+        Tuple of (tensor entries by name, offset of the data section)
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        prefix = f.read(8)
+        if len(prefix) < 8:
+            raise ValueError(f"Not a safetensors file: {path}")
+        
+        (header_size,) = struct.unpack("<Q", prefix)
+        if header_size > SAFETENSORS_MAX_HEADER_SIZE:
+            raise ValueError(f"Invalid safetensors header size: {header_size}")
+        
+        return parse_safetensors_header(prefix + f.read(header_size), size)
+
+
+def safetensors_tensor_index(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the per-tensor index stored in encryption metadata.
+    
+    Args:
+        path: Path to safetensors file
+    
+    Returns:
+        Tensor name -> dtype, shape and absolute plaintext offset and length
+    """
+    header, data_offset = read_safetensors_header(path)
+    return {
+        name: {
+            "dtype": entry["dtype"],
+            "shape": entry["shape"],
+            "offset": data_offset + entry["data_offsets"][0],
+            "length": entry["data_offsets"][1] - entry["data_offsets"][0]
+        }
+        for name, entry in header.items()
+    }
@@ -111,14 +111,13 @@ class ReadinessProbe:
         try:
             logger.info(f"Checking Key Vault access: {keyvault_url}")
             
-            from azure.identity import DefaultAzureCredential
-            from azure.keyvault.secrets import SecretClient
+            from keyvault_clients import get_limiter, get_secret_client
             
-            credential = DefaultAzureCredential()
-            client = SecretClient(vault_url=keyvault_url, credential=credential)
+            # Pooled client: repeated probes reuse the token and connection
+            client = get_secret_client(keyvault_url)
             
             # Try to list secrets (just to verify access)
-            list(client.list_properties_of_secrets())
+            get_limiter(keyvault_url).call(lambda: list(client.list_properties_of_secrets()))
             
             logger.info("Key Vault access verified")
             self.checks_passed.append("keyvault:accessible")
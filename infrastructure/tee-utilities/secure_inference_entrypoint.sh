@@ -13,6 +13,11 @@ MODEL_STORAGE="${MODEL_STORAGE:-/models}"
 CACHE_DIR="${CACHE_DIR:-/secure/cache}"
 KEYVAULT_URL="${KEYVAULT_URL:-}"
 ATTESTATION_REQUIRED="${ATTESTATION_REQUIRED:-true}"
+MODEL_LOAD_WORKERS="${MODEL_LOAD_WORKERS:-2}"
+MODEL_LOAD_REPORT="${MODEL_LOAD_REPORT:-/var/log/secure-inference-model-load.json}"
+# Set to a tmpfs directory (e.g. /dev/shm/secure-models) to decrypt each model
+# once and let every inference worker map the same weights
+MODEL_SHARED_DIR="${MODEL_SHARED_DIR:-}"
 
 # Logging function
 log() {
@@ -49,6 +54,11 @@ cleanup() {
         rm -rf "$CACHE_DIR"
     fi
     
+    # Shared plaintext lives in tmpfs; unlinking it is enough
+    if [ -n "$MODEL_SHARED_DIR" ] && [ -d "$MODEL_SHARED_DIR" ]; then
+        rm -rf "$MODEL_SHARED_DIR"
+    fi
+    
     # Clear environment variables
     unset KEYVAULT_URL
     unset MODEL_ENCRYPTION_KEY
@@ -150,19 +160,18 @@ load_models() {
     
     log_info "Found ${#model_files[@]} encrypted model(s)"
     
-    # Decrypt models using secure model loader
-    for model_file in "${model_files[@]}"; do
-        local model_name=$(basename "$model_file" .encrypted)
-        log_info "Decrypting model: $model_name"
-        
-        python3 "$SCRIPT_DIR/secure_model_loader.py" \
-            --model-path "$model_file" \
-            --keyvault-url "$KEYVAULT_URL" \
-            ${ATTESTATION_REQUIRED:+--skip-attestation} \
-            || error_exit "Failed to decrypt model: $model_name"
-    done
-    
-    log_info "All models loaded successfully"
+    # Decrypt every model in one loader process, so attestation, the Python
+    # imports and Key Vault authentication are paid once
+    python3 "$SCRIPT_DIR/secure_model_loader.py" \
+        --model-dir "$MODEL_STORAGE" \
+        --keyvault-url "$KEYVAULT_URL" \
+        --workers "$MODEL_LOAD_WORKERS" \
+        --report "$MODEL_LOAD_REPORT" \
+        ${MODEL_SHARED_DIR:+--shared-dir "$MODEL_SHARED_DIR"} \
+        ${ATTESTATION_REQUIRED:+--skip-attestation} \
+        || error_exit "Failed to decrypt models (see $MODEL_LOAD_REPORT)"
+    
+    log_info "All models loaded successfully (timing report: $MODEL_LOAD_REPORT)"
 }
 
 # Verify model integrity
@@ -200,6 +209,12 @@ configure_inference_service() {
     export INFERENCE_WORKERS="${INFERENCE_WORKERS:-4}"
     export INFERENCE_TIMEOUT="${INFERENCE_TIMEOUT:-60}"
     
+    # Workers' loaders map the weights decrypted by load_models
+    if [ -n "$MODEL_SHARED_DIR" ]; then
+        export MODEL_SHARED_DIR
+        log_info "Sharing decrypted models across workers via $MODEL_SHARED_DIR"
+    fi
+    
     # GPU configuration
     if command -v nvidia-smi &> /dev/null; then
         export CUDA_VISIBLE_DEVICES="${CUDA_VISIBLE_DEVICES:-0}"
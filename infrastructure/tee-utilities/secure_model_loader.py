@@ -8,12 +8,34 @@ Validates attestation and ensures secure model handling.
 import os
 import sys
 import json
+import mmap
+import copy
+import fcntl
+import time
+import shutil
+import hashlib
+import asyncio
 import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
 from pathlib import Path
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Callable, List, Tuple, Union, BinaryIO
 import torch
 import numpy as np
 from key_loader import KeyLoader
+from model_cache import ModelCache
+from model_crypto import verify_file
+from load_pipeline import LoadPipeline
+from lazy_model import LazyModel
+from model_formats import (
+    FORMAT_KERAS,
+    FORMAT_ONNX,
+    FORMAT_SAFETENSORS,
+    detect_model_format,
+    parse_safetensors_header
+)
 from attestation_validator import AttestationValidator
 
 logging.basicConfig(
@@ -22,6 +44,73 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Read size used to pull ciphertext into the page cache ahead of decryption
+PREFETCH_CHUNK_SIZE = 8 * 1024 * 1024
+
+# safetensors dtype names and the torch dtypes they map to
+_SAFETENSORS_DTYPES = {
+    "F64": "float64",
+    "F32": "float32",
+    "F16": "float16",
+    "BF16": "bfloat16",
+    "I64": "int64",
+    "I32": "int32",
+    "I16": "int16",
+    "I8": "int8",
+    "U8": "uint8",
+    "BOOL": "bool",
+    "F8_E4M3": "float8_e4m3fn",
+    "F8_E5M2": "float8_e5m2"
+}
+
+
+@contextmanager
+def _timed_phase(timings: Optional[Dict[str, float]], phase: str):
+    """Record the wall time of a load phase in seconds, if timings is given."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[phase] = round(time.perf_counter() - started, 3)
+
+
+def _map_tensor(buffer, name: str, dtype_name: str, shape: List[int], offset: int, length: int) -> torch.Tensor:
+    """Create a tensor viewing length bytes of buffer at offset, without copying."""
+    dtype = getattr(torch, _SAFETENSORS_DTYPES.get(dtype_name, ""), None)
+    if dtype is None:
+        raise ValueError(f"Unsupported safetensors dtype for {name}: {dtype_name}")
+    
+    count = int(np.prod(shape)) if shape else 1
+    if length != count * dtype.itemsize:
+        raise ValueError(f"Tensor {name} size does not match its shape")
+    
+    if count == 0:
+        return torch.empty(shape, dtype=dtype)
+    return torch.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+
+def _tensors_from_safetensors(buffer) -> Dict[str, torch.Tensor]:
+    """
+    Map the tensors of a safetensors buffer without copying their data.
+    
+    Each tensor is a view of buffer, which it keeps alive, so buffer must be
+    writable and must not be modified or reused afterwards.
+    """
+    header, data_offset = parse_safetensors_header(buffer)
+    
+    return {
+        name: _map_tensor(
+            buffer,
+            name,
+            entry["dtype"],
+            entry["shape"],
+            data_offset + entry["data_offsets"][0],
+            entry["data_offsets"][1] - entry["data_offsets"][0]
+        )
+        for name, entry in header.items()
+    }
+
 
 class SecureModelLoader:
     """Securely loads and manages AI models in TEE environment."""
@@ -30,7 +119,13 @@ class SecureModelLoader:
         self,
         keyvault_url: Optional[str] = None,
         validate_attestation: bool = True,
-        cache_dir: str = "/secure/models"
+        cache_dir: str = "/secure/models",
+        decrypt_in_memory: bool = True,
+        use_memfd: bool = False,
+        max_cache_bytes: Optional[int] = None,
+        async_load_workers: int = 2,
+        weights_only: bool = True,
+        shared_dir: Optional[str] = None
     ):
         """
         Initialize secure model loader.
@@ -39,10 +134,34 @@ class SecureModelLoader:
             keyvault_url: Azure Key Vault URL (default: from environment)
             validate_attestation: Whether to validate TEE attestation
             cache_dir: Directory for decrypted model cache
+            decrypt_in_memory: Decrypt PyTorch and ONNX models straight into
+                memory instead of staging plaintext in cache_dir
+            use_memfd: Hand loaders that need a file path an anonymous memfd
+                instead of a plaintext file in cache_dir (Linux only)
+            max_cache_bytes: Byte budget for loaded models; least recently
+                used unpinned models are evicted beyond it (default: from
+                MODEL_CACHE_MAX_BYTES, unbounded if unset)
+            async_load_workers: Threads that decrypt and deserialise models
+                for load_encrypted_model_async
+            weights_only: Restrict PyTorch pickles to tensors and plain
+                containers; set False only for trusted full-module pickles
+            shared_dir: tmpfs directory (e.g. /dev/shm/secure-models) in
+                which each model is decrypted once and then memory-mapped
+                by every process using the same directory, such as the
+                workers of one pod (default: from MODEL_SHARED_DIR, off if
+                unset)
         """
         self.keyvault_url = keyvault_url or os.getenv("KEYVAULT_URL")
         self.validate_attestation = validate_attestation
         self.cache_dir = cache_dir
+        self.decrypt_in_memory = decrypt_in_memory
+        self.use_memfd = use_memfd
+        self.weights_only = weights_only
+        self.shared_dir = shared_dir or os.getenv("MODEL_SHARED_DIR")
+        
+        if use_memfd and not hasattr(os, "memfd_create"):
+            logger.warning("memfd_create not available, falling back to cache_dir")
+            self.use_memfd = False
         
         # Initialize components
         self.key_loader = KeyLoader(keyvault_url=self.keyvault_url)
@@ -56,8 +175,33 @@ class SecureModelLoader:
         os.makedirs(cache_dir, exist_ok=True)
         os.chmod(cache_dir, 0o700)  # Owner read/write/execute only
         
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, mode=0o700, exist_ok=True)
+            # The directory may predate this process (e.g. pre-created under
+            # world-writable /dev/shm), so only use one owned by this user
+            if os.stat(self.shared_dir).st_uid != os.geteuid():
+                raise PermissionError(f"Shared model directory is not owned by this user: {self.shared_dir}")
+            os.chmod(self.shared_dir, 0o700)
+        
         # Loaded models cache
-        self._loaded_models: Dict[str, Any] = {}
+        if max_cache_bytes is None and os.getenv("MODEL_CACHE_MAX_BYTES"):
+            max_cache_bytes = int(os.getenv("MODEL_CACHE_MAX_BYTES"))
+        self._loaded_models = ModelCache(max_bytes=max_cache_bytes)
+        
+        # In-flight loads by cache key, so concurrent callers share one decrypt
+        self._loading: Dict[str, Future] = {}
+        self._loading_lock = threading.Lock()
+        
+        # Bounded pool keeping CPU-bound decrypt/deserialise off the event loop
+        self._load_executor = ThreadPoolExecutor(
+            max_workers=async_load_workers,
+            thread_name_prefix="model-load"
+        )
+        
+        # Preload progress by model_id, see get_preload_status
+        self._preload_status: Dict[str, Dict[str, Any]] = {}
+        self._preload_lock = threading.Lock()
+        self._preload_pipeline: Optional[LoadPipeline] = None
         
         logger.info("SecureModelLoader initialized")
     
@@ -75,7 +219,7 @@ class SecureModelLoader:
                 logger.info("TEE environment validated successfully")
                 logger.info(f"TEE Type: {validation_result['tee_type']}")
                 logger.info(f"TCB Level: {validation_result['tcb_level']}")
-                
+        
         except Exception as e:
             logger.error(f"Failed to validate TEE environment: {e}")
             if self.validate_attestation:
@@ -85,82 +229,625 @@ class SecureModelLoader:
         self,
         model_path: str,
         model_type: str = "pytorch",
-        key_name: Optional[str] = None
+        key_name: Optional[str] = None,
+        timings: Optional[Dict[str, float]] = None
     ) -> Any:
         """
         Load and decrypt an encrypted model file.
         
+        Safe to call from multiple threads. Concurrent requests for the same
+        cold model are coalesced: one caller decrypts and loads it while the
+        others wait for its result. Different models load concurrently.
+        
         Args:
             model_path: Path to encrypted model file
             model_type: Type of model ('pytorch', 'tensorflow', 'onnx')
             key_name: Key Vault key name (default: from metadata)
+            timings: Optional dict that receives per-phase wall times in
+                seconds (metadata, unwrap_key, decrypt, deserialize, or
+                wait when another caller is already loading the model)
+        
+        Returns:
+            Loaded model object
+        """
+        try:
+            logger.info(f"Loading encrypted model: {model_path}")
             
+            # Check if already loaded, or being loaded by another caller
+            cache_key = f"{model_path}:{model_type}"
+            model, future, is_owner = self._begin_load(cache_key)
+            if model is not None:
+                return model
+            
+            if not is_owner:
+                logger.info(f"Waiting for in-flight load of model: {model_path}")
+                with _timed_phase(timings, "wait"):
+                    return future.result()
+            
+            def load():
+                with _timed_phase(timings, "metadata"):
+                    metadata = self._read_metadata(model_path, key_name)
+                return self._load_and_cache(
+                    model_path, model_type, cache_key, metadata, timings=timings
+                )
+            
+            return self._run_load(cache_key, future, load)
+        
+        except Exception as e:
+            logger.error(f"Failed to load encrypted model: {e}")
+            raise
+    
+    async def load_encrypted_model_async(
+        self,
+        model_path: str,
+        model_type: str = "pytorch",
+        key_name: Optional[str] = None
+    ) -> Any:
+        """
+        Load and decrypt an encrypted model file without blocking the event loop.
+        
+        The data encryption key is unwrapped with the asyncio Key Vault
+        clients, and decryption and deserialisation run on a bounded thread
+        pool. Loads are coalesced with load_encrypted_model, so sync and
+        async callers asking for the same model share one decrypt. Cancelling
+        the caller that started a load does not cancel the load itself.
+        
+        Args:
+            model_path: Path to encrypted model file
+            model_type: Type of model ('pytorch', 'tensorflow', 'onnx')
+            key_name: Key Vault key name (default: from metadata)
+        
         Returns:
             Loaded model object
         """
         try:
             logger.info(f"Loading encrypted model: {model_path}")
             
-            # Check if already loaded
             cache_key = f"{model_path}:{model_type}"
-            if cache_key in self._loaded_models:
-                logger.info("Returning cached model")
-                return self._loaded_models[cache_key]
+            model, future, is_owner = self._begin_load(cache_key)
+            if model is not None:
+                return model
             
-            # Read encryption metadata
-            metadata_path = f"{model_path}.metadata.json"
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            if not is_owner:
+                logger.info(f"Waiting for in-flight load of model: {model_path}")
+                return await asyncio.wrap_future(future)
             
-            # Get decryption key
-            if key_name is None:
-                key_name = metadata.get("key_name", "tee-model-decryption-key")
+            loop = asyncio.get_running_loop()
             
-            # Decrypt model
-            decrypted_path = os.path.join(
-                self.cache_dir,
-                f"{os.path.basename(model_path)}.decrypted"
-            )
+            async def load_async():
+                metadata = await loop.run_in_executor(
+                    self._load_executor, self._read_metadata, model_path, key_name
+                )
+                dek = await self.key_loader.unwrap_model_key_async(metadata)
+                return await loop.run_in_executor(
+                    self._load_executor,
+                    self._load_and_cache,
+                    model_path, model_type, cache_key, metadata, dek
+                )
             
-            self.key_loader.decrypt_model(
-                encrypted_path=model_path,
-                output_path=decrypted_path,
-                metadata=metadata
-            )
+            def load():
+                return self._load_and_cache(
+                    model_path, model_type, cache_key, self._read_metadata(model_path, key_name)
+                )
             
-            # Load model based on type
-            if model_type == "pytorch":
-                model = self._load_pytorch_model(decrypted_path)
-            elif model_type == "tensorflow":
-                model = self._load_tensorflow_model(decrypted_path)
-            elif model_type == "onnx":
-                model = self._load_onnx_model(decrypted_path)
-            else:
-                raise ValueError(f"Unsupported model type: {model_type}")
+            def publish(task: asyncio.Future):
+                if task.cancelled():
+                    # The event loop is shutting down; finish the load on the
+                    # thread pool so callers waiting on it still get the model
+                    try:
+                        self._load_executor.submit(self._run_load, cache_key, future, load)
+                        return
+                    except RuntimeError as e:
+                        future.set_exception(e)
+                        self._end_load(cache_key)
+                        return
+                try:
+                    error = task.exception()
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(task.result())
+                finally:
+                    self._end_load(cache_key)
+            
+            # Shielded so cancelling this caller leaves the load running for
+            # the callers coalesced onto it rather than failing them
+            task = asyncio.ensure_future(load_async())
+            task.add_done_callback(publish)
+            return await asyncio.shield(task)
+        
+        except Exception as e:
+            logger.error(f"Failed to load encrypted model: {e}")
+            raise
+    
+    def load_lazy_model(
+        self,
+        model_path: str,
+        model_type: str = "pytorch",
+        key_name: Optional[str] = None,
+        background: bool = True
+    ) -> LazyModel:
+        """
+        Return a proxy for a model whose decryption finishes later.
+        
+        Metadata is read and the data encryption key unwrapped up front, so
+        a missing model or key fails here rather than on first use. The
+        decrypt and deserialise then run on the async load pool, and the
+        proxy's first call (forward, run, predict, __call__ or any model
+        attribute) waits for them. A service can report ready once its
+        proxies exist instead of once every model is resident.
+        
+        Args:
+            model_path: Path to encrypted model file
+            model_type: Type of model ('pytorch', 'tensorflow', 'onnx')
+            key_name: Key Vault key name (default: from metadata)
+            background: Queue the decrypt now; if False it starts on first use
+        
+        Returns:
+            LazyModel proxy
+        """
+        try:
+            logger.info(f"Preparing lazy model: {model_path}")
             
-            # Cache loaded model
-            self._loaded_models[cache_key] = model
+            cache_key = f"{model_path}:{model_type}"
             
-            # Securely delete decrypted file
-            self._secure_delete(decrypted_path)
+            # Unwrapped once for the first load; reloads after eviction unwrap again
+            prepared = []
+            if cache_key not in self._loaded_models:
+                metadata = self._read_metadata(model_path, key_name)
+                prepared.append((metadata, self.key_loader.unwrap_model_key(metadata)))
+            
+            def resolve() -> Future:
+                return self._load_in_background(
+                    model_path,
+                    model_type,
+                    key_name,
+                    prepared.pop() if prepared else None
+                )
+            
+            return LazyModel(
+                resolve,
+                lambda: self.is_model_loaded(model_path, model_type),
+                model_path,
+                model_type,
+                background=background
+            )
+        
+        except Exception as e:
+            logger.error(f"Failed to prepare lazy model: {e}")
+            raise
+    
+    def _load_in_background(
+        self,
+        model_path: str,
+        model_type: str,
+        key_name: Optional[str] = None,
+        prepared: Optional[Tuple[Dict[str, Any], bytes]] = None
+    ) -> Future:
+        """
+        Get a future for a model, queueing its load on the async load pool.
+        
+        Args:
+            prepared: Optional (metadata, data encryption key) already resolved
+        
+        Returns:
+            Future resolved with the loaded model
+        """
+        cache_key = f"{model_path}:{model_type}"
+        model, future, is_owner = self._begin_load(cache_key, quiet=True)
+        if model is not None:
+            future = Future()
+            future.set_result(model)
+            return future
+        
+        if not is_owner:
+            return future
+        
+        logger.info(f"Loading lazy model in background: {model_path}")
+        
+        def load():
+            metadata, dek = prepared or (self._read_metadata(model_path, key_name), None)
+            return self._load_and_cache(model_path, model_type, cache_key, metadata, dek)
+        
+        self._load_executor.submit(self._run_load, cache_key, future, load)
+        return future
+    
+    def _begin_load(self, cache_key: str, quiet: bool = False) -> Tuple[Any, Optional[Future], bool]:
+        """
+        Return a cached model, or the in-flight load for a key.
+        
+        Args:
+            cache_key: Cache key of the model
+            quiet: Do not log cache hits (for per-call lookups by proxies)
+        
+        Returns:
+            Tuple of (cached model or None, load future, whether the caller
+            registered the future and must perform the load)
+        """
+        with self._loading_lock:
+            model = self._loaded_models.get(cache_key)
+            if model is not None:
+                if not quiet:
+                    logger.info("Returning cached model")
+                return model, None, False
+            
+            future = self._loading.get(cache_key)
+            if future is not None:
+                return None, future, False
             
-            logger.info(f"Successfully loaded model: {model_path}")
+            future = Future()
+            self._loading[cache_key] = future
+            return None, future, True
+    
+    def _end_load(self, cache_key: str):
+        """Forget a finished in-flight load."""
+        with self._loading_lock:
+            del self._loading[cache_key]
+    
+    def _run_load(self, cache_key: str, future: Future, load) -> Any:
+        """Run an owned load, publishing its outcome to waiting callers."""
+        try:
+            model = load()
+            future.set_result(model)
             return model
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._end_load(cache_key)
+    
+    def _read_metadata(self, model_path: str, key_name: Optional[str] = None) -> Dict[str, Any]:
+        """Read a model's encryption metadata, optionally overriding its key name."""
+        metadata_path = f"{model_path}.metadata.json"
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+        
+        if key_name is not None and key_name != metadata.get("key_name"):
+            # A recorded version belongs to the key the model was wrapped with
+            metadata.pop("key_version", None)
+            metadata["key_name"] = key_name
+        
+        return metadata
+    
+    def _load_and_cache(
+        self,
+        model_path: str,
+        model_type: str,
+        cache_key: str,
+        metadata: Dict[str, Any],
+        dek: Optional[bytes] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> Any:
+        """Decrypt and load a model that is not cached yet, then cache it."""
+        # Unwrap the data encryption key through Key Vault, unless another
+        # process already left the plaintext in shared memory
+        if dek is None and not self._has_shared_plaintext(model_path, metadata):
+            with _timed_phase(timings, "unwrap_key"):
+                dek = self.key_loader.unwrap_model_key(metadata)
+        
+        # Decrypt and load model
+        with _timed_phase(timings, "decrypt"):
+            source, release = self._decrypt_model(model_path, model_type, metadata, dek)
+        
+        with _timed_phase(timings, "deserialize"):
+            return self._deserialize_and_cache(
+                model_path, model_type, cache_key, metadata, source, release
+            )
+    
+    def _deserialize_and_cache(
+        self,
+        model_path: str,
+        model_type: str,
+        cache_key: str,
+        metadata: Dict[str, Any],
+        source: Any,
+        release: Callable[[], None]
+    ) -> Any:
+        """Deserialise decrypted plaintext, release it and cache the model."""
+        try:
+            model = self._load_model_file(source, self._loader_type(model_type, metadata))
+        finally:
+            release()
+        
+        # Cache loaded model, charged at its resident size
+        self._loaded_models.put(
+            cache_key,
+            model,
+            self._estimate_model_size(model, metadata.get("original_size", 0))
+        )
+        
+        logger.info(f"Successfully loaded model: {model_path}")
+        return model
+    
+    def _estimate_model_size(self, model: Any, fallback: int) -> int:
+        """
+        Estimate the resident size of a loaded model in bytes.
+        
+        PyTorch modules, state dicts and tensors are measured by their
+        (deduplicated) tensor storage, Keras models by their weights. ONNX
+        sessions do not expose their memory, so they, like anything else
+        unrecognised, are charged the plaintext size from the metadata.
+        
+        Args:
+            model: Loaded model object
+            fallback: Size to charge when the model cannot be measured
+        
+        Returns:
+            Estimated resident bytes
+        """
+        try:
+            if isinstance(model, torch.nn.Module):
+                tensors = list(model.parameters()) + list(model.buffers())
+            elif isinstance(model, torch.Tensor):
+                tensors = [model]
+            elif isinstance(model, dict):
+                tensors = [v for v in model.values() if isinstance(v, torch.Tensor)]
+            elif hasattr(model, "weights") and hasattr(model, "count_params"):
+                return sum(int(np.prod(w.shape)) * w.dtype.size for w in model.weights)
+            else:
+                return fallback
             
+            # Tied weights and views share storage; count each storage once
+            storages = {}
+            for tensor in tensors:
+                storage = tensor.untyped_storage()
+                storages[storage.data_ptr()] = storage.nbytes()
+            return sum(storages.values()) or fallback
+        
         except Exception as e:
-            logger.error(f"Failed to load encrypted model: {e}")
+            logger.warning(f"Failed to measure model size, using {fallback} bytes: {e}")
+            return fallback
+    
+    def _loader_type(self, model_type: str, metadata: Dict[str, Any]) -> str:
+        """Route PyTorch models stored as safetensors to the safetensors loader."""
+        if model_type != "pytorch":
+            return model_type
+        
+        model_format = metadata.get("model_format") or detect_model_format(
+            metadata.get("model_name", "")
+        )
+        return "safetensors" if model_format == FORMAT_SAFETENSORS else model_type
+    
+    def _decrypt_model(
+        self,
+        model_path: str,
+        model_type: str,
+        metadata: Dict[str, Any],
+        dek: Optional[bytes]
+    ) -> Tuple[Any, Callable[[], None]]:
+        """
+        Decrypt a model into the form its loader reads.
+        
+        With shared_dir set every model is decrypted (at most once per
+        directory) into shared memory. Otherwise PyTorch (pickle or
+        safetensors) and ONNX models are decrypted into memory when
+        decrypt_in_memory is set, and other models go to a memfd or a
+        plaintext file in cache_dir.
+        
+        Returns:
+            Tuple of (source for _load_model_file, callable that releases
+            the plaintext once the model is deserialised)
+        """
+        model_type = self._loader_type(model_type, metadata)
+        
+        if self.shared_dir:
+            return self._decrypt_to_shared(model_path, metadata, dek)
+        elif self.decrypt_in_memory and model_type in ("pytorch", "safetensors", "onnx"):
+            return self._decrypt_to_memory(model_path, model_type, metadata, dek)
+        elif self.use_memfd:
+            return self._decrypt_to_memfd(model_path, metadata, dek)
+        else:
+            return self._decrypt_to_disk(model_path, metadata, dek)
+    
+    def _shared_path(self, model_path: str, metadata: Dict[str, Any]) -> str:
+        """Path of a model's plaintext in shared_dir, unique to its location and content."""
+        identity = f"{os.path.abspath(model_path)}:{metadata.get('original_hash')}"
+        digest = hashlib.sha256(identity.encode()).hexdigest()[:32]
+        
+        # Keep the original name last so suffix-sniffing loaders still work
+        model_name = metadata.get("model_name") or os.path.basename(model_path)
+        return os.path.join(self.shared_dir, f"{digest}-{model_name}")
+    
+    def _has_shared_plaintext(self, model_path: str, metadata: Dict[str, Any]) -> bool:
+        """Whether a model's plaintext is already in shared_dir; it is verified before use."""
+        return bool(self.shared_dir) and os.path.exists(self._shared_path(model_path, metadata))
+    
+    def _decrypt_to_shared(
+        self,
+        model_path: str,
+        metadata: Dict[str, Any],
+        dek: Optional[bytes]
+    ) -> Tuple[str, Callable[[], None]]:
+        """
+        Decrypt a model into shared_dir once; later callers reuse the plaintext.
+        
+        A per-model file lock makes concurrent processes wait for the first
+        one's decrypt instead of repeating it, and the plaintext is verified
+        and renamed into place before the lock is released, so it is only
+        ever observed complete. The file is left in place for other
+        processes; loaders memory-map it, so its pages are shared.
+        
+        Later processes skip the Key Vault unwrap and the decrypt, but never
+        trust the file by its name: it is verified against the metadata's
+        integrity tree (or size and hash) first, and decrypted again if it
+        does not match.
+        """
+        shared_path = self._shared_path(model_path, metadata)
+        
+        with open(f"{shared_path}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            
+            verified = False
+            if os.path.exists(shared_path):
+                try:
+                    verify_file(shared_path, metadata)
+                    verified = True
+                except ValueError as e:
+                    logger.warning(f"Discarding shared plaintext of model {model_path}: {e}")
+                    os.remove(shared_path)
+            
+            if verified:
+                logger.info(f"Mapping shared plaintext of model: {model_path}")
+            else:
+                if dek is None:
+                    dek = self.key_loader.unwrap_model_key(metadata)
+                
+                self.key_loader.decrypt_model(
+                    encrypted_path=model_path,
+                    output_path=shared_path,
+                    metadata=metadata,
+                    dek=dek
+                )
+                logger.info(f"Decrypted model into shared memory: {shared_path}")
+        
+        return shared_path, lambda: None
+    
+    def _decrypt_to_memory(
+        self,
+        model_path: str,
+        model_type: str,
+        metadata: Dict[str, Any],
+        dek: bytes
+    ) -> Tuple[Any, Callable[[], None]]:
+        """Decrypt a model into memory so it deserialises without a disk round trip."""
+        plaintext = self.key_loader.decrypt_model_to_memory(
+            encrypted_path=model_path,
+            metadata=metadata,
+            dek=dek
+        )
+        
+        if model_type == "pytorch":
+            return plaintext, plaintext.close
+        if model_type == "safetensors":
+            # The tensors become views of the plaintext buffer, which lives
+            # as long as they do
+            return plaintext.getbuffer(), lambda: None
+        # InferenceSession needs bytes; getvalue() shares the buffer
+        return plaintext.getvalue(), plaintext.close
+    
+    def _decrypt_to_disk(
+        self,
+        model_path: str,
+        metadata: Dict[str, Any],
+        dek: bytes
+    ) -> Tuple[str, Callable[[], None]]:
+        """Decrypt a model into the cache directory; releasing shreds the plaintext."""
+        # Unique per load, so concurrent loads never share or shred each other's file
+        fd, decrypted_path = tempfile.mkstemp(
+            prefix=f"{os.path.basename(model_path)}.",
+            suffix=".decrypted",
+            dir=self.cache_dir
+        )
+        os.close(fd)
+        
+        try:
+            self.key_loader.decrypt_model(
+                encrypted_path=model_path,
+                output_path=decrypted_path,
+                metadata=metadata,
+                dek=dek
+            )
+        except Exception:
+            self._secure_delete(decrypted_path)
+            raise
+        
+        # Securely delete decrypted file once loaded
+        return decrypted_path, lambda: self._secure_delete(decrypted_path)
+    
+    def _decrypt_to_memfd(
+        self,
+        model_path: str,
+        metadata: Dict[str, Any],
+        dek: bytes
+    ) -> Tuple[str, Callable[[], None]]:
+        """Decrypt a model into an anonymous memfd, exposed through a /proc path."""
+        fd = self.key_loader.decrypt_model_to_memfd(
+            encrypted_path=model_path,
+            metadata=metadata,
+            dek=dek
+        )
+        link_dir = tempfile.mkdtemp(dir=self.cache_dir)
+        
+        def release():
+            shutil.rmtree(link_dir, ignore_errors=True)
+            os.close(fd)
+        
+        try:
+            # Loaders such as Keras pick the format from the file suffix, so
+            # expose the memfd through a symlink carrying the original name
+            model_name = metadata.get("model_name") or os.path.basename(model_path)
+            link_path = os.path.join(link_dir, model_name)
+            os.symlink(f"/proc/self/fd/{fd}", link_path)
+        except Exception:
+            release()
             raise
+        
+        return link_path, release
+    
+    def _load_model_file(self, model_path: Union[str, bytes, BinaryIO], model_type: str) -> Any:
+        """Load a decrypted model file, buffer or serialized bytes based on its type."""
+        if model_type == "pytorch":
+            return self._load_pytorch_model(model_path)
+        elif model_type == "safetensors":
+            return self._load_safetensors_model(model_path)
+        elif model_type == "tensorflow":
+            return self._load_tensorflow_model(model_path)
+        elif model_type == "onnx":
+            return self._load_onnx_model(model_path)
+        else:
+            raise ValueError(f"Unsupported model type: {model_type}")
     
-    def _load_pytorch_model(self, model_path: str) -> torch.nn.Module:
-        """Load PyTorch model."""
+    def _can_map(self, model_source: Any) -> bool:
+        """Whether a plaintext source is a file that outlives loading and can be mapped."""
+        return isinstance(model_source, str) and (self.use_memfd or bool(self.shared_dir))
+    
+    def _load_pytorch_model(self, model_source: Union[str, BinaryIO]) -> torch.nn.Module:
+        """
+        Load PyTorch model from a path or file-like object.
+        
+        A memfd or shared_dir path is memory-mapped so tensor storage is
+        paged straight from the plaintext; a cache_dir file is read normally
+        because it is shredded once loading returns.
+        """
         try:
-            model = torch.load(model_path, map_location='cpu')
+            options = {"weights_only": self.weights_only}
+            if self._can_map(model_source):
+                options["mmap"] = True
+            
+            model = torch.load(model_source, map_location='cpu', **options)
             logger.info("PyTorch model loaded successfully")
             return model
         except Exception as e:
             logger.error(f"Failed to load PyTorch model: {e}")
             raise
     
+    def _load_safetensors_model(self, model_source: Union[str, memoryview]) -> Dict[str, torch.Tensor]:
+        """
+        Load a safetensors state dict from a path or plaintext buffer.
+        
+        Tensors are mapped onto the plaintext rather than copied: a buffer,
+        memfd or shared_dir file (mapped copy-on-write, so processes share
+        its pages) is used in place, while a cache_dir file, which is
+        shredded after loading, is read into memory once.
+        """
+        try:
+            if isinstance(model_source, str):
+                with open(model_source, 'rb') as f:
+                    if self._can_map(model_source):
+                        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                    else:
+                        buffer = bytearray(os.fstat(f.fileno()).st_size)
+                        f.readinto(buffer)
+            else:
+                buffer = model_source
+            
+            tensors = _tensors_from_safetensors(buffer)
+            logger.info(f"safetensors model loaded successfully ({len(tensors)} tensors)")
+            return tensors
+        except Exception as e:
+            logger.error(f"Failed to load safetensors model: {e}")
+            raise
+    
     def _load_tensorflow_model(self, model_path: str):
         """Load TensorFlow model."""
         try:
@@ -172,17 +859,136 @@ class SecureModelLoader:
             logger.error(f"Failed to load TensorFlow model: {e}")
             raise
     
-    def _load_onnx_model(self, model_path: str):
-        """Load ONNX model."""
+    def _load_onnx_model(self, model_source: Union[str, bytes]):
+        """Load ONNX model from a path or serialized bytes."""
         try:
             import onnxruntime as ort
-            session = ort.InferenceSession(model_path)
+            session = ort.InferenceSession(model_source)
             logger.info("ONNX model loaded successfully")
             return session
         except Exception as e:
             logger.error(f"Failed to load ONNX model: {e}")
             raise
     
+    def list_tensors(self, model_path: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the tensor index of an encrypted safetensors model.
+        
+        Args:
+            model_path: Path to encrypted model file
+        
+        Returns:
+            Tensor name -> dtype, shape, plaintext offset and length (empty
+            if the model was encrypted without a tensor index)
+        """
+        return self._read_metadata(model_path).get("tensors", {})
+    
+    def load_tensors(
+        self,
+        model_path: str,
+        names: Optional[List[str]] = None,
+        key_name: Optional[str] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> Dict[str, torch.Tensor]:
+        """
+        Decrypt only the named tensors of a tensor-indexed model.
+        
+        Works on safetensors models encrypted with AES-256-GCM, whose
+        metadata indexes every tensor. Only the segments holding the
+        requested tensors are read, authenticated and checked against the
+        integrity tree, so time and memory follow the tensors requested
+        rather than the checkpoint size. Tensors sharing a segment are
+        decrypted together and every tensor is a view of its decrypted
+        range. Results are not added to the model cache.
+        
+        Args:
+            model_path: Path to encrypted model file
+            names: Tensor names to load (default: all)
+            key_name: Key Vault key name (default: from metadata)
+            timings: Optional dict that receives per-phase wall times in
+                seconds (metadata, unwrap_key, decrypt)
+        
+        Returns:
+            Dictionary of tensor name -> tensor, in the order requested
+        """
+        try:
+            logger.info(f"Loading tensors from encrypted model: {model_path}")
+            
+            with _timed_phase(timings, "metadata"):
+                metadata = self._read_metadata(model_path, key_name)
+            
+            index = metadata.get("tensors")
+            if not index:
+                raise ValueError(f"Model has no tensor index: {model_path}")
+            if "segment_size" not in metadata:
+                raise ValueError(
+                    f"Per-tensor loading requires a v2 (AES-256-GCM) model, "
+                    f"got version {metadata.get('version', '1.0')}"
+                )
+            
+            names = list(index) if names is None else list(dict.fromkeys(names))
+            missing = [name for name in names if name not in index]
+            if missing:
+                raise KeyError(f"Tensors not found in model: {missing}")
+            
+            with _timed_phase(timings, "unwrap_key"):
+                dek = self.key_loader.unwrap_model_key(metadata)
+            
+            tensors = {}
+            decrypted = 0
+            with _timed_phase(timings, "decrypt"):
+                for start, end, members in self._tensor_spans(index, names, metadata["segment_size"]):
+                    buffer = bytearray(end - start)
+                    self.key_loader.decrypt_model_range_into(
+                        encrypted_path=model_path,
+                        metadata=metadata,
+                        offset=start,
+                        buffer=buffer,
+                        dek=dek
+                    )
+                    decrypted += len(buffer)
+                    
+                    for name in members:
+                        entry = index[name]
+                        tensors[name] = _map_tensor(
+                            buffer,
+                            name,
+                            entry["dtype"],
+                            entry["shape"],
+                            entry["offset"] - start,
+                            entry["length"]
+                        )
+            
+            logger.info(
+                f"Loaded {len(tensors)} of {len(index)} tensors "
+                f"({decrypted} of {metadata['original_size']} bytes)"
+            )
+            return {name: tensors[name] for name in names}
+        
+        except Exception as e:
+            logger.error(f"Failed to load tensors: {e}")
+            raise
+    
+    @staticmethod
+    def _tensor_spans(
+        index: Dict[str, Dict[str, Any]],
+        names: List[str],
+        segment_size: int
+    ) -> List[List[Any]]:
+        """Group tensors into [start, end, names] byte ranges, merging tensors that share a segment."""
+        spans = []
+        for name in sorted(names, key=lambda name: index[name]["offset"]):
+            start = index[name]["offset"]
+            end = start + index[name]["length"]
+            
+            if spans and start // segment_size <= max(spans[-1][1] - 1, 0) // segment_size:
+                spans[-1][1] = max(spans[-1][1], end)
+                spans[-1][2].append(name)
+            else:
+                spans.append([start, end, [name]])
+        
+        return spans
+    
     def load_model_from_storage(
         self,
         model_id: str,
@@ -196,7 +1002,7 @@ class SecureModelLoader:
             model_id: Unique model identifier
             storage_path: Path to model storage
             model_type: Type of model
-            
+        
         Returns:
             Loaded model object
         """
@@ -210,24 +1016,302 @@ class SecureModelLoader:
             model_type=model_type
         )
     
-    def preload_models(self, model_configs: list):
+    def load_models(
+        self,
+        model_paths: List[str],
+        model_type: str = "pytorch",
+        workers: int = 1
+    ) -> Dict[str, Any]:
         """
-        Preload multiple models for faster inference.
+        Load several encrypted models through a staged pipeline.
+        
+        Each model passes through read, unwrap_key, decrypt and deserialize
+        stages connected by bounded queues, so the disk read and Key Vault
+        call for the next models overlap with decryption and deserialisation
+        of the current one.
         
         Args:
-            model_configs: List of model configuration dicts
+            model_paths: Paths to encrypted model files, in load order
+            model_type: Type of every model
+            workers: Threads per pipeline stage
+        
+        Returns:
+            Dictionary with per-model state, error and phase timings, and
+            the pipeline's per-stage utilisation
         """
-        for config in model_configs:
+        pipeline = self._new_load_pipeline(workers=workers)
+        
+        results = {}
+        for model_path in dict.fromkeys(model_paths):
+            timings: Dict[str, float] = {}
+            results[model_path] = (
+                self._submit_to_pipeline(pipeline, model_path, model_type, timings=timings),
+                timings
+            )
+        pipeline.close()
+        
+        models = {}
+        for model_path, (future, timings) in results.items():
             try:
-                model_id = config["model_id"]
-                model_path = config["model_path"]
-                model_type = config.get("model_type", "pytorch")
-                
-                logger.info(f"Preloading model: {model_id}")
-                self.load_encrypted_model(model_path, model_type)
-                
+                future.result()
+                models[model_path] = {"state": "loaded", "timings": timings}
             except Exception as e:
-                logger.error(f"Failed to preload model {config.get('model_id')}: {e}")
+                logger.error(f"Failed to load model {model_path}: {e}")
+                models[model_path] = {"state": "failed", "error": str(e), "timings": timings}
+        
+        return {"models": models, "pipeline": pipeline.stats()}
+    
+    def _new_load_pipeline(
+        self,
+        workers: int = 1,
+        on_stage: Optional[Callable[[Dict[str, Any], str], None]] = None
+    ) -> LoadPipeline:
+        """
+        Start a read -> unwrap_key -> decrypt -> deserialize pipeline.
+        
+        Queue depth matches the worker count, so at most a few decrypted
+        models wait for deserialisation at any time.
+        """
+        return LoadPipeline(
+            [
+                ("read", self._pipeline_read),
+                ("unwrap_key", self._pipeline_unwrap_key),
+                ("decrypt", self._pipeline_decrypt),
+                ("deserialize", self._pipeline_deserialize)
+            ],
+            workers=workers,
+            queue_depth=workers,
+            on_stage=on_stage
+        )
+    
+    def _submit_to_pipeline(
+        self,
+        pipeline: LoadPipeline,
+        model_path: str,
+        model_type: str = "pytorch",
+        key_name: Optional[str] = None,
+        timings: Optional[Dict[str, float]] = None,
+        model_id: Optional[str] = None
+    ) -> Future:
+        """
+        Queue a model load on a pipeline, coalesced with in-flight loads.
+        
+        Cached models and models already being loaded by another caller are
+        not queued; the returned future resolves with them instead.
+        
+        Returns:
+            Future resolved with the loaded model
+        """
+        cache_key = f"{model_path}:{model_type}"
+        model, future, is_owner = self._begin_load(cache_key)
+        if model is not None:
+            future = Future()
+            future.set_result(model)
+            return future
+        
+        if not is_owner:
+            logger.info(f"Waiting for in-flight load of model: {model_path}")
+            return future
+        
+        def publish(pipeline_future: Future):
+            try:
+                error = pipeline_future.exception()
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(pipeline_future.result())
+            finally:
+                self._end_load(cache_key)
+        
+        logger.info(f"Queueing encrypted model: {model_path}")
+        pipeline.submit({
+            "model_path": model_path,
+            "model_type": model_type,
+            "key_name": key_name,
+            "cache_key": cache_key,
+            "model_id": model_id,
+            "timings": timings if timings is not None else {}
+        }).add_done_callback(publish)
+        return future
+    
+    def _pipeline_read(self, item: Dict[str, Any]):
+        """Read stage: load metadata and pull the ciphertext into the page cache."""
+        item["metadata"] = self._read_metadata(item["model_path"], item["key_name"])
+        self._prefetch_file(item["model_path"])
+    
+    def _pipeline_unwrap_key(self, item: Dict[str, Any]):
+        """Unwrap stage: recover the data encryption key through Key Vault."""
+        if self._has_shared_plaintext(item["model_path"], item["metadata"]):
+            item["dek"] = None
+        else:
+            item["dek"] = self.key_loader.unwrap_model_key(item["metadata"])
+    
+    def _pipeline_decrypt(self, item: Dict[str, Any]):
+        """Decrypt stage: decrypt and verify the model for its loader."""
+        item["source"], item["release"] = self._decrypt_model(
+            item["model_path"], item["model_type"], item["metadata"], item.pop("dek")
+        )
+    
+    def _pipeline_deserialize(self, item: Dict[str, Any]) -> Any:
+        """Deserialise stage: build the model from plaintext and cache it."""
+        return self._deserialize_and_cache(
+            item["model_path"],
+            item["model_type"],
+            item["cache_key"],
+            item["metadata"],
+            item.pop("source"),
+            item.pop("release")
+        )
+    
+    def _prefetch_file(self, file_path: str):
+        """Read a file sequentially so the decrypt stage finds it in the page cache."""
+        buffer = bytearray(PREFETCH_CHUNK_SIZE)
+        with open(file_path, 'rb', buffering=0) as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            while f.readinto(buffer):
+                pass
+    
+    def preload_models(
+        self,
+        model_configs: list,
+        max_workers: int = 4,
+        wait: str = "all"
+    ) -> Dict[str, Any]:
+        """
+        Preload multiple models concurrently for faster inference.
+        
+        Models go through a staged pipeline (read, unwrap_key, decrypt,
+        deserialize) with bounded queues between stages, so Key Vault calls,
+        disk reads, decryption and deserialisation of different models
+        overlap. Configs marked "required" are queued first, then the rest
+        by descending "priority" (default 0). Progress and per-stage
+        utilisation are available from get_preload_status while loads
+        continue in the background.
+        
+        Args:
+            model_configs: List of model configuration dicts with model_id,
+                model_path and optional model_type, priority and required
+            max_workers: Threads per pipeline stage
+            wait: "all" to return once every model has finished, "required"
+                to return once the required models have finished, or "none"
+                to return immediately
+        
+        Returns:
+            Preload status snapshot (see get_preload_status)
+        """
+        if wait not in ("all", "required", "none"):
+            raise ValueError(f"Unsupported wait mode: {wait}")
+        
+        configs = sorted(
+            model_configs,
+            key=lambda config: (not config.get("required", False), -config.get("priority", 0))
+        )
+        
+        with self._preload_lock:
+            for config in configs:
+                self._preload_status[config["model_id"]] = {
+                    "state": "queued",
+                    "stage": None,
+                    "model_path": config["model_path"],
+                    "priority": config.get("priority", 0),
+                    "required": config.get("required", False),
+                    "timings": {}
+                }
+        
+        # Each stage serves items in submission order, so priority order is kept
+        pipeline = self._new_load_pipeline(
+            workers=max_workers,
+            on_stage=self._on_preload_stage
+        )
+        self._preload_pipeline = pipeline
+        futures = [(config, self._preload_model(pipeline, config)) for config in configs]
+        pipeline.close()
+        
+        if wait == "all":
+            wait_futures([future for _, future in futures])
+        elif wait == "required":
+            wait_futures([future for config, future in futures if config.get("required", False)])
+        
+        return self.get_preload_status()
+    
+    def _preload_model(self, pipeline: LoadPipeline, config: Dict[str, Any]) -> Future:
+        """
+        Queue one preload config, recording its final state and phase timings.
+        
+        Returns:
+            Future resolved once the model's final status is recorded
+        """
+        model_id = config["model_id"]
+        timings: Dict[str, float] = {}
+        submitted = time.perf_counter()
+        
+        logger.info(f"Preloading model: {model_id}")
+        future = self._submit_to_pipeline(
+            pipeline,
+            config["model_path"],
+            config.get("model_type", "pytorch"),
+            timings=timings,
+            model_id=model_id
+        )
+        
+        # Resolved only after the status is updated, so waiters see the outcome
+        recorded = Future()
+        
+        def record(done: Future):
+            timings["total"] = round(time.perf_counter() - submitted, 3)
+            error = done.exception()
+            if error is not None:
+                logger.error(f"Failed to preload model {model_id}: {error}")
+                self._update_preload_status(
+                    model_id, state="failed", stage=None, error=str(error), timings=timings
+                )
+            else:
+                self._update_preload_status(model_id, state="loaded", stage=None, timings=timings)
+            recorded.set_result(None)
+        
+        future.add_done_callback(record)
+        return recorded
+    
+    def _on_preload_stage(self, item: Dict[str, Any], stage: str):
+        """Publish the pipeline stage a preloading model has reached."""
+        if item["model_id"] is not None:
+            self._update_preload_status(
+                item["model_id"], state="loading", stage=stage, timings=dict(item["timings"])
+            )
+    
+    def _update_preload_status(self, model_id: str, **fields):
+        """Update the preload status entry of a model; timings must no longer change."""
+        with self._preload_lock:
+            self._preload_status[model_id].update(fields)
+    
+    def get_preload_status(self) -> Dict[str, Any]:
+        """
+        Get progress of preload_models.
+        
+        Returns:
+            Dictionary with counts per state, whether every required model
+            has loaded, per-model state, stage, error and phase timings, and
+            per-stage utilisation of the latest preload pipeline
+        """
+        with self._preload_lock:
+            models = copy.deepcopy(self._preload_status)
+            pipeline = self._preload_pipeline
+        
+        counts = {state: 0 for state in ("queued", "loading", "loaded", "failed")}
+        for status in models.values():
+            counts[status["state"]] += 1
+        
+        return {
+            "total": len(models),
+            **counts,
+            "required_ready": all(
+                status["state"] == "loaded"
+                for status in models.values() if status["required"]
+            ),
+            "models": models,
+            "pipeline": pipeline.stats() if pipeline is not None else None
+        }
     
     def _secure_delete(self, file_path: str):
         """Securely delete a file by overwriting with random data."""
@@ -241,7 +1325,7 @@ class SecureModelLoader:
                 # Delete file
                 os.remove(file_path)
                 logger.debug(f"Securely deleted: {file_path}")
-                
+        
         except Exception as e:
             logger.warning(f"Failed to securely delete {file_path}: {e}")
     
@@ -254,17 +1338,58 @@ class SecureModelLoader:
             model_type: Type of model
         """
         cache_key = f"{model_path}:{model_type}"
-        if cache_key in self._loaded_models:
-            del self._loaded_models[cache_key]
+        if self._loaded_models.remove(cache_key):
             logger.info(f"Unloaded model: {model_path}")
     
+    def is_model_loaded(self, model_path: str, model_type: str = "pytorch") -> bool:
+        """
+        Check whether a model is resident in the cache.
+        
+        Args:
+            model_path: Path to model file
+            model_type: Type of model
+        
+        Returns:
+            True if the model is cached
+        """
+        return f"{model_path}:{model_type}" in self._loaded_models
+    
+    def pin_model(self, model_path: str, model_type: str = "pytorch"):
+        """
+        Keep a model in the cache regardless of the byte budget.
+        
+        Args:
+            model_path: Path to model file
+            model_type: Type of model
+        """
+        self._loaded_models.pin(f"{model_path}:{model_type}")
+    
+    def unpin_model(self, model_path: str, model_type: str = "pytorch"):
+        """
+        Make a pinned model evictable again.
+        
+        Args:
+            model_path: Path to model file
+            model_type: Type of model
+        """
+        self._loaded_models.unpin(f"{model_path}:{model_type}")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get model cache counters and occupancy.
+        
+        Returns:
+            Dictionary with hits, misses, evictions, entries and bytes
+        """
+        return self._loaded_models.stats()
+    
     def get_model_info(self, model_path: str) -> Dict[str, Any]:
         """
         Get information about an encrypted model without loading it.
         
         Args:
             model_path: Path to encrypted model file
-            
+        
         Returns:
             Dictionary with model metadata
         """
@@ -278,54 +1403,170 @@ class SecureModelLoader:
                 "original_size": metadata.get("original_size"),
                 "encrypted_size": metadata.get("encrypted_size"),
                 "algorithm": metadata.get("algorithm"),
-                "key_name": metadata.get("key_name")
+                "key_name": metadata.get("key_name"),
+                "model_format": metadata.get("model_format"),
+                "version": metadata.get("version", "1.0"),
+                "segment_size": metadata.get("segment_size"),
+                "segment_count": len(metadata.get("segments", []))
             }
-            
+        
         except Exception as e:
             logger.error(f"Failed to get model info: {e}")
             raise
     
-    def cleanup(self):
-        """Cleanup loaded models and temporary files."""
+    async def aclose(self):
+        """Release the async load pool and asyncio Key Vault clients."""
+        self._load_executor.shutdown(wait=False)
+        await self.key_loader.aclose()
+    
+    def cleanup(self, remove_shared: bool = False):
+        """
+        Cleanup loaded models and temporary files.
+        
+        Args:
+            remove_shared: Also remove the plaintext in shared_dir. Only do
+                this once no other process needs it; files are unlinked
+                rather than overwritten, so existing mappings stay valid
+        """
         logger.info("Cleaning up SecureModelLoader")
         
         # Clear model cache
         self._loaded_models.clear()
         
+        # Drop cached keys and unwrapped data keys
+        self.key_loader.clear_cache()
+        
         # Delete temporary files
         for file in Path(self.cache_dir).glob("*"):
             if file.is_file():
                 self._secure_delete(str(file))
+        
+        if remove_shared and self.shared_dir:
+            for file in Path(self.shared_dir).glob("*"):
+                if file.is_file():
+                    file.unlink()
+
+
+def _batch_configs(args) -> list:
+    """Build preload configs from --model-path, --model-dir or --model-list."""
+    if args.model_list:
+        with open(args.model_list, 'r') as f:
+            model_list = json.load(f)
+        
+        entries = model_list["models"] if isinstance(model_list, dict) else model_list
+        base_dir = os.path.dirname(os.path.abspath(args.model_list))
+        
+        configs = []
+        for entry in entries:
+            config = dict(entry)
+            config["model_path"] = os.path.join(base_dir, entry["model_path"])
+            config.setdefault("model_id", os.path.basename(entry["model_path"]))
+            config.setdefault("model_type", args.model_type)
+            configs.append(config)
+        return configs
+    
+    if args.model_dir:
+        model_paths = sorted(str(path) for path in Path(args.model_dir).rglob(args.pattern) if path.is_file())
+    else:
+        model_paths = args.model_path
+    
+    # Every listed model must load; the model type follows the plaintext suffix
+    suffix_types = {FORMAT_ONNX: "onnx", FORMAT_KERAS: "tensorflow"}
+    return [
+        {
+            "model_id": model_path,
+            "model_path": model_path,
+            "model_type": suffix_types.get(detect_model_format(os.path.basename(model_path)), args.model_type),
+            "required": True
+        }
+        for model_path in model_paths
+    ]
 
 
 def main():
-    """Main entry point for testing."""
+    """Main entry point for testing and batch model loading."""
     import argparse
     
     parser = argparse.ArgumentParser(description="Secure Model Loader for TEE")
-    parser.add_argument("--model-path", required=True, help="Path to encrypted model")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--model-path", nargs="+", help="Path(s) to encrypted models")
+    source.add_argument("--model-dir", help="Load every encrypted model under this directory")
+    source.add_argument("--model-list", help="JSON list of model configs (model_path, model_type, "
+                        "priority, required); paths are relative to the list file")
+    parser.add_argument("--pattern", default="*.encrypted", help="File pattern for --model-dir")
     parser.add_argument("--model-type", default="pytorch", help="Model type")
     parser.add_argument("--keyvault-url", help="Azure Key Vault URL")
     parser.add_argument("--skip-attestation", action="store_true", help="Skip attestation validation")
+    parser.add_argument("--use-memfd", action="store_true", help="Decrypt path-based models into a memfd")
+    parser.add_argument("--shared-dir", help="Decrypt models once into this tmpfs directory for all workers")
+    parser.add_argument("--workers", type=int, default=1, help="Threads per load pipeline stage")
+    parser.add_argument("--allow-pickle", action="store_true",
+                        help="Allow full-module PyTorch pickles (disables weights_only)")
+    parser.add_argument("--report", help="Write a JSON timing report to this path")
     
     args = parser.parse_args()
     
     try:
+        started = time.perf_counter()
+        
+        # Attestation and Key Vault clients are set up once for every model
         loader = SecureModelLoader(
             keyvault_url=args.keyvault_url,
-            validate_attestation=not args.skip_attestation
+            validate_attestation=not args.skip_attestation,
+            use_memfd=args.use_memfd,
+            weights_only=not args.allow_pickle,
+            shared_dir=args.shared_dir
         )
+        initialized = time.perf_counter()
         
-        model = loader.load_encrypted_model(
-            model_path=args.model_path,
-            model_type=args.model_type
-        )
+        if args.model_path and len(args.model_path) == 1 and not args.report:
+            model = loader.load_encrypted_model(
+                model_path=args.model_path[0],
+                model_type=args.model_type
+            )
+            
+            print(f"Model loaded successfully: {type(model)}")
+            
+            loader.cleanup()
+            sys.exit(0)
         
-        print(f"Model loaded successfully: {type(model)}")
+        configs = _batch_configs(args)
+        if not configs:
+            raise FileNotFoundError(f"No encrypted models found in {args.model_dir or args.model_list}")
         
-        loader.cleanup()
-        sys.exit(0)
+        # Several models: overlap their stages and report where the time went
+        status = loader.preload_models(configs, max_workers=args.workers, wait="all")
+        finished = time.perf_counter()
+        
+        for model_id, result in status["models"].items():
+            print(f"{model_id}: {result['state']} {json.dumps(result['timings'])}")
         
+        pipeline = status["pipeline"]
+        print(f"Loaded {status['loaded']}/{status['total']} models in {finished - started:.2f}s")
+        for stage, stats in pipeline["stages"].items():
+            print(
+                f"  {stage:<12} utilisation {stats['utilisation']:.0%}  "
+                f"busy {stats['busy_seconds']}s  blocked {stats['blocked_seconds']}s  "
+                f"items {stats['items']}"
+            )
+        
+        if args.report:
+            report = {
+                "startup": {
+                    "init_seconds": round(initialized - started, 3),
+                    "load_seconds": round(finished - initialized, 3),
+                    "total_seconds": round(finished - started, 3)
+                },
+                **status,
+                "cache": loader.get_cache_stats()
+            }
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+            logger.info(f"Timing report written to: {args.report}")
+        
+        loader.cleanup()
+        sys.exit(0 if status["required_ready"] else 1)
+    
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
         sys.exit(1)
@@ -15,6 +15,8 @@ CHECKPOINT_DIR="${CHECKPOINT_DIR:-/checkpoints}"
 CACHE_DIR="${CACHE_DIR:-/secure/cache}"
 KEYVAULT_URL="${KEYVAULT_URL:-}"
 ATTESTATION_REQUIRED="${ATTESTATION_REQUIRED:-true}"
+MODEL_LOAD_WORKERS="${MODEL_LOAD_WORKERS:-2}"
+MODEL_LOAD_REPORT="${MODEL_LOAD_REPORT:-/var/log/secure-rl-model-load.json}"
 
 # Logging function
 log() {
@@ -184,17 +186,14 @@ load_base_models() {
     
     log_info "Found ${#model_files[@]} encrypted model(s)"
     
-    # Decrypt models
-    for model_file in "${model_files[@]}"; do
-        local model_name=$(basename "$model_file" .encrypted)
-        log_info "Decrypting model: $model_name"
-        
-        python3 "$SCRIPT_DIR/secure_model_loader.py" \
-            --model-path "$model_file" \
-            --keyvault-url "$KEYVAULT_URL" \
-            ${ATTESTATION_REQUIRED:+--skip-attestation} \
-            || log_warning "Failed to decrypt model: $model_name"
-    done
+    # Decrypt models in one loader process (one attestation and Key Vault login)
+    python3 "$SCRIPT_DIR/secure_model_loader.py" \
+        --model-dir "$MODEL_STORAGE" \
+        --keyvault-url "$KEYVAULT_URL" \
+        --workers "$MODEL_LOAD_WORKERS" \
+        --report "$MODEL_LOAD_REPORT" \
+        ${ATTESTATION_REQUIRED:+--skip-attestation} \
+        || log_warning "Failed to decrypt some models (see $MODEL_LOAD_REPORT)"
     
     log_info "Base models loaded"
 }
@@ -0,0 +1,187 @@
+"""Tests for the Key Vault material cache."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from key_cache import KeyCache
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = KeyCache()
+    calls = []
+    
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value", "v1"
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    assert cache.get("k", fetch) == "value"
+    assert len(calls) == 1
+
+
+def test_fetch_error_reaches_every_waiter_and_is_not_cached():
+    cache = KeyCache()
+    
+    def fetch():
+        raise RuntimeError("vault down")
+    
+    with pytest.raises(RuntimeError):
+        cache.get("k", fetch)
+    assert "k" not in cache
+    assert cache.get("k", lambda: ("value", "v1")) == "value"
+
+
+def test_waiter_timeout_does_not_wait_for_slow_fetch():
+    cache = KeyCache()
+    release = threading.Event()
+    
+    def fetch():
+        release.wait(2)
+        return "value", "v1"
+    
+    owner = threading.Thread(target=cache.get, args=("k", fetch))
+    owner.start()
+    time.sleep(0.02)
+    
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        cache.get("k", fetch, timeout=0.1)
+    assert time.monotonic() - started < 0.5
+    
+    release.set()
+    owner.join()
+    assert cache.get("k", fetch, timeout=0.1) == "value"
+
+
+def test_fetch_timeout_error_is_not_rewritten():
+    cache = KeyCache()
+    
+    def fetch():
+        raise TimeoutError("vault request timed out")
+    
+    with pytest.raises(TimeoutError, match="vault request"):
+        cache.get("k", fetch, timeout=1)
+
+
+def test_stale_entry_is_served_while_refreshed():
+    cache = KeyCache(ttl_seconds=0.05, stale_seconds=10)
+    cache.get("k", lambda: ("old", "v1"))
+    time.sleep(0.06)
+    
+    refreshed = threading.Event()
+    
+    def fetch():
+        refreshed.set()
+        return "new", "v2"
+    
+    assert cache.get("k", fetch) == "old"
+    assert refreshed.wait(1)
+    deadline = time.monotonic() + 1
+    while cache.version("k") != "v2" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get("k", fetch) == "new"
+    assert cache.stats()["rotations"] == 1
+
+
+def test_cancelled_async_owner_does_not_fail_waiters():
+    cache = KeyCache()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return "value", "v1"
+    
+    async def main():
+        owner = asyncio.create_task(asyncio.wait_for(cache.get_async("k", fetch), 0.05))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_async("k", fetch))
+        sync_waiter = asyncio.create_task(asyncio.to_thread(cache.get, "k", fetch))
+        with pytest.raises(asyncio.TimeoutError):
+            await owner
+        return await waiter, await sync_waiter
+    
+    assert asyncio.run(main()) == ("value", "value")
+    assert len(calls) == 1
+    assert cache.get("k", fetch) == "value"
+
+
+def test_cancelled_async_waiter_does_not_cancel_fetch():
+    cache = KeyCache()
+    
+    async def fetch():
+        await asyncio.sleep(0.1)
+        return "value", "v1"
+    
+    async def main():
+        owner = asyncio.create_task(cache.get_async("k", fetch))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_async("k", fetch))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        return await owner
+    
+    assert asyncio.run(main()) == "value"
+
+
+def test_fetch_abandoned_by_event_loop_is_claimed_again():
+    cache = KeyCache()
+    started = threading.Event()
+    
+    async def slow_fetch():
+        started.set()
+        await asyncio.sleep(10)
+        return "never", "v0"
+    
+    async def start():
+        asyncio.get_running_loop().create_task(cache.get_async("k", slow_fetch))
+        await asyncio.sleep(0.01)
+    
+    results = []
+    waiter = threading.Thread(target=lambda: (started.wait(), results.append(cache.get("k", lambda: ("value", "v1")))))
+    waiter.start()
+    # asyncio.run cancels the fetch task on exit
+    asyncio.run(start())
+    waiter.join(2)
+    
+    assert results == ["value"]
+
+
+def test_clear_discards_fetches_in_flight():
+    cache = KeyCache()
+    release = threading.Event()
+    
+    def fetch():
+        release.wait(1)
+        return "old", "v1"
+    
+    thread = threading.Thread(target=cache.get, args=("k", fetch))
+    thread.start()
+    time.sleep(0.02)
+    cache.clear()
+    release.set()
+    thread.join()
+    
+    assert "k" not in cache
+
+
+def test_entries_are_bounded():
+    cache = KeyCache(max_entries=2)
+    for name in "abc":
+        cache.get(name, lambda name=name: (name, "v1"))
+    
+    assert len(cache) == 2
+    assert "a" not in cache
+    assert cache.stats()["evictions"] == 1
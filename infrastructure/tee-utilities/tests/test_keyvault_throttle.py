@@ -0,0 +1,225 @@
+"""Tests for the adaptive Key Vault throttling limiter."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from keyvault_throttle import AdaptiveLimiter
+
+
+class ThrottledError(Exception):
+    """Stand-in for an azure.core HttpResponseError."""
+    
+    def __init__(self, status_code: int, retry_after: str = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"Retry-After": retry_after} if retry_after else {}
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers})()
+
+
+def test_base_exception_releases_slot():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+    
+    def interrupted():
+        raise KeyboardInterrupt
+    
+    with pytest.raises(KeyboardInterrupt):
+        limiter.call(interrupted)
+    
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.call(lambda: "ok") == "ok"
+
+
+def test_throttled_call_is_retried_and_halves_limit():
+    limiter = AdaptiveLimiter(initial_limit=8, base_delay=0.01, max_delay=0.02)
+    attempts = []
+    
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ThrottledError(429)
+        return "ok"
+    
+    assert limiter.call(flaky) == "ok"
+    stats = limiter.stats()
+    assert stats["retries"] == 2
+    assert stats["throttles"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["limit"] == 4
+
+
+def test_non_retryable_error_is_raised_at_once():
+    limiter = AdaptiveLimiter(base_delay=0.01)
+    attempts = []
+    
+    def forbidden():
+        attempts.append(1)
+        raise ThrottledError(403)
+    
+    with pytest.raises(ThrottledError):
+        limiter.call(forbidden)
+    assert len(attempts) == 1
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_attempts_are_bounded():
+    limiter = AdaptiveLimiter(max_attempts=3, base_delay=0.01, max_delay=0.01)
+    
+    def unavailable():
+        raise ThrottledError(503)
+    
+    with pytest.raises(ThrottledError):
+        limiter.call(unavailable)
+    stats = limiter.stats()
+    assert stats["calls"] == 3
+    assert stats["failures"] == 1
+
+
+def test_concurrency_is_capped():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+    release = threading.Event()
+    
+    def call():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        release.wait(1)
+        with lock:
+            active.pop()
+    
+    threads = [threading.Thread(target=limiter.call, args=(call,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert max(peak) == 2
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_timeout_bounds_retries_and_is_passed_to_attempts():
+    limiter = AdaptiveLimiter(base_delay=0.01, max_delay=0.02)
+    timeouts = []
+    
+    def flaky(timeout=None):
+        timeouts.append(timeout)
+        if len(timeouts) < 3:
+            raise ThrottledError(429)
+        return "ok"
+    
+    assert limiter.call(flaky, timeout=2.0) == "ok"
+    assert 2.0 >= timeouts[0] > timeouts[1] > timeouts[2] > 0
+    assert limiter.call(lambda **kwargs: kwargs) == {}
+
+
+def test_retry_after_past_the_deadline_fails_at_once():
+    limiter = AdaptiveLimiter(base_delay=0.01)
+    
+    def throttled(timeout=None):
+        raise ThrottledError(429, retry_after="2")
+    
+    started = time.monotonic()
+    with pytest.raises(ThrottledError):
+        limiter.call(throttled, timeout=1.0)
+    assert time.monotonic() - started < 0.5
+    
+    # Later callers are held back by the Retry-After, beyond their deadline
+    with pytest.raises(TimeoutError):
+        limiter.call(lambda timeout=None: "ok", timeout=1.0)
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_slot_wait_is_bounded_by_the_timeout():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+    release = threading.Event()
+    holder = threading.Thread(target=limiter.call, args=(lambda: release.wait(2),))
+    holder.start()
+    time.sleep(0.02)
+    
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        limiter.call(lambda timeout=None: "ok", timeout=0.2)
+    assert 0.15 < time.monotonic() - started < 0.5
+    
+    release.set()
+    holder.join()
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_deadline_passing_after_acquire_is_not_passed_to_the_sdk():
+    class SlowAcquire(AdaptiveLimiter):
+        def _acquire(self, deadline=None):
+            super()._acquire(deadline)
+            time.sleep(0.1)
+    
+    limiter = SlowAcquire()
+    called = []
+    
+    with pytest.raises(TimeoutError):
+        limiter.call(lambda timeout=None: called.append(timeout), timeout=0.05)
+    assert called == []
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_async_waiters_are_woken_instead_of_polling():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+    checks = []
+    wait_time = limiter._wait_time
+    
+    def counted_wait_time():
+        checks.append(1)
+        return wait_time()
+    
+    limiter._wait_time = counted_wait_time
+    active = []
+    peak = []
+    
+    async def request(timeout=None):
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.02)
+        active.pop()
+        return "ok"
+    
+    async def main():
+        return await asyncio.gather(*(limiter.call_async(request) for _ in range(50)))
+    
+    assert asyncio.run(main()) == ["ok"] * 50
+    assert max(peak) == 2
+    # Each caller checks once on arrival and about once per wakeup; polling
+    # every 10 ms for the ~0.5 s run would take thousands of checks
+    assert len(checks) < 200
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_cancelled_async_waiter_passes_its_wakeup_on():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+    
+    async def main():
+        release = asyncio.Event()
+        
+        async def hold():
+            await release.wait()
+        
+        holder = asyncio.create_task(limiter.call_async(hold))
+        await asyncio.sleep(0.01)
+        first = asyncio.create_task(limiter.call_async(asyncio.sleep, 0))
+        second = asyncio.create_task(limiter.call_async(asyncio.sleep, 0, "second"))
+        await asyncio.sleep(0.01)
+        
+        # The slot frees and wakes the first waiter, which is cancelled
+        # before it can run
+        release.set()
+        await holder
+        first.cancel()
+        return await asyncio.wait_for(second, 1)
+    
+    assert asyncio.run(main()) == "second"
+    assert limiter.stats()["in_flight"] == 0
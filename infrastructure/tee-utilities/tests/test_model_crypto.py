@@ -0,0 +1,247 @@
+"""Round-trip and tamper tests for the v1/v2 model containers."""
+
+import base64
+import hashlib
+import os
+
+import pytest
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+import model_crypto
+
+# Small chunks so a few hundred bytes span several chunks and segments
+CHUNK = 64
+SIZES = [0, 1, 15, 16, 17, CHUNK - 1, CHUNK, CHUNK + 1, 5 * CHUNK + 7]
+DEK = bytes(range(32))
+
+
+def _plaintext(size):
+    return os.urandom(size)
+
+
+def _encrypt_v1(tmp_path, data, integrity=True):
+    src = tmp_path / "model.bin"
+    src.write_bytes(data)
+    enc = tmp_path / "model.bin.encrypted"
+    iv = os.urandom(16)
+    
+    with open(src, 'rb') as fin, open(enc, 'wb') as fout:
+        size, _, digest, tree = model_crypto.encrypt_cbc_stream(fin, fout, DEK, iv, CHUNK)
+    
+    metadata = {
+        "version": model_crypto.FORMAT_VERSION_CBC,
+        "iv": base64.b64encode(iv).decode('utf-8'),
+        "original_size": size,
+        "original_hash": digest
+    }
+    if integrity:
+        metadata["integrity"] = tree
+    return str(enc), metadata
+
+
+def _encrypt_v2(tmp_path, data, threads=2):
+    src = tmp_path / "model.bin"
+    src.write_bytes(data)
+    enc = tmp_path / "model.bin.encrypted"
+    
+    with open(src, 'rb') as fin, open(enc, 'wb') as fout:
+        size, digest, segments, tree = model_crypto.encrypt_gcm_stream(fin, fout, DEK, CHUNK, threads)
+    
+    metadata = {
+        "version": model_crypto.FORMAT_VERSION_GCM,
+        "segment_size": CHUNK,
+        "segments": segments,
+        "original_size": size,
+        "original_hash": digest,
+        "integrity": tree
+    }
+    return str(enc), metadata
+
+
+def _decrypt_both_ways(tmp_path, enc, metadata, threads):
+    out = str(tmp_path / "model.out")
+    size = model_crypto.decrypt_file(enc, out, DEK, metadata, verify_hash=True, chunk_size=CHUNK, threads=threads)
+    with open(out, 'rb') as f:
+        on_disk = f.read()
+    
+    with open(enc, 'rb') as src:
+        in_memory = model_crypto.decrypt_to_memory(src, DEK, metadata, CHUNK, threads, verify=True).read()
+    
+    assert size == len(on_disk)
+    return on_disk, in_memory
+
+
+def _flip_byte(path, offset):
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0x01]))
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+@pytest.mark.parametrize("size", SIZES)
+def test_v1_round_trip(tmp_path, size, threads):
+    data = _plaintext(size)
+    enc, metadata = _encrypt_v1(tmp_path, data)
+    
+    assert metadata["original_hash"] == hashlib.sha256(data).hexdigest()
+    assert _decrypt_both_ways(tmp_path, enc, metadata, threads) == (data, data)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_v1_ciphertext_matches_one_shot_pkcs7(tmp_path, size):
+    data = _plaintext(size)
+    enc, metadata = _encrypt_v1(tmp_path, data)
+    
+    padder = padding.PKCS7(128).padder()
+    encryptor = Cipher(
+        algorithms.AES(DEK),
+        modes.CBC(base64.b64decode(metadata["iv"])),
+        backend=default_backend()
+    ).encryptor()
+    expected = encryptor.update(padder.update(data) + padder.finalize()) + encryptor.finalize()
+    
+    with open(enc, 'rb') as f:
+        assert f.read() == expected
+
+
+def test_v1_without_tree_falls_back_to_whole_file_hash(tmp_path):
+    data = _plaintext(5 * CHUNK)
+    enc, metadata = _encrypt_v1(tmp_path, data, integrity=False)
+    
+    assert _decrypt_both_ways(tmp_path, enc, metadata, 2) == (data, data)
+    
+    _flip_byte(enc, 0)
+    with pytest.raises(ValueError, match="checksum"):
+        model_crypto.decrypt_file(enc, str(tmp_path / "bad.out"), DEK, metadata, verify_hash=True, chunk_size=CHUNK)
+    assert not os.path.exists(tmp_path / "bad.out")
+
+
+def test_v1_tampered_ciphertext_is_rejected_by_the_tree(tmp_path):
+    data = _plaintext(5 * CHUNK)
+    enc, metadata = _encrypt_v1(tmp_path, data)
+    _flip_byte(enc, 2 * CHUNK + 3)
+    
+    out = str(tmp_path / "bad.out")
+    with pytest.raises(ValueError, match="chunk 2"):
+        model_crypto.decrypt_file(enc, out, DEK, metadata, verify_hash=True, chunk_size=CHUNK, threads=2)
+    assert not os.path.exists(out)
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".partial")] == []
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+@pytest.mark.parametrize("size", SIZES)
+def test_v2_round_trip(tmp_path, size, threads):
+    data = _plaintext(size)
+    enc, metadata = _encrypt_v2(tmp_path, data, threads)
+    
+    assert len(metadata["segments"]) == max(1, -(-size // CHUNK))
+    assert os.path.getsize(enc) == size
+    assert _decrypt_both_ways(tmp_path, enc, metadata, threads) == (data, data)
+
+
+@pytest.mark.parametrize("offset, length", [
+    (0, 1), (0, CHUNK), (CHUNK - 1, 2), (10, 3 * CHUNK), (4 * CHUNK, 1000), (5 * CHUNK + 6, 1), (0, 0)
+])
+def test_v2_range_reads(tmp_path, offset, length):
+    data = _plaintext(5 * CHUNK + 7)
+    enc, metadata = _encrypt_v2(tmp_path, data)
+    
+    with open(enc, 'rb') as src:
+        assert model_crypto.decrypt_gcm_range(src, DEK, metadata, offset, length, 2) == data[offset:offset + length]
+
+
+def test_v2_range_outside_model_is_rejected(tmp_path):
+    enc, metadata = _encrypt_v2(tmp_path, _plaintext(2 * CHUNK))
+    
+    with open(enc, 'rb') as src:
+        with pytest.raises(ValueError, match="outside"):
+            model_crypto.decrypt_gcm_range_into(src, DEK, metadata, CHUNK, bytearray(2 * CHUNK))
+
+
+def test_v2_tampered_segment_is_named(tmp_path):
+    enc, metadata = _encrypt_v2(tmp_path, _plaintext(5 * CHUNK))
+    _flip_byte(enc, 3 * CHUNK + 1)
+    
+    with open(enc, 'rb') as src:
+        with pytest.raises(ValueError, match="segment 3"):
+            model_crypto.decrypt_gcm_to_memory(src, DEK, metadata, threads=2)
+    
+    # Segments that do not overlap the damage still decrypt
+    with open(enc, 'rb') as src:
+        assert len(model_crypto.decrypt_gcm_range(src, DEK, metadata, 0, 3 * CHUNK)) == 3 * CHUNK
+
+
+def test_v2_swapped_segments_fail_authentication(tmp_path):
+    enc, metadata = _encrypt_v2(tmp_path, _plaintext(4 * CHUNK))
+    with open(enc, 'rb') as f:
+        ciphertext = f.read()
+    with open(enc, 'wb') as f:
+        f.write(ciphertext[CHUNK:2 * CHUNK] + ciphertext[:CHUNK] + ciphertext[2 * CHUNK:])
+    metadata["segments"][0], metadata["segments"][1] = metadata["segments"][1], metadata["segments"][0]
+    
+    with open(enc, 'rb') as src:
+        with pytest.raises(ValueError, match="segment 0"):
+            model_crypto.decrypt_gcm_to_memory(src, DEK, metadata, threads=1)
+
+
+def test_v2_truncated_segment_index_is_rejected(tmp_path):
+    enc, metadata = _encrypt_v2(tmp_path, _plaintext(3 * CHUNK))
+    metadata["segments"].pop()
+    
+    with open(enc, 'rb') as src:
+        with pytest.raises(ValueError, match="Segment index"):
+            model_crypto.decrypt_gcm_to_memory(src, DEK, metadata)
+
+
+def test_integrity_tree_leaves_must_match_root(tmp_path):
+    data = _plaintext(3 * CHUNK)
+    _, metadata = _encrypt_v2(tmp_path, data)
+    leaves = metadata["integrity"]["leaves"]
+    leaves[1] = leaves[0]
+    
+    with pytest.raises(ValueError, match="root"):
+        model_crypto.verify_buffer(data, metadata)
+
+
+def test_verify_buffer_and_fd_name_the_corrupted_chunk(tmp_path):
+    data = _plaintext(4 * CHUNK + 5)
+    _, metadata = _encrypt_v2(tmp_path, data)
+    model_crypto.verify_buffer(data, metadata, threads=2)
+    
+    corrupted = bytearray(data)
+    corrupted[4 * CHUNK] ^= 0xFF
+    with pytest.raises(ValueError, match="chunk 4"):
+        model_crypto.verify_buffer(corrupted, metadata, threads=2)
+    with pytest.raises(ValueError, match="bytes"):
+        model_crypto.verify_buffer(data[:-1], metadata)
+    
+    path = tmp_path / "plain"
+    path.write_bytes(bytes(corrupted))
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        with pytest.raises(ValueError, match="chunk 4"):
+            model_crypto.verify_fd(fd, metadata, threads=2)
+    finally:
+        os.close(fd)
+
+
+@pytest.mark.parametrize("integrity", [True, False])
+def test_verify_file_checks_a_plaintext_written_elsewhere(tmp_path, integrity):
+    data = _plaintext(3 * CHUNK + 1)
+    _, metadata = _encrypt_v1(tmp_path, data, integrity)
+    
+    path = tmp_path / "shared"
+    path.write_bytes(data)
+    model_crypto.verify_file(str(path), metadata)
+    
+    path.write_bytes(data[:-1] + bytes([data[-1] ^ 0x01]))
+    with pytest.raises(ValueError):
+        model_crypto.verify_file(str(path), metadata)
+    
+    path.write_bytes(data + b"\x00")
+    with pytest.raises(ValueError, match="bytes"):
+        model_crypto.verify_file(str(path), metadata)